@@ -0,0 +1,3 @@
+@echo off
+python -m toyrepo %*
+exit /b %ERRORLEVEL%
@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+The binary program repository file format. The file consists of a fixed header, a sequence of length-prefixed records
+(see store.codec), and an index which maps each fragment digest to the offset of its record and lists the offsets of
+the ticket and link records:
+
+    header:  magic (8 bytes), version (u16), flags (u16), repository UUID (16 bytes), index offset (u64)
+    records: fragment/stripped-fragment records, then ticket records, then link records, then a settings record
+    index:   fragment count (u32), { digest length (u16), digest, record offset (u64) } ...
+             ticket count (u32), { record offset (u64) } ...
+             link count (u32), { record offset (u64) } ...
+             settings record offset (u64), or 0 if the repository has no settings
+    journal: zero or more groups of records, each followed by a commit record
+
+Writing a repository whose changes are purely additions (new fragments, tickets, and links) simply appends their
+records to the journal at the end of the file, so the cost of a compilation or link is proportional to the amount of
+new data rather than to the size of the repository. When a repository is opened, the journal records are replayed
+over the index: a later record for a digest or ticket replaces an earlier one. Once the journal grows larger than the
+indexed part of the file the repository is compacted by rewriting it with a complete index. A change to the
+repository's settings also causes it to be rewritten.
+
+Version 1 files, whose index ends with the links, can still be read.
+
+A group of records which was only partially written (because the writing process was interrupted) has no commit
+record, or its last record fails its checksum. It is ignored when the repository is read and overwritten by the next
+write.
+
+Several processes may use a repository at once (see store.locking). Reading holds the shared lock; writing holds the
+exclusive lock. Additions are merged with the file as it is at the time of the write, so changes that other processes
+committed after the repository was read are preserved.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import uuid
+from typing import BinaryIO, Dict, List, Mapping, Optional, Tuple
+
+from . import codec, locking
+from .fragment_map import FragmentMap
+from .types import Fragment, LinksRecord, Repository, TicketFileEntry
+
+_logger = logging.getLogger (__name__)
+
+MAGIC = b'ToyRepo\x00'
+VERSION = 2
+
+# A journal smaller than this is never compacted.
+COMPACTION_THRESHOLD = 1 << 20
+
+_HEADER = struct.Struct ('>8sHH16sQ')
+_COUNT = struct.Struct ('>I')
+_KEY_LENGTH = struct.Struct ('>H')
+_OFFSET = struct.Struct ('>Q')
+
+
+class FormatError (Exception):
+    pass
+
+
+def is_binary (stream: BinaryIO) -> bool:
+    """
+    Checks whether a stream contains a binary repository by looking for its magic number. The stream position is
+    left unchanged.
+    """
+
+    position = stream.tell ()
+    magic = stream.read (len (MAGIC))
+    stream.seek (position)
+    return magic == MAGIC
+
+
+class _Index:
+    def __init__ (self) -> None:
+        self.fragments = dict ()  # digest -> record offset
+        self.tickets = list ()  # ticket record offsets
+        self.links = list ()  # link record offsets
+        self.settings = 0  # settings record offset or 0
+
+
+def _read_header (buffer) -> Tuple [uuid.UUID, int, int]:
+    if len (buffer) < _HEADER.size:
+        raise FormatError ('Repository header was truncated')
+    magic, version, _, uuid_bytes, index_offset = _HEADER.unpack_from (buffer, 0)
+    if magic != MAGIC:
+        raise FormatError ('Repository magic number was invalid')
+    if version not in (1, VERSION):
+        raise FormatError ('Unsupported repository version ({0})'.format (version))
+    return uuid.UUID (bytes=uuid_bytes), version, index_offset
+
+
+def _read_index (buffer, offset: int, version: int) -> Tuple [_Index, int]:
+    """
+    Reads the index which starts at 'offset'.
+
+    :return: A tuple containing the index and the offset of the first byte following it.
+    """
+
+    def unpack (s: struct.Struct):
+        nonlocal offset
+        if offset + s.size > len (buffer):
+            raise FormatError ('Repository index was truncated')
+        result = s.unpack_from (buffer, offset)
+        offset += s.size
+        return result [0]
+
+    index = _Index ()
+    for _ in range (unpack (_COUNT)):
+        length = unpack (_KEY_LENGTH)
+        digest = bytes (buffer [offset:offset + length]).decode ()
+        offset += length
+        index.fragments [digest] = unpack (_OFFSET)
+    index.tickets = [unpack (_OFFSET) for _ in range (unpack (_COUNT))]
+    index.links = [unpack (_OFFSET) for _ in range (unpack (_COUNT))]
+    if version > 1:
+        index.settings = unpack (_OFFSET)
+    return index, offset
+
+
+def _map_file (path: str):
+    with open (path, 'rb') as f:
+        return mmap.mmap (f.fileno (), 0, access=mmap.ACCESS_READ)
+
+
+def _signature (path: str) -> Tuple [int, int, int]:
+    """Returns a value which will change if the file at 'path' is modified or replaced."""
+
+    st = os.stat (path)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class _RepositoryFile:
+    """
+    A binary repository file from which a Repository instance was loaded (or to which it was last written). It
+    records the state of the file at that time so that later changes to the repository can be appended to it.
+    """
+
+    def __init__ (self, path: str) -> None:
+        self.path = os.path.abspath (path)
+        self.buffer = None
+        self.uuid = None
+        self.offsets = dict ()  # fragment digest -> record offset
+        self.tickets = dict ()  # ticket uuid -> TicketFileEntry as stored in the file
+        self.links = list ()  # LinksRecord instances as stored in the file
+        self.settings = dict ()
+        self.journal_start = 0
+        self.end = 0
+        self.signature = None
+
+    def open (self) -> None:
+        """Maps the file and reads its index and journal, ignoring any incomplete records at its end."""
+
+        buffer = _map_file (self.path)
+        try:
+            self.uuid, version, index_offset = _read_header (buffer)
+            index, self.journal_start = _read_index (buffer, index_offset, version)
+            self.offsets = index.fragments
+            self.tickets = dict (codec.decode_record (buffer, offset) [1] for offset in index.tickets)
+            self.links = [codec.decode_record (buffer, offset) [1] for offset in index.links]
+            self.settings = codec.decode_record (buffer, index.settings) [1] if index.settings else dict ()
+            self.end = self.__replay_journal (buffer)
+        except (codec.CodecError, FormatError):
+            buffer.close ()
+            raise
+
+        if self.end < len (buffer):
+            _logger.warning ("Ignoring %d bytes of incomplete data at the end of repository '%s'",
+                             len (buffer) - self.end, self.path)
+
+        self.buffer = buffer
+        self.signature = _signature (self.path)
+
+    def __replay_journal (self, buffer) -> int:
+        """
+        Applies the records in the journal. Each group of records is applied only once its commit record has been
+        seen.
+
+        :return: The offset of the end of the last complete group.
+        """
+
+        end = offset = self.journal_start
+        pending = list ()
+        while offset < len (buffer):
+            try:
+                kind, _, next_offset = codec.check_record (buffer, offset)
+            except codec.CodecError:
+                break
+            if kind != codec.RecordKind.commit:
+                pending.append ((kind, offset))
+            else:
+                if codec.decode_record (buffer, offset) [1] != len (pending):
+                    break
+                for kind, record_offset in pending:
+                    if kind in (codec.RecordKind.fragment, codec.RecordKind.stripped):
+                        self.offsets [codec.record_digest (buffer, record_offset)] = record_offset
+                    elif kind == codec.RecordKind.ticket:
+                        ticket, entry = codec.decode_record (buffer, record_offset) [1]
+                        self.tickets [ticket] = entry
+                    elif kind == codec.RecordKind.settings:
+                        self.settings = codec.decode_record (buffer, record_offset) [1]
+                    else:
+                        self.links.append (codec.decode_record (buffer, record_offset) [1])
+                pending = list ()
+                end = next_offset
+            offset = next_offset
+        return end
+
+    def close (self) -> None:
+        if self.buffer is not None:
+            self.buffer.close ()
+            self.buffer = None
+
+    def journal_size (self) -> int:
+        return self.end - self.journal_start
+
+    def unchanged (self) -> bool:
+        """Returns True if the file has not been modified by anyone else since it was loaded."""
+
+        try:
+            return _signature (self.path) == self.signature
+        except OSError:
+            return False
+
+
+class _MappedFragments (FragmentMap):
+    """
+    The fragments of a binary repository. Each fragment's record is decoded the first time that it is accessed.
+    """
+
+    def __init__ (self, file: _RepositoryFile, cache_size: Optional [int]) -> None:
+        super ().__init__ (file.offsets.keys (), cache_size=cache_size)
+        self.file = file
+
+    def _load (self, digest: str) -> Optional [Fragment]:
+        try:
+            _, (_, fragment) = codec.decode_record (self.file.buffer, self.file.offsets [digest])
+        except codec.CodecError as ex:
+            raise FormatError (str (ex))
+        return fragment
+
+    def raw_record (self, digest: str) -> Optional [bytes]:
+        """
+        Returns the encoded record for an unmodified fragment so that it can be copied without being decoded and
+        re-encoded, or None if the fragment has been modified since the file was loaded.
+        """
+
+        if self.is_modified (digest):
+            return None
+        offset = self.file.offsets [digest]
+        _, _, end = codec.record_header (self.file.buffer, offset)
+        return self.file.buffer [offset:end]
+
+
+def read (path: str, cache_size: Optional [int] = None) -> Repository:
+    """
+    Reads a binary repository. The tickets and links are loaded immediately, as is the index of fragments; the
+    fragments themselves are decoded on demand.
+
+    :param path: The path of the repository file.
+    :param cache_size: The maximum number of decoded fragments to be retained or None for no limit.
+    :return: A new Repository instance.
+    """
+
+    file = _RepositoryFile (path)
+    try:
+        with locking.shared (path):
+            file.open ()
+    except codec.CodecError as ex:
+        raise FormatError (str (ex))
+    return Repository (fragments=_MappedFragments (file, cache_size=cache_size),
+                       links=list (file.links),
+                       tickets=dict (file.tickets),
+                       uuid=file.uuid,
+                       settings=dict (file.settings))
+
+
+_Additions = Tuple [Mapping [str, Optional [Fragment]], Mapping [uuid.UUID, TicketFileEntry], List [LinksRecord]]
+
+
+def _additions (repository: Repository, file: _RepositoryFile) -> Optional [_Additions]:
+    """
+    Discovers the fragments, tickets, and links which have been added to a repository since it was loaded from 'file'.
+
+    :return: The new fragments, tickets, and links or None if the repository has been changed in any other way.
+    """
+
+    fragments = repository.fragments
+    if repository.uuid != file.uuid or repository.settings != file.settings or fragments.has_deletions ():
+        return None
+    new_fragments = fragments.modified ()
+    if any (digest in file.offsets for digest in new_fragments):
+        return None
+
+    tickets = repository.tickets
+    if any (tickets.get (ticket) is not entry for ticket, entry in file.tickets.items ()):
+        return None
+    new_tickets = {ticket: entry for ticket, entry in tickets.items () if ticket not in file.tickets}
+
+    links = repository.links
+    if len (links) < len (file.links) or any (a is not b for a, b in zip (links, file.links)):
+        return None
+    return new_fragments, new_tickets, links [len (file.links):]
+
+
+def _merge (path: str,
+            base: Optional [_RepositoryFile],
+            repository_uuid: uuid.UUID,
+            fragments: Mapping [str, Optional [Fragment]],
+            tickets: Mapping [uuid.UUID, TicketFileEntry],
+            links: List [LinksRecord]) -> _RepositoryFile:
+    """
+    Adds fragments, tickets, and links to the repository at 'path' as it is now. The caller must hold the exclusive
+    lock.
+
+    :param base: The file from which the additions' repository was loaded, if any. It is reused if nobody else has
+                 modified it since.
+    :param repository_uuid: The UUID to be given to the repository if 'path' does not yet exist.
+    :return: The repository file as it is after the additions are written.
+    """
+
+    if base is not None and base.unchanged ():
+        file = base
+    else:
+        current = Repository.read (path, create=True)
+        if not isinstance (current.fragments, _MappedFragments):
+            # The repository is new or is held in YAML, so write it in full.
+            if not os.path.exists (path):
+                current.uuid = repository_uuid
+            current.fragments.update ((digest, fragment) for digest, fragment in fragments.items ()
+                                      if digest not in current.fragments)
+            current.tickets.update (tickets)
+            current.links += links
+            return _rewrite (current, path)
+        file = current.fragments.file
+
+    # Fragments are identified by their content, so any that another process has added in the meantime are the same as
+    # ours.
+    fragments = {digest: fragment for digest, fragment in fragments.items () if digest not in file.offsets}
+
+    records = list ()  # A list of (record, fragment digest or None)
+    records += [(codec.encode_fragment (digest, fragment), digest) for digest, fragment in fragments.items ()]
+    records += [(codec.encode_ticket (ticket, entry), None) for ticket, entry in tickets.items ()]
+    records += [(codec.encode_link (link), None) for link in links]
+    if not records:
+        return file
+
+    commit = codec.encode_commit (len (records))
+    size = sum (len (record) for record, _ in records) + len (commit)
+    if file.journal_size () + size > max (COMPACTION_THRESHOLD, file.journal_start):
+        _logger.debug ("Compacting repository '%s'", file.path)
+        compacted = Repository (fragments=_MappedFragments (file, cache_size=0),
+                                links=file.links + links,
+                                tickets=dict (file.tickets),
+                                uuid=file.uuid,
+                                settings=file.settings)
+        compacted.fragments.update (fragments)
+        compacted.tickets.update (tickets)
+        return _rewrite (compacted, path)
+
+    _logger.debug ("Appending %d records to repository '%s'", len (records), file.path)
+    file.close ()
+    try:
+        with open (file.path, 'r+b') as f:
+            f.seek (file.end)
+            f.write (b''.join (record for record, _ in records))
+            f.write (commit)
+            # Remove anything left behind by an earlier write that was interrupted.
+            f.truncate ()
+            end = f.tell ()
+    finally:
+        file.buffer = _map_file (file.path)
+
+    offset = file.end
+    for record, digest in records:
+        if digest is not None:
+            file.offsets [digest] = offset
+        offset += len (record)
+    file.end = end
+    file.tickets.update (tickets)
+    file.links += links
+    file.signature = _signature (file.path)
+    return file
+
+
+def _refresh (repository: Repository, file: _RepositoryFile) -> None:
+    """
+    Brings a repository loaded from a binary file up to date after its changes were merged into 'file', adding
+    anything that other processes wrote to the file in the meantime.
+    """
+
+    fragments = repository.fragments
+    new_digests = [digest for digest in file.offsets if digest not in fragments]
+    if fragments.file is not file:
+        fragments.file.close ()
+        fragments.file = file
+    fragments._reset (new_digests)
+    repository.tickets.update (file.tickets)
+    repository.links [:] = file.links
+    repository.uuid = file.uuid
+    repository.settings = dict (file.settings)
+
+
+def _rewrite (repository: Repository, path: str) -> _RepositoryFile:
+    """
+    Writes a complete repository file. The data is written to a temporary file which then replaces 'path' so that a
+    failure part way through does not destroy the existing repository. Fragments which were loaded from a binary
+    repository and have not been modified are copied without being decoded. The caller must hold the exclusive lock.
+
+    :return: The new repository file. If the repository's fragments were loaded from a binary file, that file is
+             closed.
+    """
+
+    _logger.debug ("Writing binary repository '%s'", os.path.abspath (path))
+
+    fragments = repository.fragments
+    mapped = fragments if isinstance (fragments, _MappedFragments) else None
+
+    temp_path = path + '.t'
+    try:
+        with open (temp_path, 'wb') as f:
+            f.write (_HEADER.pack (MAGIC, VERSION, 0, repository.uuid.bytes, 0))
+
+            index = _Index ()
+            for digest in fragments:
+                index.fragments [digest] = f.tell ()
+                record = mapped.raw_record (digest) if mapped is not None else None
+                f.write (record if record is not None else codec.encode_fragment (digest, fragments [digest]))
+            for ticket, entry in repository.tickets.items ():
+                index.tickets.append (f.tell ())
+                f.write (codec.encode_ticket (ticket, entry))
+            for link in repository.links:
+                index.links.append (f.tell ())
+                f.write (codec.encode_link (link))
+            if repository.settings:
+                index.settings = f.tell ()
+                f.write (codec.encode_settings (repository.settings))
+
+            index_offset = f.tell ()
+            parts = [_COUNT.pack (len (index.fragments))]
+            for digest, offset in index.fragments.items ():
+                key = digest.encode ()
+                parts += [_KEY_LENGTH.pack (len (key)), key, _OFFSET.pack (offset)]
+            for offsets in (index.tickets, index.links):
+                parts.append (_COUNT.pack (len (offsets)))
+                parts += [_OFFSET.pack (offset) for offset in offsets]
+            parts.append (_OFFSET.pack (index.settings))
+            f.write (b''.join (parts))
+            end = f.tell ()
+
+            f.seek (0)
+            f.write (_HEADER.pack (MAGIC, VERSION, 0, repository.uuid.bytes, index_offset))
+
+        if mapped is not None:
+            # The file that's currently mapped may be the one that we're about to replace (which some systems won't
+            # allow), so release it first.
+            mapped.file.close ()
+        os.replace (temp_path, path)
+    finally:
+        try:
+            os.unlink (temp_path)
+        except FileNotFoundError:
+            pass
+
+    file = _RepositoryFile (path)
+    file.buffer = _map_file (path)
+    file.uuid = repository.uuid
+    file.offsets = index.fragments
+    file.tickets = dict (repository.tickets)
+    file.links = list (repository.links)
+    file.settings = dict (repository.settings)
+    file.journal_start = file.end = end
+    file.signature = _signature (path)
+    return file
+
+
+def write (repository: Repository, path: str, compact: bool = False) -> None:
+    """
+    Writes a repository in the binary format. If the repository was loaded from 'path' and has only had fragments,
+    tickets, and links added, the new records are merged with the file's current contents by appending them to its
+    journal; the repository then also holds anything that other processes added in the meantime. Otherwise the file
+    is rewritten.
+
+    :param repository: The repository to be written.
+    :param path: The path of the file to be written.
+    :param compact: If true, the file is always rewritten.
+    """
+
+    with locking.exclusive (path):
+        fragments = repository.fragments
+        mapped = isinstance (fragments, _MappedFragments)
+        if not compact and mapped and fragments.file.path == os.path.abspath (path):
+            additions = _additions (repository, fragments.file)
+            if additions is not None:
+                _refresh (repository, _merge (path, fragments.file, repository.uuid, *additions))
+                return
+
+        file = _rewrite (repository, path)
+        if mapped:
+            # The fragments are now served from the new file.
+            fragments.file = file
+            fragments._reset ()
+
+
+def merge (path: str,
+           fragments: Mapping [str, Optional [Fragment]],
+           tickets: Mapping [uuid.UUID, TicketFileEntry],
+           links: List [LinksRecord],
+           base: Optional [Repository] = None) -> None:
+    """
+    Adds fragments, tickets, and links to the repository at 'path', which is created if it does not exist. Fragments
+    that the repository already holds are skipped. This is safe in the presence of other processes that are
+    simultaneously adding to the same repository.
+
+    :param path: The path of the repository file.
+    :param fragments: The fragments to be added.
+    :param tickets: The tickets to be added.
+    :param links: The links to be added.
+    :param base: An unmodified copy of the repository which was previously read from 'path', if any. If it was read
+                 from a binary file, it is brought up to date.
+    """
+
+    base_file = None
+    repository_uuid = uuid.uuid4 ()
+    if base is not None:
+        repository_uuid = base.uuid
+        if is_mapped (base, path):
+            base_file = base.fragments.file
+
+    with locking.exclusive (path):
+        file = _merge (path, base_file, repository_uuid, fragments, tickets, links)
+        if base_file is not None:
+            _refresh (base, file)
+
+
+def is_mapped (repository: Repository, path: str) -> bool:
+    """
+    Checks whether 'repository' was read from the binary file at 'path', in which case merge() brings it up to date.
+    """
+
+    fragments = repository.fragments
+    return isinstance (fragments, _MappedFragments) and fragments.file.path == os.path.abspath (path)
+
+
+def close (repository: Repository) -> None:
+    """
+    Releases the mapping of the binary file from which 'repository' was read, if any, so that the file can be replaced
+    (which some systems won't allow while it's mapped). The fragments which have not been decoded can no longer be
+    loaded.
+    """
+
+    fragments = repository.fragments
+    if isinstance (fragments, _MappedFragments):
+        fragments.file.close ()
+
+
+def compact (path: str) -> None:
+    """Rewrites the repository at 'path' with a complete index, removing its journal."""
+
+    with locking.exclusive (path):
+        write (read (path), path, compact=True)
+
+# eof store/binformat.py
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Encodes and decodes the program repository's records (fragments, tickets, links, and settings) as compact binary. Each record
+is prefixed by a small header giving its kind, the length of its payload, and a CRC32 of the payload so that a reader
+can skip records that it isn't interested in and detect a damaged file.
+"""
+
+import enum
+import struct
+import uuid
+import zlib
+from typing import Any, Mapping, Optional, Tuple
+
+from .types import Fragment, FSection, LinksRecord, SectionType, TicketFileEntry, TicketRecord, XFixup
+
+
+@enum.unique
+class RecordKind (enum.Enum):
+    fragment = 1
+    stripped = 2  # A fragment whose body has been removed by toystrip: just its digest is recorded.
+    ticket = 3
+    link = 4
+    commit = 5  # Marks the end of a group of records that were appended together.
+    settings = 6  # The repository's settings (see Repository.settings).
+
+
+class CodecError (Exception):
+    pass
+
+
+# kind, payload length, payload CRC32.
+RECORD_HEADER = struct.Struct ('>BII')
+
+_u8 = struct.Struct ('>B')
+_u32 = struct.Struct ('>I')
+_i32 = struct.Struct ('>i')
+_opt_u32 = struct.Struct ('>?I')
+_uuid = struct.Struct ('>16s')
+
+
+class _Writer:
+    """Accumulates the encoded payload of a record."""
+
+    def __init__ (self) -> None:
+        self.__parts = []
+
+    def u8 (self, value: int) -> None:
+        self.__parts.append (_u8.pack (value))
+
+    def u32 (self, value: int) -> None:
+        self.__parts.append (_u32.pack (value))
+
+    def i32 (self, value: int) -> None:
+        self.__parts.append (_i32.pack (value))
+
+    def optional_u32 (self, value: Optional [int]) -> None:
+        self.__parts.append (_opt_u32.pack (value is not None, value if value is not None else 0))
+
+    def uid (self, value: uuid.UUID) -> None:
+        self.__parts.append (_uuid.pack (value.bytes))
+
+    def blob (self, value: bytes) -> None:
+        self.__parts.append (_u32.pack (len (value)))
+        self.__parts.append (bytes (value))
+
+    def str (self, value: str) -> None:
+        self.blob (value.encode ())
+
+    def getvalue (self) -> bytes:
+        return b''.join (self.__parts)
+
+
+class _Reader:
+    """Decodes values from a buffer starting at a given offset."""
+
+    def __init__ (self, buffer, offset: int, end: int) -> None:
+        self.__buffer = buffer
+        self.__offset = offset
+        self.__end = end
+
+    def __unpack (self, s: struct.Struct) -> Tuple:
+        if self.__offset + s.size > self.__end:
+            raise CodecError ('Record was truncated')
+        result = s.unpack_from (self.__buffer, self.__offset)
+        self.__offset += s.size
+        return result
+
+    def u8 (self) -> int:
+        return self.__unpack (_u8) [0]
+
+    def u32 (self) -> int:
+        return self.__unpack (_u32) [0]
+
+    def i32 (self) -> int:
+        return self.__unpack (_i32) [0]
+
+    def optional_u32 (self) -> Optional [int]:
+        present, value = self.__unpack (_opt_u32)
+        return value if present else None
+
+    def uid (self) -> uuid.UUID:
+        return uuid.UUID (bytes=self.__unpack (_uuid) [0])
+
+    def blob (self) -> bytes:
+        length = self.u32 ()
+        start = self.__offset
+        if start + length > self.__end:
+            raise CodecError ('Record was truncated')
+        self.__offset += length
+        return bytes (self.__buffer [start:start + length])
+
+    def str (self) -> str:
+        return self.blob ().decode ()
+
+    def at_end (self) -> bool:
+        return self.__offset >= self.__end
+
+
+def _record (kind: RecordKind, payload: bytes) -> bytes:
+    return RECORD_HEADER.pack (kind.value, len (payload), zlib.crc32 (payload)) + payload
+
+
+def encode_fragment (digest: str, fragment: Optional [Fragment]) -> bytes:
+    """
+    Produces the binary record for a fragment.
+
+    :param digest: The fragment's digest.
+    :param fragment: The fragment to be encoded or None for a stripped fragment.
+    :return: The encoded record.
+    """
+
+    w = _Writer ()
+    w.str (digest)
+    if fragment is None:
+        return _record (RecordKind.stripped, w.getvalue ())
+
+    w.u8 (fragment.primary.value)
+    w.u8 (len (fragment.sections))
+    for section_type, section in fragment.sections.items ():
+        w.u8 (section_type.value)
+        w.blob (section.data)
+        w.u32 (len (section.xfixups))
+        for xfixup in section.xfixups:
+            w.i32 (xfixup.offset)
+            w.str (xfixup.name)
+        w.u32 (len (section.ifixups))
+        for offset, section_name in section.ifixups:
+            w.i32 (offset)
+            w.str (section_name)
+    return _record (RecordKind.fragment, w.getvalue ())
+
+
+def encode_ticket (ticket: uuid.UUID, entry: TicketFileEntry) -> bytes:
+    """Produces the binary record for a ticket and its members."""
+
+    w = _Writer ()
+    w.uid (ticket)
+    w.str (entry.path)
+    w.u32 (len (entry.members))
+    for member in entry.members:
+        w.str (member.name)
+        w.str (member.digest)
+        w.optional_u32 (member.line_base)
+    # The input digest and the members' debug digests were added later and are absent from older records. An empty
+    # string stands for a missing input digest; the debug digests follow it only if there are any.
+    debug_digests = [member.debug_digest for member in entry.members]
+    has_debug = any (digest is not None for digest in debug_digests)
+    if entry.input_digest is not None or has_debug:
+        w.str (entry.input_digest or '')
+    if has_debug:
+        for digest in debug_digests:
+            w.u8 (digest is not None)
+            if digest is not None:
+                w.str (digest)
+    return _record (RecordKind.ticket, w.getvalue ())
+
+
+def encode_link (link: LinksRecord) -> bytes:
+    """Produces the binary record for a link."""
+
+    w = _Writer ()
+    w.uid (link.uuid)
+    w.str (link.file)
+    return _record (RecordKind.link, w.getvalue ())
+
+
+def encode_settings (settings: Mapping [str, str]) -> bytes:
+    """Produces the binary record for a repository's settings."""
+
+    w = _Writer ()
+    w.u32 (len (settings))
+    for key, value in sorted (settings.items ()):
+        w.str (key)
+        w.str (value)
+    return _record (RecordKind.settings, w.getvalue ())
+
+
+def encode_commit (count: int) -> bytes:
+    """Produces the record which follows a group of 'count' records appended to a repository's journal."""
+
+    w = _Writer ()
+    w.u32 (count)
+    return _record (RecordKind.commit, w.getvalue ())
+
+
+def record_header (buffer, offset: int) -> Tuple [RecordKind, int, int]:
+    """
+    Decodes the header of the record at 'offset'.
+
+    :return: A tuple containing the record kind, the offset of its payload, and the offset of the following record.
+    """
+
+    if offset + RECORD_HEADER.size > len (buffer):
+        raise CodecError ('Record header was truncated')
+    kind, length, crc = RECORD_HEADER.unpack_from (buffer, offset)
+    try:
+        kind = RecordKind (kind)
+    except ValueError:
+        raise CodecError ('Unknown record kind ({0})'.format (kind))
+    start = offset + RECORD_HEADER.size
+    end = start + length
+    if end > len (buffer):
+        raise CodecError ('Record was truncated')
+    return kind, start, end
+
+
+def check_record (buffer, offset: int) -> Tuple [RecordKind, int, int]:
+    """As record_header() but also verifies the payload's checksum."""
+
+    kind, start, end = record_header (buffer, offset)
+    (crc,) = _u32.unpack_from (buffer, offset + RECORD_HEADER.size - _u32.size)
+    if zlib.crc32 (buffer [start:end]) != crc:
+        raise CodecError ('Record checksum mismatch at offset {0}'.format (offset))
+    return kind, start, end
+
+
+def record_digest (buffer, offset: int) -> str:
+    """Returns the digest of the fragment record at 'offset' without decoding its body."""
+
+    kind, start, end = record_header (buffer, offset)
+    assert kind in (RecordKind.fragment, RecordKind.stripped)
+    return _Reader (buffer, start, end).str ()
+
+
+def _decode_fragment_body (r: _Reader) -> Fragment:
+    primary = SectionType (r.u8 ())
+    sections = dict ()
+    for _ in range (r.u8 ()):
+        section_type = SectionType (r.u8 ())
+        data = r.blob ()
+        xfixups = [XFixup (offset=r.i32 (), name=r.str ()) for _ in range (r.u32 ())]
+        ifixups = [(r.i32 (), r.str ()) for _ in range (r.u32 ())]
+        sections [section_type] = FSection (data=data, xfixups=xfixups, ifixups=ifixups)
+    return Fragment (sections=sections, primary=primary)
+
+
+def decode_record (buffer, offset: int) -> Tuple [RecordKind, Any]:
+    """
+    Decodes the record at the given offset within a buffer.
+
+    :param buffer: A bytes-like object containing the record.
+    :param offset: The offset of the record's header.
+    :return: A tuple of the record kind and its value. The value is a (digest, Fragment) pair for fragment records,
+             (digest, None) for stripped fragments, a (uuid, TicketFileEntry) pair for tickets, a LinksRecord for
+             links, a dictionary for settings, and the number of records in the group for commit records.
+    """
+
+    kind, start, end = record_header (buffer, offset)
+    r = _Reader (buffer, start, end)
+    if kind == RecordKind.fragment:
+        digest = r.str ()
+        return kind, (digest, _decode_fragment_body (r))
+    if kind == RecordKind.stripped:
+        return kind, (r.str (), None)
+    if kind == RecordKind.ticket:
+        ticket = r.uid ()
+        path = r.str ()
+        members = [TicketRecord (name=r.str (), digest=r.str (), line_base=r.optional_u32 ())
+                   for _ in range (r.u32 ())]
+        input_digest = None if r.at_end () else (r.str () or None)
+        if not r.at_end ():
+            for member in members:
+                member.debug_digest = r.str () if r.u8 () else None
+        return kind, (ticket, TicketFileEntry (path=path, members=members, input_digest=input_digest))
+    if kind == RecordKind.commit:
+        return kind, r.u32 ()
+    if kind == RecordKind.settings:
+        return kind, dict ((r.str (), r.str ()) for _ in range (r.u32 ()))
+    assert kind == RecordKind.link
+    link_uuid = r.uid ()
+    return kind, LinksRecord (file=r.str (), uuid=link_uuid)
+
+# eof store/codec.py
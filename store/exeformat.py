@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+The binary executable file format. The file consists of a fixed header followed by tables of fixed-size entries, a
+string table, and the raw contents of each section:
+
+    header:   magic (8 bytes), version (u16), flags (u16), executable UUID (16 bytes), repository UUID (16 bytes),
+              repository path offset (u32), repository path length (u32),
+              section count (u32), symbol count (u32), debug line count (u32), string table size (u32)
+    sections: { section type (u8), padding (7 bytes), data offset (u64), data size (u64) } ...
+    symbols:  { address (u64), size (u64), name offset (u32), name length (u32) } ...
+    debug:    { address (u64), line base (i64), fragment digest offset (u32), digest length (u32),
+                debug digest offset (u32), debug digest length (u32) } ...
+    strings:  the UTF-8 encoded names, digests, and repository path referenced by the entries above
+    data:     the contents of each section, aligned to 8 bytes
+
+String offsets are relative to the start of the string table. The file is memory-mapped when it is read and each
+section's data is a view of the mapping, so the contents of a section are not copied until an instruction is decoded
+from them.
+
+A debug record's debug digest names the fragment holding the procedure's line table; an empty string means that the
+line table is held by the code fragment itself. Version 1 files, whose debug records lack the debug digest, can still
+be read.
+"""
+
+import mmap
+import struct
+import uuid
+from typing import BinaryIO, Dict, Tuple
+
+from .exetypes import Executable, RepositoryRecord, Symbol
+from .types import DebugLineRecord, SectionType
+
+MAGIC = b'ToyExe\x00\x00'
+VERSION = 2
+
+_HAS_REPOSITORY_UUID = 1 << 0
+_HAS_REPOSITORY_PATH = 1 << 1
+
+_HEADER = struct.Struct ('>8sHH16s16sIIIIII')
+_SECTION = struct.Struct ('>B7xQQ')
+_SYMBOL = struct.Struct ('>QQII')
+_DEBUG = struct.Struct ('>QqIIII')
+_DEBUG_V1 = struct.Struct ('>QqII')
+_ALIGNMENT = 8
+
+
+class FormatError (Exception):
+    pass
+
+
+def is_binary (stream: BinaryIO) -> bool:
+    """
+    Checks whether a stream contains a binary executable by looking for its magic number. The stream position is left
+    unchanged.
+    """
+
+    position = stream.tell ()
+    magic = stream.read (len (MAGIC))
+    stream.seek (position)
+    return magic == MAGIC
+
+
+class _Strings:
+    """Accumulates the contents of the string table."""
+
+    def __init__ (self) -> None:
+        self.__data = bytearray ()
+
+    def add (self, s: str) -> Tuple [int, int]:
+        """Appends 's' to the table and returns its offset and length."""
+
+        encoded = s.encode ('utf-8')
+        offset = len (self.__data)
+        self.__data += encoded
+        return offset, len (encoded)
+
+    def data (self) -> bytes:
+        return bytes (self.__data)
+
+
+def _align (offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) & ~(_ALIGNMENT - 1)
+
+
+def write (executable: Executable, stream: BinaryIO) -> None:
+    """
+    Writes an executable in the binary format.
+
+    :param executable: The executable to be written.
+    :param stream: The binary stream to which the executable will be written.
+    """
+
+    strings = _Strings ()
+    flags = 0
+    record = executable.repository_record
+    repository_uuid = bytes (16)
+    path_offset, path_length = 0, 0
+    if record is not None and record.uuid is not None:
+        flags |= _HAS_REPOSITORY_UUID
+        repository_uuid = record.uuid.bytes
+    if record is not None and record.path is not None:
+        flags |= _HAS_REPOSITORY_PATH
+        path_offset, path_length = strings.add (record.path)
+
+    symbols = [_SYMBOL.pack (symbol.address, symbol.size, *strings.add (symbol.name)) for symbol in executable.symbols]
+    debug = [_DEBUG.pack (d.address, d.line_base, *strings.add (d.fragment), *strings.add (d.debug_digest or ''))
+             for d in executable.debug]
+    string_table = strings.data ()
+
+    sections = sorted (executable.data.items (), key=lambda item: item [0].value)
+    offset = _align (_HEADER.size + _SECTION.size * len (sections) + len (b''.join (symbols)) +
+                     len (b''.join (debug)) + len (string_table))
+    section_table = list ()
+    for section, data in sections:
+        section_table.append (_SECTION.pack (section.value, offset, len (data)))
+        offset = _align (offset + len (data))
+
+    position = 0
+
+    def emit (data) -> None:
+        nonlocal position
+        stream.write (data)
+        position += len (data)
+
+    def pad () -> None:
+        emit (bytes (_align (position) - position))
+
+    emit (_HEADER.pack (MAGIC, VERSION, flags, executable.uuid.bytes, repository_uuid, path_offset, path_length,
+                        len (sections), len (symbols), len (debug), len (string_table)))
+    for entry in section_table + symbols + debug:
+        emit (entry)
+    emit (string_table)
+    for _, data in sections:
+        pad ()
+        emit (data)
+
+
+def _map_file (path: str):
+    with open (path, 'rb') as f:
+        return mmap.mmap (f.fileno (), 0, access=mmap.ACCESS_READ)
+
+
+def read (path: str) -> Executable:
+    """
+    Reads a binary executable. The file is memory-mapped: the data of each of the executable's sections is a
+    memoryview of the mapping.
+
+    :param path: The path of the executable file.
+    :return: A new Executable instance.
+    """
+
+    buffer = memoryview (_map_file (path))
+    if len (buffer) < _HEADER.size:
+        raise FormatError ('Executable header was truncated')
+    magic, version, flags, exe_uuid, repository_uuid, path_offset, path_length, section_count, symbol_count, \
+        debug_count, strings_size = _HEADER.unpack_from (buffer, 0)
+    if magic != MAGIC:
+        raise FormatError ('Executable magic number was invalid')
+    if version not in (1, VERSION):
+        raise FormatError ('Unsupported executable version ({0})'.format (version))
+
+    sections_start = _HEADER.size
+    symbols_start = sections_start + section_count * _SECTION.size
+    debug_start = symbols_start + symbol_count * _SYMBOL.size
+    debug_format = _DEBUG if version == VERSION else _DEBUG_V1
+    strings_start = debug_start + debug_count * debug_format.size
+    if strings_start + strings_size > len (buffer):
+        raise FormatError ('Executable tables were truncated')
+
+    def string (offset: int, length: int) -> str:
+        if offset + length > strings_size:
+            raise FormatError ('Executable string table entry was out of range')
+        start = strings_start + offset
+        return str (buffer [start:start + length], 'utf-8')
+
+    data = dict ()  # type: Dict [SectionType, memoryview]
+    for section, offset, size in _SECTION.iter_unpack (buffer [sections_start:symbols_start]):
+        if offset + size > len (buffer):
+            raise FormatError ('Executable section data was truncated')
+        try:
+            data [SectionType (section)] = buffer [offset:offset + size]
+        except ValueError:
+            raise FormatError ('Unknown section type ({0})'.format (section))
+
+    symbols = [Symbol (name=string (name_offset, name_length), address=address, size=size)
+               for address, size, name_offset, name_length in _SYMBOL.iter_unpack (buffer [symbols_start:debug_start])]
+    debug = list ()
+    for entry in debug_format.iter_unpack (buffer [debug_start:strings_start]):
+        address, line_base, digest_offset, digest_length = entry [:4]
+        debug_digest = string (*entry [4:]) if len (entry) > 4 else ''
+        debug.append (DebugLineRecord (address=address, fragment=string (digest_offset, digest_length),
+                                       line_base=line_base, debug_digest=debug_digest or None))
+
+    record = RepositoryRecord (
+        path=string (path_offset, path_length) if flags & _HAS_REPOSITORY_PATH else None,
+        uuid=uuid.UUID (bytes=repository_uuid) if flags & _HAS_REPOSITORY_UUID else None)
+    return Executable (symbols=symbols, uuid=uuid.UUID (bytes=exe_uuid), repository_record=record, data=data,
+                       debug=debug)
+
+# eof store/exeformat.py
@@ -22,10 +22,9 @@
 
 import logging
 import uuid
-from typing import Iterable, Mapping, Optional
-
-import yaml
+from typing import BinaryIO, Iterable, Mapping, Optional, TextIO
 
+from . import types
 from .types import DebugLineRecord, SectionType
 
 _logger = logging.getLogger (__name__)
@@ -33,6 +32,7 @@ _logger = logging.getLogger (__name__)
 
 class Symbol:
     YAML_NAME = '!symbol'
+    __slots__ = ('name', 'address', 'size')
 
     def __init__ (self, name: str, address: int, size: int) -> None:
         self.name = name
@@ -43,7 +43,7 @@ class Symbol:
     def yaml_representer (dumper, symbol):
         """Emits a Symbol instance to YAML."""
 
-        return dumper.represent_mapping (Symbol.YAML_NAME, symbol.__dict__)
+        return dumper.represent_mapping (Symbol.YAML_NAME, {'name': symbol.name, 'address': symbol.address, 'size': symbol.size})
 
     @staticmethod
     def yaml_constructor (loader, node) -> 'Symbol':
@@ -53,12 +53,9 @@ class Symbol:
         return Symbol (**value)
 
 
-yaml.add_representer (Symbol, Symbol.yaml_representer)
-yaml.add_constructor (Symbol.YAML_NAME, Symbol.yaml_constructor)
-
-
 class RepositoryRecord:
     YAML_NAME = '!repo_record'
+    __slots__ = ('path', 'uuid')
 
     def __init__ (self, path: str, uuid: uuid.UUID):
         self.path = path
@@ -68,7 +65,7 @@ class RepositoryRecord:
     def yaml_representer (dumper, rr):
         """Emits a RepositoryRecord instance to YAML."""
 
-        return dumper.represent_mapping (RepositoryRecord.YAML_NAME, rr.__dict__)
+        return dumper.represent_mapping (RepositoryRecord.YAML_NAME, {'path': rr.path, 'uuid': rr.uuid})
 
     @staticmethod
     def yaml_constructor (loader, node) -> 'RepositoryRecord':
@@ -78,10 +75,6 @@ class RepositoryRecord:
         return RepositoryRecord (**value)
 
 
-yaml.add_representer (RepositoryRecord, RepositoryRecord.yaml_representer)
-yaml.add_constructor (RepositoryRecord.YAML_NAME, RepositoryRecord.yaml_constructor)
-
-
 class Executable:
     YAML_NAME = '!executable'
 
@@ -100,13 +93,55 @@ class Executable:
             uuid = uuid.UUID ()
         return Executable (symbols=list (), uuid=uuid, repository_record=repository_record, data=dict (), debug=list ())
 
-    def write (self, stream) -> None:
+    @staticmethod
+    def read (path: str) -> 'Executable':
+        """
+        Reads an executable file. The file may contain a binary or a YAML executable: the format is determined from its
+        content. A binary executable is memory-mapped rather than read.
+
+        :param path: The path of the executable file.
+        :return: A new Executable instance.
+        """
+
+        from . import exeformat
+
+        with open (path, 'rb') as stream:
+            if not exeformat.is_binary (stream):
+                yaml = _yaml_module ()
+                _logger.debug ("Loading YAML executable '%s'", path)
+                try:
+                    exe = yaml.load (stream, Loader=yaml.Loader)
+                except (ValueError, yaml.YAMLError):
+                    raise RuntimeError ("Executable '{0}' was not valid".format (path))
+                if not isinstance (exe, Executable):
+                    raise RuntimeError ("File '{0}' did not contain an executable".format (path))
+                return exe
+
+        _logger.debug ("Loading binary executable '%s'", path)
+        try:
+            return exeformat.read (path)
+        except exeformat.FormatError as ex:
+            raise RuntimeError ("Executable '{0}' was not valid ({1})".format (path, ex))
+
+    def write (self, stream: BinaryIO) -> None:
+        """
+        Writes the executable in the binary format (see store.exeformat).
+        :param stream: The binary stream to which the executable will be written.
+        """
+
+        from . import exeformat
+
+        _logger.info ("Writing executable")
+        exeformat.write (self, stream)
+
+    def write_yaml (self, stream: TextIO) -> None:
         """
         Writes the executable as YAML.
         :param stream: The stream to which the executable will be written.
         """
 
-        _logger.info ("Writing executable")
+        _logger.info ("Writing YAML executable")
+        yaml = _yaml_module ()
         yaml.dump (data=self, stream=stream, explicit_start=True, explicit_end=True)
 
     @staticmethod
@@ -122,7 +157,26 @@ class Executable:
         return Executable (**loader.construct_mapping (node))
 
 
-yaml.add_representer (Executable, Executable.yaml_representer)
-yaml.add_constructor (Executable.YAML_NAME, Executable.yaml_constructor)
+# The type, YAML tag, representer, and constructor of each of the objects in a YAML executable.
+_YAML_TYPES = (
+    (Symbol, Symbol.YAML_NAME, Symbol.yaml_representer, Symbol.yaml_constructor),
+    (RepositoryRecord, RepositoryRecord.YAML_NAME, RepositoryRecord.yaml_representer, RepositoryRecord.yaml_constructor),
+    (Executable, Executable.YAML_NAME, Executable.yaml_representer, Executable.yaml_constructor),
+)
+
+_yaml = None
+
+
+def _yaml_module ():
+    """Returns the PyYAML module once the executable's types have been registered with it (see store.types)."""
+
+    global _yaml
+    if _yaml is None:
+        yaml = types.yaml_module ()
+        for cls, tag, representer, constructor in _YAML_TYPES:
+            yaml.add_representer (cls, representer)
+            yaml.add_constructor (tag, constructor)
+        _yaml = yaml
+    return _yaml
 
 # eof store/exetypes.py
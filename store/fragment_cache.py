@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A cache of fragments which is shared by every repository on a host. Compilers consult it before generating the code
+for a procedure and add the fragments that they generate, so a procedure that has been compiled for any repository
+(an earlier CI workspace, say) need not be compiled again for a new one.
+
+The cache is a directory laid out like the objects of a loose-object repository (see store.looseformat): each fragment
+is held by a file named by its digest which contains a single store.codec record. A file is written under a temporary
+name and then renamed into place, so processes can use the cache at once without locking: a reader sees either a
+complete file or none. A file's modification time records when it was last used. Once the files' total size exceeds
+the cache's limit, trim() removes the least recently used until the cache is comfortably below it.
+"""
+
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from . import codec
+from .types import Fragment
+
+_logger = logging.getLogger (__name__)
+
+# The default limit on the size of a cache, in bytes.
+DEFAULT_SIZE = 256 << 20
+
+# Trimming removes files until the cache is no larger than this fraction of its limit, so that it isn't needed again
+# straight away.
+_LOW_WATER = 0.9
+
+_TEMP_PREFIX = '.tmp-'
+# A temporary file which is older than this (in seconds) was left behind by a writer that failed.
+_TEMP_LIFETIME = 60 * 60
+
+_DIGEST = re.compile ('[0-9a-f]{3,}')
+
+
+class FragmentCache:
+    """A directory of fragments keyed by digest with least-recently-used eviction."""
+
+    def __init__ (self, directory: str, max_size: int = DEFAULT_SIZE) -> None:
+        """
+        :param directory: The cache directory. It is created when the first fragment is added.
+        :param max_size: The limit, in bytes, on the total size of the cached fragments.
+        """
+
+        self.directory = os.path.abspath (directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.added = 0
+
+    def __path (self, digest: str) -> Optional [str]:
+        if not _DIGEST.fullmatch (digest):
+            return None
+        return os.path.join (self.directory, digest [:2], digest [2:])
+
+    def get (self, digest: str) -> Optional [Fragment]:
+        """Returns the cached fragment with the given digest or None if there isn't one."""
+
+        path = self.__path (digest)
+        data = None
+        if path is not None:
+            try:
+                with open (path, 'rb') as f:
+                    data = f.read ()
+            except FileNotFoundError:
+                pass
+            except OSError as ex:
+                # An entry which can't be read (for example, because of its permissions) is treated as a miss.
+                _logger.warning ("Could not read fragment %s from the cache '%s' (%s)", digest, self.directory, ex)
+        if data is None:
+            self.misses += 1
+            return None
+
+        try:
+            codec.check_record (data, 0)
+            kind, (record_digest, fragment) = codec.decode_record (data, 0)
+            if kind != codec.RecordKind.fragment or record_digest != digest:
+                raise codec.CodecError ('The record was not that of fragment {0}'.format (digest))
+        except codec.CodecError as ex:
+            _logger.warning ("Removing invalid cache entry '%s' (%s)", path, ex)
+            _unlink (path)
+            self.misses += 1
+            return None
+
+        # Mark the entry as recently used.
+        try:
+            os.utime (path)
+        except OSError:
+            pass
+        self.hits += 1
+        return fragment
+
+    def put (self, digest: str, fragment: Fragment) -> None:
+        """Adds a fragment to the cache. Failure to write it is not an error: the cache is just an optimization."""
+
+        path = self.__path (digest)
+        if path is None or fragment is None or os.path.exists (path):
+            return
+        data = codec.encode_fragment (digest, fragment)
+        directory = os.path.dirname (path)
+        try:
+            os.makedirs (directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp (dir=directory, prefix=_TEMP_PREFIX)
+            try:
+                with os.fdopen (fd, 'wb') as f:
+                    f.write (data)
+                os.replace (temp_path, path)
+            except:
+                _unlink (temp_path)
+                raise
+        except OSError as ex:
+            _logger.warning ("Could not add fragment %s to the cache '%s' (%s)", digest, self.directory, ex)
+            return
+        self.added += 1
+
+    def __entries (self) -> Iterator [Tuple [str, os.stat_result]]:
+        """Yields the path and status of each of the cache's files, removing abandoned temporary files."""
+
+        now = time.time ()
+        for subdirectory in _scandir (self.directory):
+            if not subdirectory.is_dir ():
+                continue
+            for entry in _scandir (subdirectory.path):
+                try:
+                    st = entry.stat ()
+                except FileNotFoundError:
+                    continue
+                if not entry.name.startswith (_TEMP_PREFIX):
+                    yield entry.path, st
+                elif now - st.st_mtime > _TEMP_LIFETIME:
+                    _unlink (entry.path)
+
+    def size (self) -> int:
+        """Returns the total size of the cached fragments in bytes."""
+
+        return sum (st.st_size for _, st in self.__entries ())
+
+    def trim (self) -> int:
+        """
+        Removes the least recently used fragments if the cache is larger than its limit.
+
+        :return: The number of fragments removed.
+        """
+
+        entries = list (self.__entries ())  # type: List [Tuple [str, os.stat_result]]
+        total = sum (st.st_size for _, st in entries)
+        if total <= self.max_size:
+            return 0
+
+        entries.sort (key=lambda entry: entry [1].st_mtime)
+        target = int (self.max_size * _LOW_WATER)
+        removed = 0
+        for path, st in entries:
+            if total <= target:
+                break
+            _unlink (path)
+            total -= st.st_size
+            removed += 1
+        _logger.info ("Removed %d fragments from the cache '%s'", removed, self.directory)
+        return removed
+
+
+def _scandir (directory: str) -> List [os.DirEntry]:
+    try:
+        with os.scandir (directory) as entries:
+            return list (entries)
+    except FileNotFoundError:
+        return []
+
+
+def _unlink (path: str) -> None:
+    try:
+        os.unlink (path)
+    except FileNotFoundError:
+        pass
+
+
+def parse_size (text: str) -> int:
+    """
+    Converts a size such as '500M' to a number of bytes. The suffixes K, M, and G (which may be in lower case) are
+    powers of 1024.
+
+    :raise ValueError: If the size is not valid.
+    """
+
+    match = re.fullmatch (r'\s*(\d+)\s*([kKmMgG]?)\s*', text)
+    if match is None:
+        raise ValueError ("'{0}' is not a valid size".format (text))
+    shift = {'': 0, 'k': 10, 'm': 20, 'g': 30} [match.group (2).lower ()]
+    return int (match.group (1)) << shift
+
+# eof store/fragment_cache.py
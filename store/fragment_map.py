@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A mapping from fragment digest to fragment whose key set is known up-front but whose values are only decoded when they
+are first accessed. This allows a tool to load a large repository and pay only for the fragments that it uses.
+"""
+
+import abc
+import collections
+import collections.abc
+from typing import Iterable, Iterator, Mapping, Optional
+
+from .types import Fragment
+
+
+class FragmentMap (collections.abc.MutableMapping):
+    """
+    The base class for lazily loaded fragment collections. Subclasses implement _load() to decode an individual
+    fragment from the underlying store.
+
+    Fragments that are added or replaced after the map is loaded are held in memory until the repository is written.
+    Fragments that are loaded from the store are cached. The cache is unbounded unless a cache size is given, in
+    which case the least recently used fragments are discarded once it is full.
+    """
+
+    def __init__ (self, digests: Iterable [str], cache_size: Optional [int] = None) -> None:
+        """
+        :param digests: The digests of the fragments available from the store.
+        :param cache_size: The maximum number of decoded fragments to be retained or None for no limit.
+        """
+
+        assert cache_size is None or cache_size >= 0
+        self.__keys = dict.fromkeys (digests)
+        self.__modified = dict ()
+        self.__deleted = False
+        self.__cache = collections.OrderedDict ()
+        self.__cache_size = cache_size
+
+    @abc.abstractmethod
+    def _load (self, digest: str) -> Optional [Fragment]:
+        """
+        Decodes the fragment with the given digest from the store.
+
+        :param digest: The digest of a fragment that was present when the map was created.
+        :return: The fragment or None if the fragment has been stripped.
+        """
+        raise NotImplementedError ('FragmentMap._load')
+
+    def _reset (self, digests: Iterable [str] = ()) -> None:
+        """
+        Called by a subclass once all of the changes to the map have been written to its store.
+
+        :param digests: The digests of any fragments that were added to the store by someone else.
+        """
+
+        self.__keys.update (dict.fromkeys (digests))
+        self.__modified = dict ()
+        self.__deleted = False
+
+    def is_modified (self, digest: str) -> bool:
+        """Returns True if the fragment with the given digest has been added or replaced since it was loaded."""
+
+        return digest in self.__modified
+
+    def modified (self) -> Mapping [str, Optional [Fragment]]:
+        """Returns the fragments which have been added or replaced since they were loaded."""
+
+        return self.__modified
+
+    def has_deletions (self) -> bool:
+        """Returns True if any fragment has been removed since the map was loaded."""
+
+        return self.__deleted
+
+    def __getitem__ (self, digest: str) -> Optional [Fragment]:
+        try:
+            return self.__modified [digest]
+        except KeyError:
+            pass
+
+        cache = self.__cache
+        try:
+            fragment = cache [digest]
+        except KeyError:
+            if digest not in self.__keys:
+                raise
+            fragment = self._load (digest)
+            if self.__cache_size != 0:
+                cache [digest] = fragment
+                if self.__cache_size is not None and len (cache) > self.__cache_size:
+                    cache.popitem (last=False)
+        else:
+            cache.move_to_end (digest)
+        return fragment
+
+    def __setitem__ (self, digest: str, fragment: Optional [Fragment]) -> None:
+        self.__keys [digest] = None
+        self.__modified [digest] = fragment
+        self.__cache.pop (digest, None)
+
+    def __delitem__ (self, digest: str) -> None:
+        del self.__keys [digest]
+        self.__deleted = True
+        self.__modified.pop (digest, None)
+        self.__cache.pop (digest, None)
+
+    def __contains__ (self, digest: object) -> bool:
+        return digest in self.__keys
+
+    def __iter__ (self) -> Iterator [str]:
+        return iter (self.__keys)
+
+    def __len__ (self) -> int:
+        return len (self.__keys)
+
+    def __repr__ (self) -> str:
+        return '{classname}({count} fragments, {cached} cached, {modified} modified)'.format (
+                classname=self.__class__.__name__,
+                count=len (self.__keys),
+                cached=len (self.__cache),
+                modified=len (self.__modified))
+
+# eof store/fragment_map.py
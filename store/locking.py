@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Advisory locks which serialize access to a program repository by multiple processes. The lock is held on a separate
+file alongside the repository (its path with '.lock' appended) because the repository file itself may be replaced
+while the lock is held.
+
+Any number of processes may hold the shared lock (used while reading) at once; the exclusive lock (used while
+writing) is held by a single process. The locks are re-entrant within a process: acquiring a lock that is already
+held succeeds immediately. A process that holds the shared lock may not acquire the exclusive lock.
+"""
+
+import contextlib
+import logging
+import os
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+_logger = logging.getLogger (__name__)
+
+
+class _Held:
+    def __init__ (self, exclusive: bool) -> None:
+        self.exclusive = exclusive
+        self.depth = 1
+
+
+_held = dict ()  # type: Dict [str, _Held]
+
+
+def lock_path (path: str) -> str:
+    """Returns the path of the lock file for the repository at 'path'."""
+
+    return path + '.lock'
+
+
+def _acquire (fd: int, exclusive: bool) -> None:
+    if fcntl is not None:
+        fcntl.flock (fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    else:
+        # Windows offers only exclusive locks. msvcrt.locking() gives up after 10 seconds so keep trying.
+        while True:
+            try:
+                msvcrt.locking (fd, msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                pass
+
+
+def _release (fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock (fd, fcntl.LOCK_UN)
+    else:
+        os.lseek (fd, 0, os.SEEK_SET)
+        msvcrt.locking (fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def _lock (path: str, exclusive: bool) -> Iterator [None]:
+    key = os.path.abspath (lock_path (path))
+    held = _held.get (key)
+    if held is not None:
+        if exclusive and not held.exclusive:
+            raise RuntimeError ("Cannot upgrade the shared lock on '{0}'".format (path))
+        held.depth += 1
+        try:
+            yield
+        finally:
+            held.depth -= 1
+        return
+
+    fd = os.open (key, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        _logger.debug ("Waiting for %s lock on '%s'", 'exclusive' if exclusive else 'shared', path)
+        _acquire (fd, exclusive)
+        _held [key] = _Held (exclusive)
+        try:
+            yield
+        finally:
+            del _held [key]
+            _release (fd)
+    finally:
+        os.close (fd)
+
+
+def shared (path: str):
+    """A context manager which holds the shared lock on the repository at 'path'."""
+
+    return _lock (path, exclusive=False)
+
+
+def exclusive (path: str):
+    """A context manager which holds the exclusive lock on the repository at 'path'."""
+
+    return _lock (path, exclusive=True)
+
+# eof store/locking.py
@@ -0,0 +1,721 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A program repository held in a directory of small files in the manner of git's loose objects:
+
+    <path>/repository            magic number and the repository's UUID
+    <path>/objects/ab/cdef...    one file per fragment, named by its digest
+    <path>/tickets/<uuid>        one file per ticket
+    <path>/objects/pack/         pack files, each holding many fragments (see store.pack)
+    <path>/links/<time>-<uuid>   one file per link, named so that they sort in the order in which they were added
+    <path>/settings              the repository's settings, if it has any
+
+Each file holds a single store.codec record and is written under a temporary name before being renamed into place,
+so a reader never sees a partially written file. A fragment's digest is derived from its content so a fragment file,
+once written, never changes. Compilations which add to the repository at the same time therefore create disjoint
+sets of files and need not wait for one another; they hold the shared lock (see store.locking) only so that a garbage
+collection, which holds the exclusive lock, cannot run at the same time.
+
+Checking whether a fragment is present is a stat() call followed, if the fragment is not loose, by a search of the
+pack indices. Because the files are immutable, a repository's objects can be distributed by hard-linking or
+rsync-ing the object directories. repack() moves the loose objects into a pack so that the number of files (and the
+cost of opening them) stays constant as the repository grows.
+"""
+
+import collections.abc
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+from . import codec, locking, pack
+from .types import Fragment, LinksRecord, Repository, TicketFileEntry
+
+_logger = logging.getLogger (__name__)
+
+MAGIC = b'ToyLoose'
+
+_HEADER_NAME = 'repository'
+_OBJECTS = 'objects'
+_TICKETS = 'tickets'
+_LINKS = 'links'
+_SETTINGS = 'settings'
+_PACKS = 'pack'
+_TEMP_PREFIX = '.tmp-'
+
+_DIGEST = re.compile ('[0-9a-f]{3,}')
+
+
+class FormatError (Exception):
+    pass
+
+
+def is_loose (path: str) -> bool:
+    """Checks whether 'path' names a loose-object repository directory."""
+
+    return os.path.isdir (path)
+
+
+def _object_path (root: str, digest: str) -> str:
+    if not _DIGEST.fullmatch (digest):
+        raise ValueError ("Fragment digest '{0}' cannot be stored as a loose object".format (digest))
+    return os.path.join (root, _OBJECTS, digest [:2], digest [2:])
+
+
+def _write_file (path: str, data: bytes) -> None:
+    """Atomically writes 'data' to the file at 'path', replacing any existing file."""
+
+    directory = os.path.dirname (path)
+    os.makedirs (directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp (dir=directory, prefix=_TEMP_PREFIX)
+    try:
+        with os.fdopen (fd, 'wb') as f:
+            f.write (data)
+        os.replace (temp_path, path)
+    except:
+        os.unlink (temp_path)
+        raise
+
+
+def _read_record (path: str):
+    with open (path, 'rb') as f:
+        data = f.read ()
+    try:
+        codec.check_record (data, 0)
+        return codec.decode_record (data, 0) [1]
+    except codec.CodecError as ex:
+        raise FormatError ("File '{0}' was not valid ({1})".format (path, ex))
+
+
+def _read_settings (root: str) -> Dict [str, str]:
+    try:
+        return _read_record (os.path.join (root, _SETTINGS))
+    except FileNotFoundError:
+        return dict ()
+
+
+def _write_settings (root: str, settings: Mapping [str, str]) -> None:
+    path = os.path.join (root, _SETTINGS)
+    if settings:
+        _write_file (path, codec.encode_settings (settings))
+    else:
+        _unlink (path)
+
+
+def _list (directory: str) -> Iterator [str]:
+    """Yields the names of the files in 'directory', ignoring temporary files."""
+
+    try:
+        with os.scandir (directory) as entries:
+            for entry in entries:
+                if not entry.name.startswith (_TEMP_PREFIX):
+                    yield entry.name
+    except FileNotFoundError:
+        pass
+
+
+def _list_objects (root: str) -> Iterator [str]:
+    """Yields the digests of the fragments held in the repository at 'root'."""
+
+    objects = os.path.join (root, _OBJECTS)
+    for shard in _list (objects):
+        if len (shard) == 2:
+            for name in _list (os.path.join (objects, shard)):
+                yield shard + name
+
+
+def _pack_directory (root: str) -> str:
+    return os.path.join (root, _OBJECTS, _PACKS)
+
+
+def _packed_kind (packs: Sequence [pack.Pack], digest: str) -> Optional [bytes]:
+    """Returns the record kind of the fragment with the given digest in 'packs' or None if they don't hold it."""
+
+    for p in packs:
+        offset = p.find (digest)
+        if offset is not None:
+            return bytes ((p.record_kind (offset).value,))
+    return None
+
+
+def _write_header (root: str, repository_uuid: uuid.UUID, replace: bool) -> None:
+    """
+    Writes the file which identifies the repository.
+
+    :param replace: If false, an existing header is left alone: the first of several processes that create the
+                    repository at the same time determines its UUID.
+    """
+
+    path = os.path.join (root, _HEADER_NAME)
+    data = MAGIC + repository_uuid.bytes
+    if replace:
+        _write_file (path, data)
+        return
+    if os.path.exists (path):
+        return
+
+    os.makedirs (root, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp (dir=root, prefix=_TEMP_PREFIX)
+    try:
+        with os.fdopen (fd, 'wb') as f:
+            f.write (data)
+        # Unlike a rename, link() fails if the header already exists.
+        os.link (temp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink (temp_path)
+
+
+def _read_header (root: str) -> uuid.UUID:
+    try:
+        with open (os.path.join (root, _HEADER_NAME), 'rb') as f:
+            data = f.read ()
+    except FileNotFoundError:
+        if any (True for _ in _list (root)):
+            raise FormatError ("Directory '{0}' is not a repository".format (root))
+        # An empty directory is a new repository.
+        return uuid.uuid4 ()
+    if len (data) != len (MAGIC) + 16 or not data.startswith (MAGIC):
+        raise FormatError ('Repository header was invalid')
+    return uuid.UUID (bytes=data [len (MAGIC):])
+
+
+def _record_kind (path: str) -> Optional [bytes]:
+    """Returns the first byte (the record kind) of the file at 'path' or None if there is no such file."""
+
+    try:
+        with open (path, 'rb') as f:
+            return f.read (1)
+    except FileNotFoundError:
+        return None
+
+
+def _write_object (root: str, digest: str, fragment: Optional [Fragment], packs: Sequence [pack.Pack] = ()) -> None:
+    """Writes a fragment's file unless the repository (including 'packs') already holds the same fragment."""
+
+    path = _object_path (root, digest)
+    kind = bytes (((codec.RecordKind.stripped if fragment is None else codec.RecordKind.fragment).value,))
+    if _record_kind (path) != kind and _packed_kind (packs, digest) != kind:
+        _write_file (path, codec.encode_fragment (digest, fragment))
+
+
+def _copy_object (root: str, digest: str, source: str, packs: Sequence [pack.Pack] = ()) -> None:
+    """
+    Copies a fragment's file from another repository unless this repository (including 'packs') already holds the
+    same fragment. The new file is a hard link to the original where possible.
+    """
+
+    path = _object_path (root, digest)
+    kind = _record_kind (source)
+    if _record_kind (path) == kind or _packed_kind (packs, digest) == kind:
+        return
+
+    directory = os.path.dirname (path)
+    os.makedirs (directory, exist_ok=True)
+    temp_path = os.path.join (directory, _TEMP_PREFIX + uuid.uuid4 ().hex)
+    try:
+        try:
+            os.link (source, temp_path)
+        except OSError:
+            shutil.copyfile (source, temp_path)
+        os.replace (temp_path, path)
+    except:
+        _unlink (temp_path)
+        raise
+
+
+class _Store:
+    """
+    A loose-object repository from which a Repository instance was loaded. It records the tickets and links as they
+    were loaded so that only the changes to them need to be written.
+    """
+
+    def __init__ (self, root: str) -> None:
+        self.root = os.path.abspath (root)
+        self.tickets = dict ()  # type: Dict [uuid.UUID, TicketFileEntry]
+        self.links = dict ()  # type: Dict [str, LinksRecord] (file name -> link)
+        self.settings = dict ()  # type: Dict [str, str]
+        self.packs = pack.open_packs (_pack_directory (self.root))
+
+    def refresh_packs (self) -> bool:
+        """
+        Maps any packs which have been created since the store was opened.
+
+        :return: True if the set of packs changed.
+        """
+
+        packs = pack.open_packs (_pack_directory (self.root))
+        if [p.index_path for p in packs] == [p.index_path for p in self.packs]:
+            for p in packs:
+                p.close ()
+            return False
+        self.packs = packs
+        return True
+
+    def load_packed (self, digest: str) -> Optional [Fragment]:
+        """
+        Loads a fragment from the store's packs.
+
+        :raise KeyError: if the packs don't hold the fragment.
+        """
+
+        for p in self.packs:
+            offset = p.find (digest)
+            if offset is not None:
+                return p.load (offset)
+        raise KeyError (digest)
+
+
+class _LooseFragments (collections.abc.MutableMapping):
+    """
+    The fragments of a loose-object repository. Unlike the other stores, the set of digests is not loaded up-front:
+    each membership test or lookup goes directly to the file system. Fragments that are added, replaced, or removed
+    are held in memory until the repository is written.
+    """
+
+    def __init__ (self, store: _Store) -> None:
+        self.store = store
+        self.__modified = dict ()
+        self.__deleted = set ()
+
+    def is_modified (self, digest: str) -> bool:
+        return digest in self.__modified
+
+    def modified (self) -> Mapping [str, Optional [Fragment]]:
+        return self.__modified
+
+    def deleted (self) -> Set [str]:
+        return self.__deleted
+
+    def has_deletions (self) -> bool:
+        return len (self.__deleted) > 0
+
+    def _reset (self) -> None:
+        self.__modified = dict ()
+        self.__deleted = set ()
+
+    def object_path (self, digest: str) -> Optional [str]:
+        """
+        Returns the path of the file holding an unmodified fragment or None if the fragment has been modified or is
+        held in a pack.
+        """
+
+        if digest in self.__modified or digest in self.__deleted:
+            return None
+        path = _object_path (self.store.root, digest)
+        return path if os.path.isfile (path) else None
+
+    def __getitem__ (self, digest: str) -> Optional [Fragment]:
+        try:
+            return self.__modified [digest]
+        except KeyError:
+            pass
+        if digest in self.__deleted or not _DIGEST.fullmatch (digest):
+            raise KeyError (digest)
+        try:
+            _, fragment = _read_record (_object_path (self.store.root, digest))
+            return fragment
+        except FileNotFoundError:
+            pass
+
+        store = self.store
+        try:
+            return store.load_packed (digest)
+        except KeyError:
+            # The fragment may have been moved into a pack since the packs were last examined.
+            if not store.refresh_packs ():
+                raise
+        try:
+            _, fragment = _read_record (_object_path (store.root, digest))
+            return fragment
+        except FileNotFoundError:
+            return store.load_packed (digest)
+
+    def __setitem__ (self, digest: str, fragment: Optional [Fragment]) -> None:
+        self.__modified [digest] = fragment
+        self.__deleted.discard (digest)
+
+    def __delitem__ (self, digest: str) -> None:
+        if digest not in self:
+            raise KeyError (digest)
+        self.__modified.pop (digest, None)
+        self.__deleted.add (digest)
+
+    def __contains__ (self, digest: object) -> bool:
+        if digest in self.__modified:
+            return True
+        if digest in self.__deleted or not isinstance (digest, str) or not _DIGEST.fullmatch (digest):
+            return False
+        if os.path.exists (_object_path (self.store.root, digest)):
+            return True
+        if any (digest in p for p in self.store.packs):
+            return True
+        return self.store.refresh_packs () and any (digest in p for p in self.store.packs)
+
+    def __iter__ (self) -> Iterator [str]:
+        seen = set (self.__deleted)
+        seen.update (self.__modified)
+        yield from self.__modified
+        for digest in _list_objects (self.store.root):
+            if digest not in seen:
+                seen.add (digest)
+                yield digest
+        for p in self.store.packs:
+            for digest in p.digests ():
+                if digest not in seen:
+                    seen.add (digest)
+                    yield digest
+
+    def __len__ (self) -> int:
+        return sum (1 for _ in self)
+
+    def __repr__ (self) -> str:
+        return '{classname}({root}, {modified} modified)'.format (classname=self.__class__.__name__,
+                                                                   root=self.store.root,
+                                                                   modified=len (self.__modified))
+
+
+def read (path: str) -> Repository:
+    """
+    Reads a loose-object repository. The tickets and links are loaded immediately; fragments are read from their
+    files when they are used.
+
+    :param path: The path of the repository directory.
+    :return: A new Repository instance.
+    """
+
+    store = _Store (path)
+    repository_uuid = _read_header (store.root)
+
+    tickets = dict ()
+    for name in _list (os.path.join (store.root, _TICKETS)):
+        try:
+            ticket, entry = _read_record (os.path.join (store.root, _TICKETS, name))
+        except FileNotFoundError:
+            continue  # Removed since the directory was listed.
+        tickets [ticket] = entry
+    links = dict ()
+    for name in sorted (_list (os.path.join (store.root, _LINKS))):
+        try:
+            links [name] = _read_record (os.path.join (store.root, _LINKS, name))
+        except FileNotFoundError:
+            continue
+
+    store.tickets = dict (tickets)
+    store.links = links
+    store.settings = _read_settings (store.root)
+    return Repository (fragments=_LooseFragments (store),
+                       links=list (links.values ()),
+                       tickets=tickets,
+                       uuid=repository_uuid,
+                       settings=dict (store.settings))
+
+
+def _ticket_path (root: str, ticket: uuid.UUID) -> str:
+    return os.path.join (root, _TICKETS, ticket.hex)
+
+
+def _write_links (root: str, links: Iterable [LinksRecord]) -> Dict [str, LinksRecord]:
+    """
+    Writes a file for each of 'links'.
+
+    :return: A dictionary mapping the new files' names to the links.
+    """
+
+    result = dict ()
+    stamp = 0
+    for link in links:
+        stamp = max (time.time_ns (), stamp + 1)
+        name = '{0:016x}-{1}'.format (stamp, link.uuid.hex)
+        _write_file (os.path.join (root, _LINKS, name), codec.encode_link (link))
+        result [name] = link
+    return result
+
+
+def _unlink (path: str) -> None:
+    try:
+        os.unlink (path)
+    except FileNotFoundError:
+        pass
+
+
+def _update (repository: Repository, store: _Store) -> None:
+    """Writes the changes made to a repository since it was loaded from 'store'."""
+
+    root = store.root
+    fragments = repository.fragments
+    _write_header (root, repository.uuid, replace=True)
+    if repository.settings != store.settings:
+        _write_settings (root, repository.settings)
+        store.settings = dict (repository.settings)
+
+    deleted = fragments.deleted ()
+    for digest in deleted:
+        _unlink (_object_path (root, digest))
+    if any (digest in p for p in store.packs for digest in deleted):
+        # A pack is never modified, so the fragments are removed by writing the packs again without them.
+        _repack (store, lambda digest, kind: digest not in deleted)
+    for digest, fragment in fragments.modified ().items ():
+        _write_object (root, digest, fragment, packs=store.packs)
+
+    tickets = repository.tickets
+    for ticket in store.tickets:
+        if ticket not in tickets:
+            _unlink (_ticket_path (root, ticket))
+    for ticket, entry in tickets.items ():
+        if store.tickets.get (ticket) is not entry:
+            _write_file (_ticket_path (root, ticket), codec.encode_ticket (ticket, entry))
+
+    # Links are kept in the order in which they were added, so new links follow those that are already stored.
+    current = set (map (id, repository.links))
+    for name, link in store.links.items ():
+        if id (link) not in current:
+            _unlink (os.path.join (root, _LINKS, name))
+    links = {name: link for name, link in store.links.items () if id (link) in current}
+    written = set (map (id, links.values ()))
+    links.update (_write_links (root, (link for link in repository.links if id (link) not in written)))
+
+    store.tickets = dict (tickets)
+    store.links = links
+    fragments._reset ()
+
+
+def _repack (store: _Store, keep: Callable [[str, codec.RecordKind], bool]) -> None:
+    """
+    Moves the store's loose objects and the contents of its existing packs into a single new pack. Fragments for which
+    keep(digest, record kind) returns False are dropped. A loose object takes precedence over a packed copy of the
+    same fragment (for example, a fragment that was stripped after it was packed).
+    """
+
+    root = store.root
+    old_packs = store.packs
+    packed = list ()  # The paths of the loose objects that will be in the new pack (or dropped).
+    dropped = 0
+
+    def records () -> Iterator [Tuple [str, bytes]]:
+        nonlocal dropped
+        seen = set ()
+        for digest in list (_list_objects (root)):
+            path = _object_path (root, digest)
+            try:
+                with open (path, 'rb') as f:
+                    data = f.read ()
+            except FileNotFoundError:
+                continue
+            try:
+                kind, _, _ = codec.check_record (data, 0)
+            except codec.CodecError as ex:
+                raise FormatError ("File '{0}' was not valid ({1})".format (path, ex))
+            seen.add (digest)
+            if not keep (digest, kind):
+                dropped += 1
+                packed.append (path)
+            elif pack.can_pack (digest):
+                packed.append (path)
+                yield digest, data
+        for p in old_packs:
+            for digest, offset in p.entries ():
+                if digest not in seen:
+                    seen.add (digest)
+                    if keep (digest, p.record_kind (offset)):
+                        yield digest, p.raw_record (offset)
+                    else:
+                        dropped += 1
+
+    index_path = pack.write (_pack_directory (root), records ())
+    _logger.info ('Removed %d fragments', dropped)
+
+    for p in old_packs:
+        p.close ()
+        if p.index_path != index_path:
+            # The index goes first so that readers never see a pack without its data.
+            _unlink (p.index_path)
+            _unlink (p.path)
+    for path in packed:
+        _unlink (path)
+    store.packs = pack.open_packs (_pack_directory (root))
+
+
+def _replace (repository: Repository, root: str) -> None:
+    """Makes the contents of the repository directory at 'root' (which is created if necessary) match 'repository'."""
+
+    fragments = repository.fragments
+    loose = fragments if isinstance (fragments, _LooseFragments) else None
+
+    _write_header (root, repository.uuid, replace=True)
+    _write_settings (root, repository.settings)
+    for digest in fragments:
+        source = loose.object_path (digest) if loose is not None else None
+        if source is not None:
+            _copy_object (root, digest, source)
+        else:
+            _write_object (root, digest, fragments [digest])
+    for digest in list (_list_objects (root)):
+        if digest not in fragments:
+            _unlink (_object_path (root, digest))
+    # Every fragment is now held as a loose object, so any packs that the directory held are no longer needed.
+    shutil.rmtree (_pack_directory (root), ignore_errors=True)
+
+    tickets = {ticket.hex: (ticket, entry) for ticket, entry in repository.tickets.items ()}
+    for name in list (_list (os.path.join (root, _TICKETS))):
+        if name not in tickets:
+            _unlink (os.path.join (root, _TICKETS, name))
+    for ticket, entry in tickets.values ():
+        _write_file (_ticket_path (root, ticket), codec.encode_ticket (ticket, entry))
+
+    for name in list (_list (os.path.join (root, _LINKS))):
+        _unlink (os.path.join (root, _LINKS, name))
+    _write_links (root, repository.links)
+
+
+def write (repository: Repository, path: str) -> None:
+    """
+    Writes a repository as a directory of loose objects. If the repository was loaded from the same directory, only
+    the changes made since it was loaded are written. Otherwise the directory's contents are made to match the
+    repository: fragments that are already present are kept and those that are not part of the repository are
+    removed. A file at 'path' (a repository in another format) is replaced by the directory.
+
+    :param repository: The repository to be written.
+    :param path: The path of the repository directory.
+    """
+
+    with locking.exclusive (path):
+        fragments = repository.fragments
+        if isinstance (fragments, _LooseFragments) and fragments.store.root == os.path.abspath (path):
+            _logger.debug ("Updating loose-object repository '%s'", fragments.store.root)
+            _update (repository, fragments.store)
+            return
+
+        _logger.debug ("Writing loose-object repository '%s'", os.path.abspath (path))
+        if not os.path.exists (path) or os.path.isdir (path):
+            _replace (repository, path)
+            return
+
+        temp_path = path + '.t'
+        shutil.rmtree (temp_path, ignore_errors=True)
+        try:
+            _replace (repository, temp_path)
+            os.unlink (path)
+            os.rename (temp_path, path)
+        finally:
+            shutil.rmtree (temp_path, ignore_errors=True)
+
+
+def merge (path: str,
+           fragments: Mapping [str, Optional [Fragment]],
+           tickets: Mapping [uuid.UUID, TicketFileEntry],
+           links: List [LinksRecord],
+           base: Optional [Repository] = None) -> None:
+    """
+    Adds fragments, tickets, and links to the loose-object repository at 'path', which is created if it does not
+    exist. Fragments that the repository already holds are skipped.
+
+    :param path: The path of the repository directory.
+    :param fragments: The fragments to be added.
+    :param tickets: The tickets to be added.
+    :param links: The links to be added.
+    :param base: A copy of the repository which was previously read from 'path', if any.
+    """
+
+    with locking.shared (path):
+        _write_header (path, base.uuid if base is not None else uuid.uuid4 (), replace=False)
+        packs = pack.open_packs (_pack_directory (path))
+        try:
+            for digest, fragment in fragments.items ():
+                if not os.path.exists (_object_path (path, digest)) and not any (digest in p for p in packs):
+                    _write_object (path, digest, fragment)
+        finally:
+            for p in packs:
+                p.close ()
+        for ticket, entry in tickets.items ():
+            _write_file (_ticket_path (path, ticket), codec.encode_ticket (ticket, entry))
+        _write_links (path, links)
+
+
+def repack (path: str, roots: Optional [Iterable [str]] = None) -> None:
+    """
+    Moves the loose objects of the repository at 'path' and the contents of its existing packs into a single new pack
+    so that the number of files, and the cost of finding a fragment, stays constant as the repository grows.
+
+    :param path: The path of the repository directory.
+    :param roots: If given, fragments which are not referenced by a ticket and are not one of 'roots' are dropped.
+        Stripped fragments are always kept.
+    """
+
+    with locking.exclusive (path):
+        store = _Store (path)
+        _read_header (store.root)
+        if roots is None:
+            _repack (store, lambda digest, kind: True)
+        else:
+            live = set (roots)
+            for name in _list (os.path.join (store.root, _TICKETS)):
+                _, entry = _read_record (os.path.join (store.root, _TICKETS, name))
+                live.update (entry.fragment_digests ())
+            _repack (store, lambda digest, kind: kind == codec.RecordKind.stripped or digest in live)
+        for p in store.packs:
+            p.close ()
+
+
+def collect (path: str,
+             dead_tickets: Iterable [uuid.UUID],
+             dead_links: Iterable [LinksRecord],
+             roots: Iterable [str]) -> None:
+    """
+    Garbage collects a loose-object repository in place. The files of the dead tickets and links are removed and the
+    repository is repacked without the fragments that are no longer referenced by a ticket and are not one of 'roots'.
+    Stripped fragments are always kept.
+
+    :param path: The path of the repository directory.
+    :param dead_tickets: The tickets to be removed.
+    :param dead_links: The links to be removed.
+    :param roots: The digests of additional fragments to be kept.
+    """
+
+    with locking.exclusive (path):
+        for ticket in dead_tickets:
+            _unlink (_ticket_path (path, ticket))
+        dead = set ((link.uuid, link.file) for link in dead_links)
+        for name in list (_list (os.path.join (path, _LINKS))):
+            link = _read_record (os.path.join (path, _LINKS, name))
+            if (link.uuid, link.file) in dead:
+                _unlink (os.path.join (path, _LINKS, name))
+        repack (path, roots)
+
+
+def compact (path: str) -> None:
+    """Removes any temporary files left behind by writers which were interrupted."""
+
+    with locking.exclusive (path):
+        for directory, _, names in os.walk (path):
+            for name in names:
+                if name.startswith (_TEMP_PREFIX):
+                    _logger.info ("Removing '%s'", os.path.join (directory, name))
+                    os.unlink (os.path.join (directory, name))
+
+# eof store/looseformat.py
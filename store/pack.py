@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Pack files consolidate many fragments into a single file so that looking up a fragment costs neither an open() nor a
+seek per fragment. A pack is a pair of files:
+
+    pack-<name>.pack:  magic (8 bytes), version (u16), flags (u16), record count (u32),
+                       followed by the fragment records (see store.codec)
+    pack-<name>.idx:   magic (8 bytes), version (u16), flags (u16), record count (u32),
+                       fan-out table: 256 x u32 (the number of digests whose first byte is less than or equal to i),
+                       digests: count x 16 bytes (the binary form of each MD5 digest, sorted),
+                       offsets: count x u64 (the offset of each digest's record in the .pack file)
+
+Both files are memory-mapped. The fan-out table narrows the search for a digest to the entries which share its first
+byte, which are then binary-searched, so a lookup touches a handful of pages however many fragments the pack holds.
+The index is written after the pack, so a pack is not used until it is complete.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from . import codec
+from .types import Fragment
+
+MAGIC = b'ToyPack\x00'
+INDEX_MAGIC = b'ToyPIdx\x00'
+VERSION = 1
+
+_HEADER = struct.Struct ('>8sHHI')
+_FANOUT = struct.Struct ('>256I')
+_U32 = struct.Struct ('>I')
+_OFFSET = struct.Struct ('>Q')
+_KEY_SIZE = 16
+
+_PACK_NAME = re.compile (r'pack-[0-9a-f]{40}\.idx')
+_MD5_DIGEST = re.compile ('[0-9a-f]{32}')
+
+
+class FormatError (Exception):
+    pass
+
+
+def can_pack (digest: str) -> bool:
+    """Returns True if the fragment with the given digest can be stored in a pack (i.e. it is an MD5 digest)."""
+
+    return _MD5_DIGEST.fullmatch (digest) is not None
+
+
+def _map (path: str):
+    with open (path, 'rb') as f:
+        return mmap.mmap (f.fileno (), 0, access=mmap.ACCESS_READ)
+
+
+class Pack:
+    """A pack file and its index."""
+
+    def __init__ (self, index_path: str) -> None:
+        """
+        Maps a pack and its index.
+
+        :param index_path: The path of the pack's index (.idx) file.
+        """
+
+        self.index_path = index_path
+        self.path = index_path [:-len ('.idx')] + '.pack'
+        index = _map (index_path)
+        try:
+            magic, version, _, self.count = _HEADER.unpack_from (index, 0)
+            if magic != INDEX_MAGIC or version != VERSION:
+                raise FormatError ("Pack index '{0}' was not valid".format (index_path))
+            self.__keys_start = _HEADER.size + _FANOUT.size
+            self.__offsets_start = self.__keys_start + self.count * _KEY_SIZE
+            if len (index) < self.__offsets_start + self.count * _OFFSET.size:
+                raise FormatError ("Pack index '{0}' was truncated".format (index_path))
+            self.__data = _map (self.path)
+        except:
+            index.close ()
+            raise
+        self.__index = index
+
+    def close (self) -> None:
+        self.__index.close ()
+        self.__data.close ()
+
+    def __fanout (self, byte: int) -> int:
+        return _U32.unpack_from (self.__index, _HEADER.size + byte * _U32.size) [0]
+
+    def __key (self, position: int) -> bytes:
+        start = self.__keys_start + position * _KEY_SIZE
+        return self.__index [start:start + _KEY_SIZE]
+
+    def find (self, digest: str) -> Optional [int]:
+        """Returns the offset of the record for the fragment with the given digest or None if it is not present."""
+
+        if not can_pack (digest):
+            return None
+        key = bytes.fromhex (digest)
+        low = self.__fanout (key [0] - 1) if key [0] > 0 else 0
+        high = self.__fanout (key [0])
+        while low < high:
+            middle = (low + high) // 2
+            k = self.__key (middle)
+            if k < key:
+                low = middle + 1
+            elif k > key:
+                high = middle
+            else:
+                return _OFFSET.unpack_from (self.__index, self.__offsets_start + middle * _OFFSET.size) [0]
+        return None
+
+    def __contains__ (self, digest: str) -> bool:
+        return self.find (digest) is not None
+
+    def load (self, offset: int) -> Optional [Fragment]:
+        """Decodes the fragment whose record is at 'offset'."""
+
+        try:
+            _, (_, fragment) = codec.decode_record (self.__data, offset)
+        except codec.CodecError as ex:
+            raise FormatError ("Pack '{0}' was not valid ({1})".format (self.path, ex))
+        return fragment
+
+    def record_kind (self, offset: int) -> codec.RecordKind:
+        return codec.record_header (self.__data, offset) [0]
+
+    def raw_record (self, offset: int) -> bytes:
+        """Returns the encoded record at 'offset'."""
+
+        _, _, end = codec.record_header (self.__data, offset)
+        return self.__data [offset:end]
+
+    def digests (self) -> Iterator [str]:
+        """Yields the digests of the pack's fragments in sorted order."""
+
+        for position in range (self.count):
+            yield self.__key (position).hex ()
+
+    def entries (self) -> Iterator [Tuple [str, int]]:
+        """Yields the digest and record offset of each of the pack's fragments."""
+
+        for position in range (self.count):
+            yield (self.__key (position).hex (),
+                   _OFFSET.unpack_from (self.__index, self.__offsets_start + position * _OFFSET.size) [0])
+
+
+def open_packs (directory: str) -> List [Pack]:
+    """Maps every complete pack in 'directory'."""
+
+    try:
+        names = sorted (name for name in os.listdir (directory) if _PACK_NAME.fullmatch (name))
+    except FileNotFoundError:
+        return list ()
+    return [Pack (os.path.join (directory, name)) for name in names]
+
+
+def write (directory: str, records: Iterable [Tuple [str, bytes]]) -> Optional [str]:
+    """
+    Writes a new pack.
+
+    :param directory: The directory in which the pack is created.
+    :param records: (digest, encoded fragment record) pairs. Each digest must satisfy can_pack().
+    :return: The path of the new pack's index or None if there were no records.
+    """
+
+    os.makedirs (directory, exist_ok=True)
+    entries = list ()  # (key, offset) pairs
+    fd, temp_pack = tempfile.mkstemp (dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen (fd, 'wb') as f:
+            f.write (_HEADER.pack (MAGIC, VERSION, 0, 0))
+            for digest, record in records:
+                assert can_pack (digest)
+                entries.append ((bytes.fromhex (digest), f.tell ()))
+                f.write (record)
+            f.seek (0)
+            f.write (_HEADER.pack (MAGIC, VERSION, 0, len (entries)))
+        if not entries:
+            os.unlink (temp_pack)
+            return None
+
+        entries.sort ()
+        name = os.path.join (directory, 'pack-' + hashlib.sha1 (b''.join (key for key, _ in entries)).hexdigest ())
+        fanout = [0] * 256
+        for key, _ in entries:
+            fanout [key [0]] += 1
+        for byte in range (1, 256):
+            fanout [byte] += fanout [byte - 1]
+
+        fd, temp_index = tempfile.mkstemp (dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen (fd, 'wb') as f:
+                f.write (_HEADER.pack (INDEX_MAGIC, VERSION, 0, len (entries)))
+                f.write (_FANOUT.pack (*fanout))
+                f.write (b''.join (key for key, _ in entries))
+                f.write (b''.join (_OFFSET.pack (offset) for _, offset in entries))
+            os.replace (temp_pack, name + '.pack')
+            os.replace (temp_index, name + '.idx')
+        except:
+            os.unlink (temp_index)
+            raise
+        return name + '.idx'
+    finally:
+        try:
+            os.unlink (temp_pack)
+        except FileNotFoundError:
+            pass
+
+# eof store/pack.py
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Source path prefix maps. The debug information records the path of each procedure's source file, and that path
+contributes to the digest of its debug record. Replacing the machine-specific prefix of the path (the root of the
+checkout, for example) with a common one means that the same file compiled on different machines, or from different
+directories, produces the same debug record so that its fragments can be shared.
+
+A map is a sequence of 'OLD=NEW' entries: a path which begins with the directory OLD has that prefix replaced by NEW.
+The entries are tried in order and the first that matches is used. The map may be given to toycc with
+-fdebug-prefix-map and held by the repository's 'debug-prefix-map' setting, whose value separates the entries with
+os.pathsep.
+"""
+
+import os.path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# The name of the repository setting which holds the map.
+SETTING = 'debug-prefix-map'
+
+_SEPARATORS = os.sep + (os.altsep or '')
+
+
+def parse_entry (text: str) -> Tuple [str, str]:
+    """
+    Splits an 'OLD=NEW' map entry. OLD may not be empty; NEW may be, in which case the matching paths are made
+    relative.
+
+    :raise ValueError: If the entry is not valid.
+    """
+
+    old, separator, new = text.partition ('=')
+    if not separator or not old:
+        raise ValueError ("Prefix map entry '{0}' must have the form OLD=NEW".format (text))
+    return old, new
+
+
+def parse_setting (value: Optional [str]) -> List [Tuple [str, str]]:
+    """Returns the entries held by the value of the repository's map setting (which may be None)."""
+
+    return [parse_entry (entry) for entry in value.split (os.pathsep) if entry] if value else []
+
+
+def _strip_prefix (path: str, prefix: str) -> Optional [str]:
+    """
+    If 'prefix' names 'path' or one of its parent directories, returns the remainder of the path without a leading
+    separator. Otherwise returns None.
+    """
+
+    if not path.startswith (prefix):
+        return None
+    rest = path [len (prefix):]
+    if rest and not prefix.endswith (tuple (_SEPARATORS)) and rest [0] not in _SEPARATORS:
+        return None
+    return rest.lstrip (_SEPARATORS)
+
+
+def _join (prefix: str, rest: str) -> str:
+    if not rest:
+        return prefix or '.'
+    return os.path.join (prefix, rest) if prefix else rest
+
+
+class PrefixMap:
+    """An ordered list of (OLD, NEW) path prefix replacements."""
+
+    def __init__ (self, entries: Iterable [Tuple [str, str]] = ()) -> None:
+        self.entries = list (entries)
+
+    def __add__ (self, other: 'PrefixMap') -> 'PrefixMap':
+        return PrefixMap (self.entries + other.entries)
+
+    def __bool__ (self) -> bool:
+        return bool (self.entries)
+
+    def map (self, path: str) -> str:
+        """Replaces the prefix of 'path' given by the first entry that matches it."""
+
+        for old, new in self.entries:
+            rest = _strip_prefix (path, old)
+            if rest is not None:
+                return _join (new, rest)
+        return path
+
+    def unmap (self, path: str, exists: Callable [[str], bool] = os.path.exists) -> str:
+        """
+        Reverses the mapping of a path recorded by the debug information. Several prefixes may have been mapped to
+        the same one, so the first of the original paths that exists is chosen.
+
+        :param path: A path produced by map().
+        :param exists: A function which checks whether a file exists.
+        :return: The original path or, if none of them exist, 'path' itself.
+        """
+
+        for old, new in self.entries:
+            if new:
+                rest = _strip_prefix (path, new)
+            else:
+                rest = path if not os.path.isabs (path) else None
+            if rest is not None:
+                candidate = _join (old, rest)
+                if exists (candidate):
+                    return candidate
+        return path
+
+# eof store/prefix_map.py
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A program repository held in an SQLite database. Fragments, their sections and fixups, tickets, and links are each
+stored in their own table so that a fragment can be found by its digest without loading anything else, and so that
+garbage collection can be performed by the database (see collect()).
+
+The database uses SQLite's write-ahead log, so any number of tools may read the repository while another writes to
+it. Every write is a single SQLite transaction.
+"""
+
+import contextlib
+import logging
+import os
+import uuid
+from typing import BinaryIO, Iterable, Iterator, List, Mapping, Optional
+
+from .fragment_map import FragmentMap
+from .types import Fragment, FSection, LinksRecord, Repository, SectionType, TicketFileEntry, TicketRecord, XFixup
+
+_logger = logging.getLogger (__name__)
+
+MAGIC = b'SQLite format 3\x00'
+
+# The number of seconds to wait for another process to finish writing to the database.
+_TIMEOUT = 60.0
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS repository (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    uuid BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fragments (
+    digest TEXT PRIMARY KEY,
+    primary_section INTEGER  -- NULL for a stripped fragment
+);
+CREATE TABLE IF NOT EXISTS sections (
+    digest TEXT NOT NULL REFERENCES fragments (digest) ON DELETE CASCADE,
+    section INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (digest, section)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS xfixups (
+    digest TEXT NOT NULL REFERENCES fragments (digest) ON DELETE CASCADE,
+    section INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (digest, section, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ifixups (
+    digest TEXT NOT NULL REFERENCES fragments (digest) ON DELETE CASCADE,
+    section INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (digest, section, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tickets (
+    uuid BLOB PRIMARY KEY,
+    path TEXT NOT NULL,
+    input_digest TEXT
+);
+CREATE TABLE IF NOT EXISTS ticket_members (
+    ticket BLOB NOT NULL REFERENCES tickets (uuid) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    line_base INTEGER,
+    debug_digest TEXT,
+    PRIMARY KEY (ticket, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ticket_members_digest ON ticket_members (digest);
+CREATE TABLE IF NOT EXISTS links (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uuid BLOB NOT NULL,
+    file TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+'''
+
+
+def is_sqlite (stream: BinaryIO) -> bool:
+    """
+    Checks whether a stream contains an SQLite database by looking for its magic number. The stream position is left
+    unchanged.
+    """
+
+    position = stream.tell ()
+    magic = stream.read (len (MAGIC))
+    stream.seek (position)
+    return magic == MAGIC
+
+
+def _connect (path: str) -> 'sqlite3.Connection':
+    """Opens (creating if necessary) the database at 'path'."""
+
+    # sqlite3 is imported only when a database is first opened: most runs of the tools use the binary format, and
+    # importing it would add to their start-up time.
+    import sqlite3
+
+    # Transactions are started explicitly (see _transaction()).
+    connection = sqlite3.connect (path, timeout=_TIMEOUT, isolation_level=None, check_same_thread=False)
+    connection.execute ('PRAGMA journal_mode = WAL')
+    connection.execute ('PRAGMA foreign_keys = ON')
+    connection.executescript (_SCHEMA)
+    _upgrade (connection)
+    return connection
+
+
+def _upgrade (connection: 'sqlite3.Connection') -> None:
+    """Adds the columns which are missing from a database created by an earlier version of the schema."""
+
+    import sqlite3
+    for table, column in (('tickets', 'input_digest'), ('ticket_members', 'debug_digest')):
+        columns = {row [1] for row in connection.execute ('PRAGMA table_info ({0})'.format (table))}
+        if column not in columns:
+            try:
+                connection.execute ('ALTER TABLE {0} ADD COLUMN {1} TEXT'.format (table, column))
+            except sqlite3.OperationalError:
+                # Another process added the column first.
+                pass
+
+
+@contextlib.contextmanager
+def _transaction (connection: 'sqlite3.Connection') -> Iterator ['sqlite3.Connection']:
+    """A context manager which performs a write transaction, committing it if the block completes normally."""
+
+    connection.execute ('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except:
+        connection.execute ('ROLLBACK')
+        raise
+    connection.execute ('COMMIT')
+
+
+class _Database:
+    """
+    An SQLite repository from which a Repository instance was loaded. It records the tickets and links as they were
+    loaded so that only the changes to them need to be written.
+    """
+
+    def __init__ (self, path: str, connection: 'sqlite3.Connection') -> None:
+        self.path = os.path.abspath (path)
+        self.connection = connection
+        self.tickets = dict ()  # ticket uuid -> TicketFileEntry as stored in the database
+        self.links = list ()  # LinksRecord instances as stored in the database
+        self.settings = dict ()  # The settings as stored in the database
+
+
+class _SqlFragments (FragmentMap):
+    """The fragments of an SQLite repository. Each fragment is queried the first time that it is accessed."""
+
+    def __init__ (self, database: _Database, digests: Iterable [str], cache_size: Optional [int]) -> None:
+        super ().__init__ (digests, cache_size=cache_size)
+        self.database = database
+
+    def _load (self, digest: str) -> Optional [Fragment]:
+        return _load_fragment (self.database.connection, digest)
+
+
+def _load_fragment (connection: 'sqlite3.Connection', digest: str) -> Optional [Fragment]:
+    row = connection.execute ('SELECT primary_section FROM fragments WHERE digest = ?', (digest,)).fetchone ()
+    if row is None:
+        raise KeyError (digest)
+    if row [0] is None:
+        return None
+
+    sections = {
+        SectionType (section): FSection (data=bytes (data))
+        for section, data in connection.execute ('SELECT section, data FROM sections WHERE digest = ?', (digest,))
+    }
+    for section, offset, name in connection.execute (
+            'SELECT section, offset, name FROM xfixups WHERE digest = ? ORDER BY section, seq', (digest,)):
+        sections [SectionType (section)].xfixups.append (XFixup (offset=offset, name=name))
+    for section, offset, target in connection.execute (
+            'SELECT section, offset, target FROM ifixups WHERE digest = ? ORDER BY section, seq', (digest,)):
+        sections [SectionType (section)].ifixups.append ((offset, target))
+    return Fragment (sections=sections, primary=SectionType (row [0]))
+
+
+def _insert_fragment (connection: 'sqlite3.Connection', digest: str, fragment: Optional [Fragment],
+                      replace: bool) -> None:
+    """
+    Adds a fragment to the database.
+
+    :param replace: If true, any existing fragment with the same digest is replaced; otherwise it is kept.
+    """
+
+    if replace:
+        connection.execute ('DELETE FROM fragments WHERE digest = ?', (digest,))
+    cursor = connection.execute ('INSERT OR IGNORE INTO fragments (digest, primary_section) VALUES (?, ?)',
+                                 (digest, None if fragment is None else fragment.primary.value))
+    if cursor.rowcount == 0 or fragment is None:
+        return
+
+    for section_type, section in fragment.sections.items ():
+        connection.execute ('INSERT INTO sections (digest, section, data) VALUES (?, ?, ?)',
+                            (digest, section_type.value, section.data))
+        connection.executemany ('INSERT INTO xfixups (digest, section, seq, offset, name) VALUES (?, ?, ?, ?, ?)',
+                                ((digest, section_type.value, seq, xfixup.offset, xfixup.name)
+                                 for seq, xfixup in enumerate (section.xfixups)))
+        connection.executemany ('INSERT INTO ifixups (digest, section, seq, offset, target) VALUES (?, ?, ?, ?, ?)',
+                                ((digest, section_type.value, seq, offset, target)
+                                 for seq, (offset, target) in enumerate (section.ifixups)))
+
+
+def _insert_ticket (connection: 'sqlite3.Connection', ticket: uuid.UUID, entry: TicketFileEntry) -> None:
+    connection.execute ('DELETE FROM tickets WHERE uuid = ?', (ticket.bytes,))
+    connection.execute ('INSERT INTO tickets (uuid, path, input_digest) VALUES (?, ?, ?)',
+                        (ticket.bytes, entry.path, entry.input_digest))
+    connection.executemany ('INSERT INTO ticket_members (ticket, seq, name, digest, line_base, debug_digest) '
+                            'VALUES (?, ?, ?, ?, ?, ?)',
+                            ((ticket.bytes, seq, member.name, member.digest, member.line_base, member.debug_digest)
+                             for seq, member in enumerate (entry.members)))
+
+
+def _insert_links (connection: 'sqlite3.Connection', links: Iterable [LinksRecord]) -> None:
+    connection.executemany ('INSERT INTO links (uuid, file) VALUES (?, ?)',
+                            ((link.uuid.bytes, link.file) for link in links))
+
+
+def _set_uuid (connection: 'sqlite3.Connection', repository_uuid: uuid.UUID, replace: bool) -> None:
+    connection.execute ('INSERT OR {0} INTO repository (id, uuid) VALUES (0, ?)'.format ('REPLACE' if replace else 'IGNORE'),
+                        (repository_uuid.bytes,))
+
+
+def read (path: str, cache_size: Optional [int] = None) -> Repository:
+    """
+    Reads an SQLite repository. The tickets and links are loaded immediately, as are the fragment digests; each
+    fragment is queried when it is first used.
+
+    :param path: The path of the database.
+    :param cache_size: The maximum number of fragments to be retained once loaded or None for no limit.
+    :return: A new Repository instance.
+    """
+
+    connection = _connect (path)
+    database = _Database (path, connection)
+
+    # Read everything from a single snapshot of the database.
+    connection.execute ('BEGIN')
+    try:
+        row = connection.execute ('SELECT uuid FROM repository WHERE id = 0').fetchone ()
+        repository_uuid = uuid.UUID (bytes=row [0]) if row is not None else uuid.uuid4 ()
+        digests = [digest for digest, in connection.execute ('SELECT digest FROM fragments')]
+
+        tickets = {uuid.UUID (bytes=ticket): TicketFileEntry (path=ticket_path, members=list (),
+                                                              input_digest=input_digest)
+                   for ticket, ticket_path, input_digest in connection.execute (
+                       'SELECT uuid, path, input_digest FROM tickets')}
+        for ticket, name, digest, line_base, debug_digest in connection.execute (
+                'SELECT ticket, name, digest, line_base, debug_digest FROM ticket_members ORDER BY ticket, seq'):
+            tickets [uuid.UUID (bytes=ticket)].members.append (TicketRecord (name=name, digest=digest,
+                                                                             line_base=line_base,
+                                                                             debug_digest=debug_digest))
+        links = [LinksRecord (file=file, uuid=uuid.UUID (bytes=link_uuid))
+                 for link_uuid, file in connection.execute ('SELECT uuid, file FROM links ORDER BY id')]
+        settings = dict (connection.execute ('SELECT key, value FROM settings'))
+    finally:
+        connection.execute ('COMMIT')
+
+    database.tickets = dict (tickets)
+    database.links = list (links)
+    database.settings = dict (settings)
+    return Repository (fragments=_SqlFragments (database, digests, cache_size=cache_size),
+                       links=links,
+                       tickets=tickets,
+                       uuid=repository_uuid,
+                       settings=settings)
+
+
+def _insert_settings (connection: 'sqlite3.Connection', settings: Mapping [str, str]) -> None:
+    connection.execute ('DELETE FROM settings')
+    connection.executemany ('INSERT INTO settings (key, value) VALUES (?, ?)', settings.items ())
+
+
+def _update (repository: Repository, database: _Database) -> None:
+    """Writes the changes made to a repository since it was loaded from 'database'."""
+
+    fragments = repository.fragments
+    connection = database.connection
+    with _transaction (connection):
+        _set_uuid (connection, repository.uuid, replace=True)
+        if repository.settings != database.settings:
+            _insert_settings (connection, repository.settings)
+
+        if fragments.has_deletions ():
+            connection.execute ('CREATE TEMP TABLE IF NOT EXISTS keep (digest TEXT PRIMARY KEY) WITHOUT ROWID')
+            connection.execute ('DELETE FROM temp.keep')
+            connection.executemany ('INSERT INTO temp.keep (digest) VALUES (?)', ((digest,) for digest in fragments))
+            connection.execute ('DELETE FROM fragments WHERE digest NOT IN (SELECT digest FROM temp.keep)')
+            connection.execute ('DELETE FROM temp.keep')
+        for digest, fragment in fragments.modified ().items ():
+            _insert_fragment (connection, digest, fragment, replace=True)
+
+        tickets = repository.tickets
+        connection.executemany ('DELETE FROM tickets WHERE uuid = ?',
+                                ((ticket.bytes,) for ticket in database.tickets if ticket not in tickets))
+        for ticket, entry in tickets.items ():
+            if database.tickets.get (ticket) is not entry:
+                _insert_ticket (connection, ticket, entry)
+
+        links = repository.links
+        stored = database.links
+        if len (links) >= len (stored) and all (a is b for a, b in zip (links, stored)):
+            _insert_links (connection, links [len (stored):])
+        else:
+            connection.execute ('DELETE FROM links')
+            _insert_links (connection, links)
+
+    database.tickets = dict (tickets)
+    database.links = list (links)
+    database.settings = dict (repository.settings)
+    fragments._reset ()
+
+
+def _replace (repository: Repository, path: str) -> None:
+    """Replaces the entire contents of the database at 'path' with those of 'repository'."""
+
+    connection = _connect (path)
+    try:
+        with _transaction (connection):
+            for table in ('fragments', 'tickets', 'links'):
+                connection.execute ('DELETE FROM {0}'.format (table))
+            _set_uuid (connection, repository.uuid, replace=True)
+            for digest, fragment in repository.fragments.items ():
+                _insert_fragment (connection, digest, fragment, replace=False)
+            for ticket, entry in repository.tickets.items ():
+                _insert_ticket (connection, ticket, entry)
+            _insert_links (connection, repository.links)
+            _insert_settings (connection, repository.settings)
+    finally:
+        connection.close ()
+
+
+def write (repository: Repository, path: str) -> None:
+    """
+    Writes a repository to an SQLite database. If the repository was loaded from the same database, only the changes
+    made since it was loaded are written, so anything that other processes added in the meantime is preserved.
+    Otherwise the database's contents are replaced. A file at 'path' which is not an SQLite database is replaced.
+
+    :param repository: The repository to be written.
+    :param path: The path of the database.
+    """
+
+    fragments = repository.fragments
+    if isinstance (fragments, _SqlFragments) and fragments.database.path == os.path.abspath (path):
+        _logger.debug ("Updating SQLite repository '%s'", fragments.database.path)
+        _update (repository, fragments.database)
+        return
+
+    _logger.debug ("Writing SQLite repository '%s'", os.path.abspath (path))
+    try:
+        with open (path, 'rb') as f:
+            in_place = is_sqlite (f)
+    except FileNotFoundError:
+        in_place = True
+    if in_place:
+        _replace (repository, path)
+    else:
+        # Build the new database alongside the file that it replaces.
+        temp_path = path + '.t'
+        try:
+            _replace (repository, temp_path)
+            os.replace (temp_path, path)
+        finally:
+            for p in (temp_path, temp_path + '-wal', temp_path + '-shm'):
+                try:
+                    os.unlink (p)
+                except FileNotFoundError:
+                    pass
+
+
+def merge (path: str,
+           fragments: Mapping [str, Optional [Fragment]],
+           tickets: Mapping [uuid.UUID, TicketFileEntry],
+           links: List [LinksRecord],
+           base: Optional [Repository] = None) -> None:
+    """
+    Adds fragments, tickets, and links to the SQLite repository at 'path'. Fragments that the repository already
+    holds are skipped.
+
+    :param path: The path of the database.
+    :param fragments: The fragments to be added.
+    :param tickets: The tickets to be added.
+    :param links: The links to be added.
+    :param base: A copy of the repository which was previously read from 'path', if any.
+    """
+
+    connection = _connect (path)
+    try:
+        with _transaction (connection):
+            _set_uuid (connection, base.uuid if base is not None else uuid.uuid4 (), replace=False)
+            for digest, fragment in fragments.items ():
+                _insert_fragment (connection, digest, fragment, replace=False)
+            for ticket, entry in tickets.items ():
+                _insert_ticket (connection, ticket, entry)
+            _insert_links (connection, links)
+    finally:
+        connection.close ()
+
+
+def collect (path: str,
+             dead_tickets: Iterable [uuid.UUID],
+             dead_links: Iterable [LinksRecord],
+             roots: Iterable [str]) -> None:
+    """
+    Garbage collects an SQLite repository in place. The dead tickets and links are deleted along with every fragment
+    that is no longer referenced by a ticket and is not one of 'roots'. Stripped fragments are always kept.
+
+    :param path: The path of the database.
+    :param dead_tickets: The tickets to be removed.
+    :param dead_links: The links to be removed.
+    :param roots: The digests of additional fragments to be kept.
+    """
+
+    connection = _connect (path)
+    try:
+        with _transaction (connection):
+            connection.executemany ('DELETE FROM tickets WHERE uuid = ?', ((ticket.bytes,) for ticket in dead_tickets))
+            connection.executemany ('DELETE FROM links WHERE uuid = ? AND file = ?',
+                                    ((link.uuid.bytes, link.file) for link in dead_links))
+            connection.execute ('CREATE TEMP TABLE IF NOT EXISTS roots (digest TEXT PRIMARY KEY) WITHOUT ROWID')
+            connection.executemany ('INSERT OR IGNORE INTO temp.roots (digest) VALUES (?)',
+                                    ((digest,) for digest in roots))
+            cursor = connection.execute ('''
+                DELETE FROM fragments
+                WHERE primary_section IS NOT NULL
+                  AND digest NOT IN (SELECT digest FROM ticket_members)
+                  AND digest NOT IN (SELECT debug_digest FROM ticket_members WHERE debug_digest IS NOT NULL)
+                  AND digest NOT IN (SELECT digest FROM temp.roots)''')
+            _logger.info ('Removed %d fragments', cursor.rowcount)
+            connection.execute ('DELETE FROM temp.roots')
+    finally:
+        connection.close ()
+
+
+def compact (path: str) -> None:
+    """Folds the write-ahead log into the database and reclaims unused space."""
+
+    connection = _connect (path)
+    try:
+        connection.execute ('PRAGMA wal_checkpoint (TRUNCATE)')
+        connection.execute ('VACUUM')
+    finally:
+        connection.close ()
+
+# eof store/sqlformat.py
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+
+
+"""
+A benchmark for the memory used by the repository's records. For each size it writes a synthetic binary repository
+and, in a fresh process, reads it and decodes every fragment and ticket, reporting the time taken and the process's
+peak resident set size.
+
+    $ python -m store.test.bench_records --sizes 10000 100000 1000000
+"""
+
+import argparse
+import collections.abc
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Iterator
+
+from store.types import Fragment, FSection, Repository, SectionType, StorageFormat, TicketFileEntry, TicketRecord, \
+    XFixup
+
+_MEMBERS_PER_TICKET = 100
+
+
+def _digest (index: int) -> str:
+    return hashlib.md5 (index.to_bytes (8, byteorder='big')).hexdigest ()
+
+
+class _SyntheticFragments (collections.abc.Mapping):
+    """Fragments which are created as they are written so that large repositories can be generated."""
+
+    def __init__ (self, count: int) -> None:
+        self.__count = count
+        self.__digests = {_digest (index): index for index in range (count)}
+
+    def __getitem__ (self, digest: str) -> Fragment:
+        index = self.__digests [digest]
+        return Fragment (sections={
+            SectionType.text: FSection (data=index.to_bytes (8, byteorder='big') * 8,
+                                        xfixups=[XFixup (offset=4, name='f{0}'.format ((index + 1) % self.__count))]),
+            SectionType.debug_line: FSection (data=bytes (32)),
+        }, primary=SectionType.text)
+
+    def __iter__ (self) -> Iterator [str]:
+        return iter (self.__digests)
+
+    def __len__ (self) -> int:
+        return self.__count
+
+
+def _generate (path: str, count: int) -> None:
+    tickets = dict ()
+    for first in range (0, count, _MEMBERS_PER_TICKET):
+        members = [TicketRecord (name='f{0}'.format (index), digest=_digest (index), line_base=index)
+                   for index in range (first, min (first + _MEMBERS_PER_TICKET, count))]
+        tickets [uuid.uuid4 ()] = TicketFileEntry (path='t{0}.o'.format (first), members=members)
+    Repository (fragments=_SyntheticFragments (count), links=[], tickets=tickets, uuid=uuid.uuid4 ()).write (
+        path, storage=StorageFormat.binary)
+
+
+def _measure (path: str) -> None:
+    """Loads the repository at 'path' and prints the time taken and the peak RSS (in KiB)."""
+
+    start = time.perf_counter ()
+    repository = Repository.read (path)
+    fragments = [repository.fragments [digest] for digest in repository.fragments]
+    members = sum (len (entry.members) for entry in repository.tickets.values ())
+    elapsed = time.perf_counter () - start
+    assert members == len (fragments)
+
+    rss = resource.getrusage (resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024  # macOS reports bytes rather than KiB.
+    print (elapsed, rss)
+
+
+def main () -> None:
+    parser = argparse.ArgumentParser (description='Benchmark the memory used by repository records.')
+    parser.add_argument ('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                         help='the numbers of fragments in the synthetic repositories')
+    parser.add_argument ('--measure', metavar='PATH', help=argparse.SUPPRESS)
+    options = parser.parse_args ()
+    if options.measure:
+        _measure (options.measure)
+        return
+
+    directory = tempfile.mkdtemp ()
+    try:
+        print ('{0:>10} {1:>10} {2:>12} {3:>10}'.format ('fragments', 'load (s)', 'peak RSS (MiB)', 'bytes/frag'))
+        for count in options.sizes:
+            path = os.path.join (directory, 'repo{0}.db'.format (count))
+            _generate (path, count)
+            output = subprocess.check_output ([sys.executable, '-m', 'store.test.bench_records', '--measure', path])
+            elapsed, rss = output.split ()
+            rss = int (rss) * 1024
+            print ('{0:10d} {1:10.2f} {2:14.1f} {3:10d}'.format (count, float (elapsed), rss / (1 << 20), rss // count))
+            os.unlink (path)
+    finally:
+        for name in os.listdir (directory):
+            os.unlink (os.path.join (directory, name))
+        os.rmdir (directory)
+
+
+if __name__ == '__main__':
+    main ()
+
+# eof store/test/bench_records.py
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+
+
+"""
+A benchmark for the startup time of the tools in bin/. For each tool it runs a fresh interpreter with '-X importtime',
+imports the tool's entry module, and reports the median cumulative time taken by the import. The exit code is non-zero
+if a tool exceeds its budget, so the benchmark can guard against a change that adds an eager import of a slow module.
+
+    $ python -m store.test.bench_startup --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import sysconfig
+from typing import Dict, Mapping
+
+# The tools' entry modules and the budget (in milliseconds) for importing each of them. Each budget is about a quarter
+# more than the tool's typical time, so that a single eager import of a slow module takes it over.
+BUDGETS = {
+    'toycc.__main__': 120,
+    'toycc.client': 35,
+    'toydb.__main__': 95,
+    'toygc.__main__': 95,
+    'toyld.__main__': 120,
+    'toymerge.__main__': 60,
+    'toyrepo.__main__': 100,
+    'toystrip.__main__': 50,
+    'toyvm.__main__': 75,
+}
+
+# Modules which are slow to import and which the tools therefore import only when they first need them.
+DEFERRED = ('pyparsing', 'socketserver', 'sqlite3', 'yaml')
+
+
+def _environment () -> Mapping [str, str]:
+    # The interpreter is run with -S so that site customizations don't import modules on the tools' behalf. The
+    # path is therefore given explicitly: the root of this source tree, then the site-packages directories.
+    root = os.path.dirname (os.path.dirname (os.path.dirname (os.path.abspath (__file__))))
+    paths = sysconfig.get_paths ()
+    env = dict (os.environ)
+    env ['PYTHONPATH'] = os.pathsep.join ([root, paths ['purelib'], paths ['platlib']])
+    return env
+
+
+def import_times (module: str) -> Dict [str, int]:
+    """
+    Imports 'module' in a fresh interpreter.
+
+    :param module: The name of the module to import.
+    :return: A dictionary which maps from the name of each module imported to the cumulative time (in microseconds)
+    that its import took.
+    """
+
+    result = subprocess.run ([sys.executable, '-S', '-X', 'importtime', '-c', 'import ' + module],
+                             env=_environment (), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             universal_newlines=True, check=True)
+    times = dict ()
+    for line in result.stderr.splitlines ():
+        # Each line has the form "import time: <self> | <cumulative> | <indented module name>".
+        fields = line.split ('|')
+        if len (fields) == 3 and fields [1].strip ().isdigit ():
+            times [fields [2].strip ()] = int (fields [1])
+    return times
+
+
+def main () -> int:
+    parser = argparse.ArgumentParser (description='Benchmark the startup time of the Toy tools.')
+    parser.add_argument ('--runs', type=int, default=5, help='the number of times that each tool is started')
+    parser.add_argument ('--scale', type=float, default=1.0,
+                         help='a factor by which the budgets are multiplied (for a slower or faster machine)')
+    options = parser.parse_args ()
+
+    failures = 0
+    for module, budget in sorted (BUDGETS.items ()):
+        samples = []
+        deferred = set ()
+        for _ in range (options.runs):
+            times = import_times (module)
+            samples.append (times [module] / 1000.0)
+            deferred.update (name for name in DEFERRED if name in times)
+        elapsed = statistics.median (samples)
+        limit = budget * options.scale
+        over = elapsed > limit or deferred
+        failures += bool (over)
+        print ('{0:>18}: {1:7.1f}ms (budget {2:.0f}ms){3}{4}'.format (
+            module, elapsed, limit, ' imports ' + ', '.join (sorted (deferred)) if deferred else '',
+            ' OVER BUDGET' if over else ''))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit (main ())
+
+# eof store/test/bench_startup.py
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import uuid
+
+from store import binformat
+from store.types import Fragment, FSection, LinksRecord, Repository, SectionType, StorageFormat, TicketFileEntry, \
+    TicketRecord, XFixup
+from store.transaction import Transaction
+
+
+def make_repository () -> Repository:
+    repository = Repository.new ()
+    repository.fragments ['d1'] = Fragment (sections={
+        SectionType.text: FSection (data=b'\x00\x01text', xfixups=[XFixup (offset=-1, name='foo')]),
+        SectionType.debug_line: FSection (data=b'debug'),
+    }, primary=SectionType.text)
+    repository.fragments ['d2'] = None  # A stripped fragment.
+    repository.fragments ['g1'] = Fragment (sections={
+        SectionType.debug_line: FSection (data=b'lines'),
+    }, primary=SectionType.debug_line)
+    repository.tickets [uuid.uuid4 ()] = TicketFileEntry (path='/a/b.o', members=[
+        TicketRecord (name='main', digest='d1', line_base=3),
+        TicketRecord (name='foo', digest='d2', line_base=None),
+    ])
+    repository.tickets [uuid.uuid4 ()] = TicketFileEntry (path='/a/c.o', members=[
+        TicketRecord (name='bar', digest='d1', line_base=1),
+    ], input_digest='i1')
+    repository.tickets [uuid.uuid4 ()] = TicketFileEntry (path='/a/d.o', members=[
+        TicketRecord (name='baz', digest='d1', line_base=2, debug_digest='g1'),
+        TicketRecord (name='qux', digest='d2', line_base=None),
+    ])
+    repository.links.append (LinksRecord (file='/a/b.x', uuid=uuid.uuid4 ()))
+    repository.settings ['debug-prefix-map'] = '/a=/b'
+    return repository
+
+
+class RepositoryAssertions:
+    """A mixin for test cases which compare repositories."""
+
+    def assertRepositoryEqual (self, expected: Repository, actual: Repository) -> None:
+        self.assertEqual (expected.uuid, actual.uuid)
+        self.assertEqual (sorted (expected.fragments.keys ()), sorted (actual.fragments.keys ()))
+        for digest, fragment in expected.fragments.items ():
+            other = actual.fragments [digest]
+            if fragment is None:
+                self.assertIsNone (other)
+                continue
+            self.assertEqual (fragment.primary, other.primary)
+            self.assertEqual (set (fragment.sections.keys ()), set (other.sections.keys ()))
+            for section_type, section in fragment.sections.items ():
+                self.assertEqual (section.data, other.sections [section_type].data)
+                self.assertEqual ([(x.offset, x.name) for x in section.xfixups],
+                                  [(x.offset, x.name) for x in other.sections [section_type].xfixups])
+        self.assertEqual (expected.tickets.keys (), actual.tickets.keys ())
+        for ticket, entry in expected.tickets.items ():
+            other = actual.tickets [ticket]
+            self.assertEqual (entry.path, other.path)
+            self.assertEqual (entry.input_digest, other.input_digest)
+            self.assertEqual ([(m.name, m.digest, m.line_base, m.debug_digest) for m in entry.members],
+                              [(m.name, m.digest, m.line_base, m.debug_digest) for m in other.members])
+        self.assertEqual ([(l.file, l.uuid) for l in expected.links], [(l.file, l.uuid) for l in actual.links])
+        self.assertEqual (expected.settings, actual.settings)
+
+
+class TestBinaryFormat (RepositoryAssertions, unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def __path (self, name: str) -> str:
+        return os.path.join (self.__dir, name)
+
+    def test_round_trip (self) -> None:
+        repository = make_repository ()
+        path = self.__path ('repo.db')
+        repository.write (path)
+        with open (path, 'rb') as f:
+            self.assertTrue (binformat.is_binary (f))
+        self.assertRepositoryEqual (repository, Repository.read (path))
+
+    def test_empty_round_trip (self) -> None:
+        repository = Repository.new ()
+        path = self.__path ('repo.db')
+        repository.write (path)
+        self.assertRepositoryEqual (repository, Repository.read (path))
+
+    def test_yaml_import_export (self) -> None:
+        repository = make_repository ()
+        yaml_path = self.__path ('repo.yaml')
+        repository.write (yaml_path, storage=StorageFormat.yaml)
+        with open (yaml_path, 'rb') as f:
+            self.assertFalse (binformat.is_binary (f))
+
+        # The YAML file is recognized from its content and can be converted to the binary format.
+        imported = Repository.read (yaml_path)
+        self.assertRepositoryEqual (repository, imported)
+        binary_path = self.__path ('repo.db')
+        imported.write (binary_path)
+        self.assertRepositoryEqual (repository, Repository.read (binary_path))
+
+    def test_settings (self) -> None:
+        path = self.__path ('repo.db')
+        make_repository ().write (path)
+        repository = Repository.read (path)
+        repository.settings ['debug-prefix-map'] = '/c=/d'
+        repository.write (path)
+        self.assertEqual ({'debug-prefix-map': '/c=/d'}, Repository.read (path).settings)
+
+        # Transactions keep the settings.
+        with Transaction (path) as transaction:
+            transaction.add_fragment ('d3', None)
+        self.assertEqual ({'debug-prefix-map': '/c=/d'}, Repository.read (path).settings)
+
+        repository = Repository.read (path)
+        repository.settings.clear ()
+        repository.write (path)
+        self.assertEqual (dict (), Repository.read (path).settings)
+
+    def test_close (self) -> None:
+        path = self.__path ('repo.db')
+        make_repository ().write (path)
+        repository = Repository.read (path)
+        binformat.close (repository)
+        self.assertIsNone (repository.fragments.file.buffer)
+        # Closing an unmapped repository does nothing.
+        binformat.close (Repository.new ())
+
+    def test_read_version_1 (self) -> None:
+        # A version 1 file is the same as version 2 except that its index does not end with the settings offset.
+        repository = make_repository ()
+        repository.settings.clear ()
+        path = self.__path ('repo.db')
+        repository.write (path)
+        with open (path, 'r+b') as f:
+            f.seek (len (binformat.MAGIC))
+            f.write (struct.pack ('>H', 1))
+            f.truncate (os.path.getsize (path) - 8)
+        self.assertRepositoryEqual (repository, Repository.read (path))
+
+    def test_truncated_file (self) -> None:
+        path = self.__path ('repo.db')
+        make_repository ().write (path)
+        with open (path, 'r+b') as f:
+            f.truncate (os.path.getsize (path) - 10)
+        self.assertRaises (RuntimeError, Repository.read, path)
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_binformat.py
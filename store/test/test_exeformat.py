@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+from store import exeformat
+from store.exetypes import Executable, RepositoryRecord, Symbol
+from store.types import DebugLineRecord, SectionType
+
+
+def _make_executable () -> Executable:
+    executable = Executable.new (repository_record=RepositoryRecord (path='/a/repo.db', uuid=uuid.uuid4 ()),
+                                 uuid=uuid.uuid4 ())
+    executable.data [SectionType.text] = b'\x01\x02\x03'
+    executable.data [SectionType.data] = b'\x04'
+    executable.symbols.append (Symbol (name='main', address=0, size=2))
+    executable.symbols.append (Symbol (name='fé', address=2, size=1))
+    executable.debug.append (DebugLineRecord (address=0, fragment='0123456789abcdef0123456789abcdef', line_base=3))
+    executable.debug.append (DebugLineRecord (address=2, fragment='00112233445566778899aabbccddeeff', line_base=7,
+                                              debug_digest='ffeeddccbbaa99887766554433221100'))
+    return executable
+
+
+class TestExeFormat (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.path = os.path.join (self.__dir, 'a.x')
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def assertExecutableEqual (self, expected: Executable, actual: Executable) -> None:
+        self.assertEqual (expected.uuid, actual.uuid)
+        self.assertEqual ((expected.repository_record.path, expected.repository_record.uuid),
+                          (actual.repository_record.path, actual.repository_record.uuid))
+        self.assertEqual ({k: bytes (v) for k, v in expected.data.items ()},
+                          {k: bytes (v) for k, v in actual.data.items ()})
+        self.assertEqual ([(s.name, s.address, s.size) for s in expected.symbols],
+                          [(s.name, s.address, s.size) for s in actual.symbols])
+        self.assertEqual ([(d.address, d.fragment, d.line_base, d.debug_digest) for d in expected.debug],
+                          [(d.address, d.fragment, d.line_base, d.debug_digest) for d in actual.debug])
+
+    def test_round_trip (self) -> None:
+        executable = _make_executable ()
+        with open (self.path, 'wb') as f:
+            executable.write (f)
+        with open (self.path, 'rb') as f:
+            self.assertTrue (exeformat.is_binary (f))
+            # The section data is aligned.
+            data = f.read ()
+        self.assertEqual (0, data.index (b'\x01\x02\x03') % 8)
+        self.assertExecutableEqual (executable, Executable.read (self.path))
+
+    def test_no_repository (self) -> None:
+        executable = _make_executable ()
+        executable.repository_record = RepositoryRecord (path=None, uuid=None)
+        executable.data = dict ()
+        with open (self.path, 'wb') as f:
+            executable.write (f)
+        self.assertExecutableEqual (executable, Executable.read (self.path))
+
+    def test_read_yaml (self) -> None:
+        executable = _make_executable ()
+        with open (self.path, 'wt') as f:
+            executable.write_yaml (f)
+        self.assertExecutableEqual (executable, Executable.read (self.path))
+
+    def test_truncated (self) -> None:
+        stream = io.BytesIO ()
+        exeformat.write (_make_executable (), stream)
+        with open (self.path, 'wb') as f:
+            f.write (stream.getvalue () [:64])
+        with self.assertRaises (RuntimeError):
+            Executable.read (self.path)
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_exeformat.py
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from store.fragment_cache import FragmentCache, parse_size
+from store.types import Fragment, FSection, SectionType
+
+
+def _fragment (data: bytes) -> Fragment:
+    return Fragment (sections={SectionType.text: FSection (data=data)}, primary=SectionType.text)
+
+
+def _digest (index: int) -> str:
+    return '{0:032x}'.format (index)
+
+
+class TestFragmentCache (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.cache = FragmentCache (os.path.join (self.__dir, 'cache'))
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def __path (self, digest: str) -> str:
+        return os.path.join (self.cache.directory, digest [:2], digest [2:])
+
+    def test_get_and_put (self) -> None:
+        self.assertIsNone (self.cache.get (_digest (1)))
+        self.cache.put (_digest (1), _fragment (b'one'))
+        fragment = FragmentCache (self.cache.directory).get (_digest (1))
+        self.assertEqual (b'one', fragment.sections [SectionType.text].data)
+        self.assertEqual ((0, 1, 1), (self.cache.hits, self.cache.misses, self.cache.added))
+        # Digests which can't name a file are never cached.
+        self.cache.put ('../x', _fragment (b'x'))
+        self.assertIsNone (self.cache.get ('../x'))
+
+    def test_invalid_entry (self) -> None:
+        self.cache.put (_digest (1), _fragment (b'one'))
+        path = self.__path (_digest (1))
+        with open (path, 'r+b') as f:
+            f.seek (-1, os.SEEK_END)
+            f.write (b'?')
+        self.assertIsNone (self.cache.get (_digest (1)))
+        self.assertFalse (os.path.exists (path))
+
+        # A file holding a different fragment is not used.
+        self.cache.put (_digest (2), _fragment (b'two'))
+        os.rename (self.__path (_digest (2)), self.__path (_digest (3)))
+        self.assertIsNone (self.cache.get (_digest (3)))
+
+    def test_unreadable_entry (self) -> None:
+        # An entry which can't be read is a miss, not an error.
+        os.makedirs (self.__path (_digest (1)))
+        self.assertIsNone (self.cache.get (_digest (1)))
+        self.assertEqual ((0, 1), (self.cache.hits, self.cache.misses))
+
+    def test_trim (self) -> None:
+        for index in range (4):
+            self.cache.put (_digest (index), _fragment (bytes (1000)))
+            # Make the entries' ages distinct.
+            os.utime (self.__path (_digest (index)), (time.time () - 100 + index, time.time () - 100 + index))
+        entry_size = os.path.getsize (self.__path (_digest (0)))
+
+        self.cache.max_size = entry_size * 4
+        self.assertEqual (0, self.cache.trim ())
+
+        # Using the oldest entry makes it the most recently used.
+        self.assertIsNotNone (self.cache.get (_digest (0)))
+        self.cache.max_size = entry_size * 3
+        self.assertEqual (2, self.cache.trim ())
+        self.assertEqual ([True, False, False, True], [os.path.exists (self.__path (_digest (index)))
+                                                      for index in range (4)])
+        self.assertEqual (entry_size * 2, self.cache.size ())
+
+    def test_trim_removes_abandoned_files (self) -> None:
+        self.cache.put (_digest (1), _fragment (b'one'))
+        directory = os.path.dirname (self.__path (_digest (1)))
+        old = os.path.join (directory, '.tmp-old')
+        new = os.path.join (directory, '.tmp-new')
+        for path in (old, new):
+            open (path, 'w').close ()
+        os.utime (old, (0, 0))
+        self.cache.trim ()
+        self.assertEqual ([False, True], [os.path.exists (old), os.path.exists (new)])
+
+    def test_parse_size (self) -> None:
+        self.assertEqual (100, parse_size ('100'))
+        self.assertEqual (3 << 10, parse_size ('3k'))
+        self.assertEqual (500 << 20, parse_size ('500M'))
+        self.assertEqual (2 << 30, parse_size ('2G'))
+        self.assertRaises (ValueError, parse_size, '2T')
+        self.assertRaises (ValueError, parse_size, '')
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_fragment_cache.py
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Optional
+
+from store.fragment_map import FragmentMap
+from store.types import Fragment, FSection, Repository, SectionType
+
+
+def _fragment (data: bytes) -> Fragment:
+    return Fragment (sections={SectionType.text: FSection (data=data)}, primary=SectionType.text)
+
+
+class _CountingMap (FragmentMap):
+    def __init__ (self, digests, cache_size: Optional [int] = None) -> None:
+        super ().__init__ (digests, cache_size=cache_size)
+        self.loads = []
+
+    def _load (self, digest: str) -> Optional [Fragment]:
+        self.loads.append (digest)
+        return _fragment (digest.encode ())
+
+
+class TestFragmentMap (unittest.TestCase):
+    def test_membership_does_not_load (self) -> None:
+        fragments = _CountingMap (['a', 'b'])
+        self.assertIn ('a', fragments)
+        self.assertNotIn ('c', fragments)
+        self.assertEqual (['a', 'b'], list (fragments))
+        self.assertEqual (2, len (fragments))
+        self.assertEqual ([], fragments.loads)
+
+    def test_load_on_access (self) -> None:
+        fragments = _CountingMap (['a', 'b'])
+        self.assertEqual (b'a', fragments ['a'].sections [SectionType.text].data)
+        self.assertEqual (b'a', fragments.get ('a').sections [SectionType.text].data)
+        self.assertIsNone (fragments.get ('c'))
+        self.assertEqual (['a'], fragments.loads)
+
+    def test_bounded_cache (self) -> None:
+        fragments = _CountingMap (['a', 'b', 'c'], cache_size=2)
+        fragments ['a']
+        fragments ['b']
+        fragments ['a']  # 'a' is now the most recently used.
+        fragments ['c']  # Evicts 'b'.
+        fragments ['a']
+        fragments ['b']
+        self.assertEqual (['a', 'b', 'c', 'b'], fragments.loads)
+
+    def test_no_cache (self) -> None:
+        fragments = _CountingMap (['a'], cache_size=0)
+        fragments ['a']
+        fragments ['a']
+        self.assertEqual (['a', 'a'], fragments.loads)
+
+    def test_modification (self) -> None:
+        fragments = _CountingMap (['a', 'b'])
+        fragments ['b'] = None
+        fragments ['c'] = _fragment (b'new')
+        del fragments ['a']
+        self.assertEqual (['b', 'c'], list (fragments))
+        self.assertIsNone (fragments ['b'])
+        self.assertTrue (fragments.is_modified ('c'))
+        self.assertEqual ({'b', 'c'}, set (fragments.modified ().keys ()))
+        self.assertEqual ([], fragments.loads)
+
+
+class TestLazyRepository (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.__path = os.path.join (self.__dir, 'repo.db')
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def test_rewrite_preserves_unloaded_fragments (self) -> None:
+        repository = Repository.new ()
+        for n in range (10):
+            repository.fragments [str (n)] = _fragment (bytes ([n]))
+        repository.write (self.__path)
+
+        # Add a fragment and rewrite the repository without having loaded any of the originals.
+        repository = Repository.read (self.__path)
+        self.assertIsInstance (repository.fragments, FragmentMap)
+        repository.fragments ['new'] = _fragment (b'new')
+        repository.write (self.__path)
+        self.assertEqual (b'new', repository.fragments ['new'].sections [SectionType.text].data)
+
+        repository = Repository.read (self.__path)
+        self.assertEqual (11, len (repository.fragments))
+        for n in range (10):
+            self.assertEqual (bytes ([n]), repository.fragments [str (n)].sections [SectionType.text].data)
+        self.assertEqual (b'new', repository.fragments ['new'].sections [SectionType.text].data)
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_fragment_map.py
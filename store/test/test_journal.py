@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from store import binformat
+from store.types import Fragment, FSection, LinksRecord, Repository, SectionType, TicketFileEntry, TicketRecord
+
+
+def _fragment (data: bytes) -> Fragment:
+    return Fragment (sections={SectionType.text: FSection (data=data)}, primary=SectionType.text)
+
+
+def _data (repository: Repository, digest: str) -> bytes:
+    return repository.fragments [digest].sections [SectionType.text].data
+
+
+class TestJournal (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.path = os.path.join (self.__dir, 'repo.db')
+        repository = Repository.new ()
+        repository.fragments ['a'] = _fragment (b'a')
+        repository.write (self.path)
+        self.compacted_size = os.path.getsize (self.path)
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def __compile (self, digest: str) -> uuid.UUID:
+        """Simulates a compilation which adds a fragment and a ticket to the repository."""
+
+        repository = Repository.read (self.path)
+        repository.fragments [digest] = _fragment (digest.encode ())
+        ticket = uuid.uuid4 ()
+        repository.tickets [ticket] = TicketFileEntry (path=digest + '.o', members=[
+            TicketRecord (name=digest, digest=digest, line_base=None)
+        ])
+        repository.write (self.path)
+        return ticket
+
+    def test_additions_are_appended (self) -> None:
+        with open (self.path, 'rb') as f:
+            original = f.read ()
+        ticket = self.__compile ('b')
+        with open (self.path, 'rb') as f:
+            self.assertEqual (original, f.read (len (original)))
+
+        repository = Repository.read (self.path)
+        self.assertEqual (b'a', _data (repository, 'a'))
+        self.assertEqual (b'b', _data (repository, 'b'))
+        self.assertEqual ('b.o', repository.tickets [ticket].path)
+
+    def test_link_is_appended (self) -> None:
+        repository = Repository.read (self.path)
+        link = LinksRecord (file='a.x', uuid=uuid.uuid4 ())
+        repository.links.append (link)
+        repository.write (self.path)
+
+        repository = Repository.read (self.path)
+        self.assertEqual ([link.uuid], [l.uuid for l in repository.links])
+
+    def test_repeated_writes (self) -> None:
+        repository = Repository.read (self.path)
+        repository.fragments ['b'] = _fragment (b'b')
+        repository.write (self.path)
+        self.assertEqual (b'b', _data (repository, 'b'))
+        repository.fragments ['c'] = _fragment (b'c')
+        repository.write (self.path)
+
+        repository = Repository.read (self.path)
+        self.assertEqual (['a', 'b', 'c'], sorted (repository.fragments))
+
+    def test_replaced_fragment (self) -> None:
+        repository = Repository.read (self.path)
+        repository.fragments ['a'] = None
+        repository.write (self.path)
+        self.assertIsNone (Repository.read (self.path).fragments ['a'])
+
+    def test_deletion_rewrites (self) -> None:
+        self.__compile ('b')
+        repository = Repository.read (self.path)
+        del repository.fragments ['a']
+        repository.write (self.path)
+        self.assertEqual (['b'], list (Repository.read (self.path).fragments))
+
+    def test_torn_tail_is_discarded (self) -> None:
+        self.__compile ('b')
+        self.__compile ('c')
+        with open (self.path, 'r+b') as f:
+            f.truncate (os.path.getsize (self.path) - 3)
+
+        with self.assertLogs ('store.binformat', 'WARNING'):
+            repository = Repository.read (self.path)
+        self.assertEqual (['a', 'b'], sorted (repository.fragments))
+
+        # The next write replaces the incomplete data.
+        with self.assertLogs ('store.binformat', 'WARNING'):
+            self.__compile ('d')
+        self.assertEqual (['a', 'b', 'd'], sorted (Repository.read (self.path).fragments))
+        self.__compile ('c')
+        self.assertEqual (['a', 'b', 'c', 'd'], sorted (Repository.read (self.path).fragments))
+
+    def test_external_change_is_merged (self) -> None:
+        repository = Repository.read (self.path)
+        other = Repository.read (self.path)
+        other.fragments ['b'] = _fragment (b'b')
+        other_ticket = uuid.uuid4 ()
+        other.tickets [other_ticket] = TicketFileEntry (path='b.o', members=[])
+        other.write (self.path)
+
+        # The file has changed since 'repository' was loaded: its additions are merged with those of 'other'.
+        repository.fragments ['c'] = _fragment (b'c')
+        repository.write (self.path)
+        self.assertEqual (['a', 'b', 'c'], sorted (Repository.read (self.path).fragments))
+        self.assertEqual (['a', 'b', 'c'], sorted (repository.fragments))
+        self.assertEqual (b'b', _data (repository, 'b'))
+        self.assertIn (other_ticket, repository.tickets)
+
+        # Later writes of the merged repository are appended once more.
+        repository.fragments ['d'] = _fragment (b'd')
+        repository.write (self.path)
+        self.assertEqual (['a', 'b', 'c', 'd'], sorted (Repository.read (self.path).fragments))
+        self.assertIn (other_ticket, Repository.read (self.path).tickets)
+
+    def test_merge_refreshes_base (self) -> None:
+        # The additions are appended to the file from which 'base' was loaded, and 'base' then includes them.
+        base = Repository.read (self.path)
+        file = base.fragments.file
+        ticket = uuid.uuid4 ()
+        link = LinksRecord (file='b.x', uuid=uuid.uuid4 ())
+        binformat.merge (self.path, {'b': _fragment (b'b')}, {ticket: TicketFileEntry (path='b.o', members=[])}, [link],
+                         base=base)
+        self.assertIs (file, base.fragments.file)
+        self.assertEqual (['a', 'b'], sorted (base.fragments))
+        self.assertEqual (b'b', _data (base, 'b'))
+        self.assertEqual ('b.o', base.tickets [ticket].path)
+        self.assertEqual ([link.uuid], [l.uuid for l in base.links])
+
+    def test_compaction (self) -> None:
+        journal_sizes = list ()
+        with mock.patch.object (binformat, 'COMPACTION_THRESHOLD', 0):
+            for digest in 'bcdef':
+                self.__compile (digest)
+                file = Repository.read (self.path).fragments.file
+                self.assertLessEqual (file.journal_size (), file.journal_start)
+                journal_sizes.append (file.journal_size ())
+        # At least one of the compilations caused the whole file to be rewritten.
+        self.assertIn (0, journal_sizes)
+        self.assertEqual (list ('abcdef'), sorted (Repository.read (self.path).fragments))
+
+    def test_compact (self) -> None:
+        self.__compile ('b')
+        self.assertNotEqual (0, Repository.read (self.path).fragments.file.journal_size ())
+        binformat.compact (self.path)
+        repository = Repository.read (self.path)
+        self.assertEqual (0, repository.fragments.file.journal_size ())
+        self.assertEqual (b'b', _data (repository, 'b'))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_journal.py
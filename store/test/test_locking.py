@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from store import locking
+
+
+class TestLocking (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.path = os.path.join (self.__dir, 'repo.db')
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def test_lock_file (self) -> None:
+        with locking.shared (self.path):
+            self.assertTrue (os.path.exists (locking.lock_path (self.path)))
+
+    def test_reentrant (self) -> None:
+        with locking.exclusive (self.path):
+            with locking.exclusive (self.path):
+                with locking.shared (self.path):
+                    pass
+        # The lock was released so it can be acquired once more.
+        with locking.shared (self.path):
+            pass
+
+    def test_upgrade (self) -> None:
+        with locking.shared (self.path):
+            with self.assertRaises (RuntimeError):
+                with locking.exclusive (self.path):
+                    pass
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_locking.py
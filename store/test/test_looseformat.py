@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+from store import looseformat
+from store.test.test_binformat import RepositoryAssertions
+from store.transaction import Transaction
+from store.types import Fragment, FSection, LinksRecord, Repository, SectionType, StorageFormat, TicketFileEntry, \
+    TicketRecord
+
+
+def _digest (name: str) -> str:
+    return hashlib.md5 (name.encode ()).hexdigest ()
+
+
+def _fragment (data: bytes) -> Fragment:
+    return Fragment (sections={SectionType.text: FSection (data=data)}, primary=SectionType.text)
+
+
+def _make_repository () -> Repository:
+    repository = Repository.new ()
+    repository.fragments [_digest ('a')] = _fragment (b'a')
+    repository.fragments [_digest ('b')] = None  # A stripped fragment.
+    repository.tickets [uuid.uuid4 ()] = TicketFileEntry (path='/a/b.o', members=[
+        TicketRecord (name='a', digest=_digest ('a'), line_base=3),
+    ])
+    repository.links.append (LinksRecord (file='/a/b.x', uuid=uuid.uuid4 ()))
+    return repository
+
+
+class TestLooseFormat (RepositoryAssertions, unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.path = os.path.join (self.__dir, 'repo')
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def test_round_trip (self) -> None:
+        repository = _make_repository ()
+        repository.write (self.path, storage=StorageFormat.loose)
+        self.assertEqual (StorageFormat.loose, StorageFormat.of (self.path))
+        digest = _digest ('a')
+        self.assertTrue (os.path.isfile (os.path.join (self.path, 'objects', digest [:2], digest [2:])))
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+
+    def test_membership_reflects_other_writers (self) -> None:
+        _make_repository ().write (self.path, storage=StorageFormat.loose)
+        repository = Repository.read (self.path)
+        self.assertNotIn (_digest ('c'), repository.fragments)
+        with Transaction (self.path) as transaction:
+            transaction.add_fragment (_digest ('c'), _fragment (b'c'))
+        # No need to read the repository again: membership is a query of the file system.
+        self.assertIn (_digest ('c'), repository.fragments)
+        self.assertEqual (b'c', repository.fragments [_digest ('c')].sections [SectionType.text].data)
+        self.assertNotIn ('not a digest', repository.fragments)
+
+    def test_update (self) -> None:
+        _make_repository ().write (self.path, storage=StorageFormat.loose)
+        repository = Repository.read (self.path)
+        del repository.fragments [_digest ('a')]
+        repository.fragments [_digest ('c')] = _fragment (b'c')
+        repository.tickets.clear ()
+        repository.links.append (LinksRecord (file='/a/c.x', uuid=uuid.uuid4 ()))
+        repository.settings ['debug-prefix-map'] = '/a=/b'
+        repository.write (self.path)
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+        self.assertEqual ([], os.listdir (os.path.join (self.path, 'tickets')))
+
+        repository.settings.clear ()
+        repository.write (self.path)
+        self.assertEqual (dict (), Repository.read (self.path).settings)
+        self.assertFalse (os.path.exists (os.path.join (self.path, 'settings')))
+
+    def test_transactions_create_repository (self) -> None:
+        os.mkdir (self.path)
+        for name in 'ab':
+            with Transaction (self.path) as transaction:
+                transaction.add_fragment (_digest (name), _fragment (name.encode ()))
+                transaction.add_ticket (uuid.uuid4 (), TicketFileEntry (path=name + '.o', members=[]))
+        repository = Repository.read (self.path)
+        self.assertEqual (sorted ([_digest ('a'), _digest ('b')]), sorted (repository.fragments))
+        self.assertEqual (['a.o', 'b.o'], sorted (entry.path for entry in repository.tickets.values ()))
+
+    def test_replace_removes_unreferenced_objects (self) -> None:
+        _make_repository ().write (self.path, storage=StorageFormat.loose)
+        source = Repository.read (self.path)
+        collected = Repository.new ()
+        collected.uuid = source.uuid
+        collected.fragments [_digest ('b')] = source.fragments [_digest ('b')]
+        collected.write (self.path)
+        self.assertRepositoryEqual (collected, Repository.read (self.path))
+
+    def test_migrate_and_copy (self) -> None:
+        # A file in another format is replaced by the directory.
+        repository = _make_repository ()
+        repository.write (self.path, storage=StorageFormat.binary)
+        Repository.read (self.path).write (self.path, storage=StorageFormat.loose)
+        self.assertTrue (os.path.isdir (self.path))
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+
+        # Copying to another loose-object repository shares the object files.
+        copy_path = os.path.join (self.__dir, 'copy')
+        Repository.read (self.path).write (copy_path, storage=StorageFormat.loose)
+        self.assertRepositoryEqual (repository, Repository.read (copy_path))
+        digest = _digest ('a')
+        self.assertTrue (os.path.samefile (os.path.join (self.path, 'objects', digest [:2], digest [2:]),
+                                           os.path.join (copy_path, 'objects', digest [:2], digest [2:])))
+
+    def _object_path (self, digest: str) -> str:
+        return os.path.join (self.path, 'objects', digest [:2], digest [2:])
+
+    def test_repack (self) -> None:
+        repository = _make_repository ()
+        repository.write (self.path, storage=StorageFormat.loose)
+        opened = Repository.read (self.path)
+        looseformat.repack (self.path)
+        self.assertFalse (os.path.exists (self._object_path (_digest ('a'))))
+        self.assertEqual (2, len (os.listdir (os.path.join (self.path, 'objects', 'pack'))))
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+        # A repository that was read before the objects were packed finds them in the new pack.
+        self.assertIn (_digest ('a'), opened.fragments)
+        self.assertEqual (b'a', opened.fragments [_digest ('a')].sections [SectionType.text].data)
+
+        # New loose objects are folded into a single pack with the existing ones.
+        with Transaction (self.path) as transaction:
+            transaction.add_fragment (_digest ('a'), _fragment (b'a'))
+            transaction.add_fragment (_digest ('c'), _fragment (b'c'))
+        self.assertFalse (os.path.exists (self._object_path (_digest ('a'))))
+        looseformat.repack (self.path)
+        self.assertEqual (2, len (os.listdir (os.path.join (self.path, 'objects', 'pack'))))
+        self.assertEqual (sorted ([_digest ('a'), _digest ('b'), _digest ('c')]),
+                          sorted (Repository.read (self.path).fragments))
+
+    def test_repack_prunes_unreferenced_fragments (self) -> None:
+        _make_repository ().write (self.path, storage=StorageFormat.loose)
+        with Transaction (self.path) as transaction:
+            transaction.add_fragment (_digest ('c'), _fragment (b'c'))
+            transaction.add_fragment (_digest ('d'), _fragment (b'd'))
+        looseformat.repack (self.path, roots=[_digest ('d')])
+        # 'a' is a ticket member, 'b' is stripped, and 'd' is a root.
+        self.assertEqual (sorted ([_digest ('a'), _digest ('b'), _digest ('d')]),
+                          sorted (Repository.read (self.path).fragments))
+
+    def test_update_packed (self) -> None:
+        _make_repository ().write (self.path, storage=StorageFormat.loose)
+        looseformat.repack (self.path)
+        repository = Repository.read (self.path)
+        del repository.fragments [_digest ('a')]
+        repository.fragments [_digest ('a2')] = _fragment (b'a2')
+        repository.write (self.path)
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+
+        # Copying a packed repository to another directory writes its fragments as loose objects.
+        copy_path = os.path.join (self.__dir, 'copy')
+        Repository.read (self.path).write (copy_path, storage=StorageFormat.loose)
+        self.assertRepositoryEqual (repository, Repository.read (copy_path))
+
+    def test_compact_removes_temporary_files (self) -> None:
+        _make_repository ().write (self.path, storage=StorageFormat.loose)
+        temp_path = os.path.join (self.path, 'objects', '.tmp-abc')
+        with open (temp_path, 'wb'):
+            pass
+        looseformat.compact (self.path)
+        self.assertFalse (os.path.exists (temp_path))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_looseformat.py
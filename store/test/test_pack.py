@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from store import codec, pack
+from store.types import Fragment, FSection, SectionType
+
+
+def _digest (name: str) -> str:
+    return hashlib.md5 (name.encode ()).hexdigest ()
+
+
+def _fragment (data: bytes) -> Fragment:
+    return Fragment (sections={SectionType.text: FSection (data=data)}, primary=SectionType.text)
+
+
+class TestPack (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def test_find (self) -> None:
+        names = [str (x) for x in range (300)]
+        index_path = pack.write (self.__dir, ((_digest (name), codec.encode_fragment (_digest (name), _fragment (
+            name.encode ()))) for name in names))
+        packs = pack.open_packs (self.__dir)
+        self.assertEqual ([index_path], [p.index_path for p in packs])
+        p = packs [0]
+        try:
+            self.assertEqual (sorted (_digest (name) for name in names), list (p.digests ()))
+            for name in names:
+                offset = p.find (_digest (name))
+                self.assertIsNotNone (offset)
+                self.assertEqual (codec.RecordKind.fragment, p.record_kind (offset))
+                self.assertEqual (name.encode (), p.load (offset).sections [SectionType.text].data)
+            self.assertNotIn (_digest ('missing'), p)
+            self.assertNotIn ('not a digest', p)
+        finally:
+            p.close ()
+
+    def test_empty (self) -> None:
+        self.assertIsNone (pack.write (self.__dir, []))
+        self.assertEqual ([], os.listdir (self.__dir))
+        self.assertEqual ([], pack.open_packs (os.path.join (self.__dir, 'missing')))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_pack.py
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import unittest
+
+from store.prefix_map import PrefixMap, parse_entry, parse_setting
+
+
+class TestPrefixMap (unittest.TestCase):
+    def test_parse_entry (self) -> None:
+        self.assertEqual (('/a/b', '/src'), parse_entry ('/a/b=/src'))
+        self.assertEqual (('/a', 'x=y'), parse_entry ('/a=x=y'))
+        self.assertEqual (('/a', ''), parse_entry ('/a='))
+        self.assertRaises (ValueError, parse_entry, '/a')
+        self.assertRaises (ValueError, parse_entry, '=/a')
+
+    def test_parse_setting (self) -> None:
+        self.assertEqual ([], parse_setting (None))
+        self.assertEqual ([], parse_setting (''))
+        self.assertEqual ([('/a', '/x'), ('/b', '')], parse_setting ('/a=/x' + os.pathsep + '/b='))
+
+    def test_map (self) -> None:
+        m = PrefixMap ([('/home/a/src', '/src'), ('/home/b', ''), ('/home', '/h')])
+        self.assertEqual ('/src/x/y.toy', m.map ('/home/a/src/x/y.toy'))
+        self.assertEqual ('/src', m.map ('/home/a/src'))
+        # A prefix matches whole directory names only.
+        self.assertEqual ('/h/a/srcs/y.toy', m.map ('/home/a/srcs/y.toy'))
+        self.assertEqual ('y.toy', m.map ('/home/b/y.toy'))
+        self.assertEqual ('/other/y.toy', m.map ('/other/y.toy'))
+
+    def test_first_entry_wins (self) -> None:
+        m = PrefixMap ([('/home', '/h')]) + PrefixMap ([('/home/a', '/a')])
+        self.assertEqual ('/h/a/y.toy', m.map ('/home/a/y.toy'))
+
+    def test_unmap (self) -> None:
+        m = PrefixMap ([('/agent1/src', '/src'), ('/agent2/src', '/src'), ('/agent3', '')])
+        existing = {'/agent2/src/y.toy', '/agent3/z.toy'}
+        self.assertEqual ('/agent2/src/y.toy', m.unmap ('/src/y.toy', exists=existing.__contains__))
+        self.assertEqual ('/agent3/z.toy', m.unmap ('z.toy', exists=existing.__contains__))
+        # A path that can't be found is left alone.
+        self.assertEqual ('/src/w.toy', m.unmap ('/src/w.toy', exists=existing.__contains__))
+        self.assertEqual ('/other/y.toy', m.unmap ('/other/y.toy', exists=existing.__contains__))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_prefix_map.py
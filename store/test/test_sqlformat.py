@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import uuid
+
+from store import sqlformat
+from store.test.test_binformat import make_repository, RepositoryAssertions
+from store.transaction import Transaction
+from store.types import Fragment, FSection, LinksRecord, Repository, SectionType, StorageFormat, TicketFileEntry, \
+    TicketRecord
+
+
+def _fragment (data: bytes) -> Fragment:
+    return Fragment (sections={SectionType.text: FSection (data=data, ifixups=[(0, 'data')])}, primary=SectionType.text)
+
+
+class TestSqlFormat (RepositoryAssertions, unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.path = os.path.join (self.__dir, 'repo.db')
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def test_round_trip (self) -> None:
+        repository = make_repository ()
+        repository.write (self.path, storage=StorageFormat.sqlite)
+        self.assertEqual (StorageFormat.sqlite, StorageFormat.of (self.path))
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+
+    def test_write_keeps_format (self) -> None:
+        Repository.new ().write (self.path, storage=StorageFormat.sqlite)
+        repository = make_repository ()
+        repository.write (self.path)
+        self.assertEqual (StorageFormat.sqlite, StorageFormat.of (self.path))
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+
+    def test_update (self) -> None:
+        make_repository ().write (self.path, storage=StorageFormat.sqlite)
+        repository = Repository.read (self.path)
+        self.assertIsInstance (repository.fragments, sqlformat._SqlFragments)
+
+        del repository.fragments ['d1']
+        repository.fragments ['d3'] = _fragment (b'd3')
+        ticket = next (iter (repository.tickets))
+        repository.tickets [ticket] = TicketFileEntry (path='/a/c.o', members=[
+            TicketRecord (name='bar', digest='d3', line_base=None)
+        ])
+        repository.links.append (LinksRecord (file='/a/c.x', uuid=uuid.uuid4 ()))
+        repository.write (self.path)
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+        self.assertEqual ([(0, 'data')], Repository.read (self.path).fragments ['d3'].sections [SectionType.text].ifixups)
+
+        del repository.links [0]
+        del repository.tickets [ticket]
+        repository.write (self.path)
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+
+    def test_upgrade_schema (self) -> None:
+        # A database whose tables predate the input_digest and debug_digest columns.
+        connection = sqlite3.connect (self.path)
+        connection.executescript ('CREATE TABLE tickets (uuid BLOB PRIMARY KEY, path TEXT NOT NULL);'
+                                  'CREATE TABLE ticket_members ('
+                                  'ticket BLOB NOT NULL REFERENCES tickets (uuid) ON DELETE CASCADE, '
+                                  'seq INTEGER NOT NULL, name TEXT NOT NULL, digest TEXT NOT NULL, line_base INTEGER, '
+                                  'PRIMARY KEY (ticket, seq));')
+        ticket = uuid.uuid4 ().bytes
+        connection.execute ('INSERT INTO tickets (uuid, path) VALUES (?, ?)', (ticket, '/a/b.o'))
+        connection.execute ('INSERT INTO ticket_members (ticket, seq, name, digest) VALUES (?, 0, ?, ?)',
+                            (ticket, 'main', 'd1'))
+        connection.commit ()
+        connection.close ()
+
+        repository = Repository.read (self.path)
+        self.assertEqual ([None], [entry.input_digest for entry in repository.tickets.values ()])
+        self.assertEqual ([[None]], [[member.debug_digest for member in entry.members]
+                                     for entry in repository.tickets.values ()])
+        repository = make_repository ()
+        repository.write (self.path)
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+
+    def test_migrate_from_yaml (self) -> None:
+        repository = make_repository ()
+        yaml_path = os.path.join (self.__dir, 'repo.yaml')
+        repository.write (yaml_path, storage=StorageFormat.yaml)
+        Repository.read (yaml_path).write (self.path, storage=StorageFormat.sqlite)
+        self.assertRepositoryEqual (repository, Repository.read (self.path))
+
+    def test_transactions (self) -> None:
+        Repository.new ().write (self.path, storage=StorageFormat.sqlite)
+        first = Transaction (self.path)
+        second = Transaction (self.path)
+        first.add_fragment ('a', _fragment (b'a'))
+        second.add_fragment ('a', _fragment (b'a'))
+        second.add_fragment ('b', _fragment (b'b'))
+        first.commit ()
+        second.commit ()
+        self.assertEqual (StorageFormat.sqlite, StorageFormat.of (self.path))
+        self.assertEqual (['a', 'b'], sorted (Repository.read (self.path).fragments))
+
+    def test_collect (self) -> None:
+        repository = make_repository ()
+        repository.fragments ['d3'] = _fragment (b'd3')
+        repository.fragments ['d4'] = _fragment (b'd4')
+        live = uuid.uuid4 ()
+        repository.tickets [live] = TicketFileEntry (path='/a/c.o', members=[
+            TicketRecord (name='bar', digest='d3', line_base=None)
+        ])
+        dead_tickets = [ticket for ticket in repository.tickets if ticket != live]
+        repository.write (self.path, storage=StorageFormat.sqlite)
+
+        sqlformat.collect (self.path, dead_tickets=dead_tickets, dead_links=repository.links, roots=['d4'])
+        collected = Repository.read (self.path)
+        # d1 was referenced only by a dead ticket; d2 is stripped so it is kept.
+        self.assertEqual (['d2', 'd3', 'd4'], sorted (collected.fragments))
+        self.assertEqual ([live], list (collected.tickets))
+        self.assertEqual ([], collected.links)
+        self.assertEqual (repository.uuid, collected.uuid)
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_sqlformat.py
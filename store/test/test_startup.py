@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import unittest
+
+from store.test import bench_startup
+
+
+class TestStartup (unittest.TestCase):
+    def test_deferred_imports (self) -> None:
+        # Each tool must start without importing the modules that are only loaded when they are first needed.
+        for module in sorted (bench_startup.BUDGETS):
+            with self.subTest (module=module):
+                times = bench_startup.import_times (module)
+                self.assertIn (module, times)
+                self.assertEqual ([], [name for name in bench_startup.DEFERRED if name in times])
+
+    def test_compiler_builds_no_machine (self) -> None:
+        self.assertNotIn ('toyvm.machine', bench_startup.import_times ('toycc.__main__'))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_startup.py
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+from store.transaction import Transaction
+from store.types import Fragment, FSection, LinksRecord, Repository, SectionType, TicketFileEntry, TicketRecord
+
+
+def _fragment (data: bytes) -> Fragment:
+    return Fragment (sections={SectionType.text: FSection (data=data)}, primary=SectionType.text)
+
+
+def _compile (path: str, name: str) -> None:
+    """Simulates a compilation which adds a fragment shared by every compilation and one of its own."""
+
+    with Transaction (path) as transaction:
+        transaction.add_fragment ('shared', _fragment (b'shared'))
+        transaction.add_fragment (name, _fragment (name.encode ()))
+        transaction.add_ticket (uuid.uuid4 (), TicketFileEntry (path=name + '.o', members=[
+            TicketRecord (name=name, digest=name, line_base=None)
+        ]))
+
+
+class TestTransaction (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.path = os.path.join (self.__dir, 'repo.db')
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def test_commit_creates_repository (self) -> None:
+        _compile (self.path, 'a')
+        repository = Repository.read (self.path)
+        self.assertEqual (['a', 'shared'], sorted (repository.fragments))
+        self.assertEqual (['a.o'], [entry.path for entry in repository.tickets.values ()])
+
+    def test_abort (self) -> None:
+        _compile (self.path, 'a')
+        with self.assertRaises (ValueError):
+            with Transaction (self.path) as transaction:
+                transaction.add_fragment ('b', _fragment (b'b'))
+                raise ValueError ()
+        self.assertEqual (['a', 'shared'], sorted (Repository.read (self.path).fragments))
+        with self.assertRaises (RuntimeError):
+            transaction.commit ()
+
+    def test_interleaved_transactions (self) -> None:
+        _compile (self.path, 'a')
+        # Both transactions take their snapshot before either commits.
+        first = Transaction (self.path)
+        second = Transaction (self.path)
+        first.add_fragment ('b', _fragment (b'b'))
+        second.add_fragment ('c', _fragment (b'c'))
+        link = LinksRecord (file='c.x', uuid=uuid.uuid4 ())
+        second.add_link (link)
+        first.commit ()
+        self.assertNotIn ('b', second.repository.fragments)
+        second.commit ()
+
+        repository = Repository.read (self.path)
+        self.assertEqual (['a', 'b', 'c', 'shared'], sorted (repository.fragments))
+        self.assertEqual ([link.uuid], [l.uuid for l in repository.links])
+        # The snapshot now includes both sets of changes.
+        self.assertEqual (['a', 'b', 'c', 'shared'], sorted (second.repository.fragments))
+        self.assertEqual (b'b', second.repository.fragments ['b'].sections [SectionType.text].data)
+
+    def test_in_memory (self) -> None:
+        repository = Repository.new ()
+        repository.fragments ['a'] = _fragment (b'a')
+        with Transaction (None, repository=repository) as transaction:
+            transaction.add_fragment ('a', _fragment (b'replaced'))
+            transaction.add_fragment ('b', _fragment (b'b'))
+            transaction.add_link (LinksRecord (file='b.x', uuid=uuid.uuid4 ()))
+            self.assertNotIn ('b', repository.fragments)
+
+        # The commit added to the repository in memory, keeping the existing fragment, and wrote no file.
+        self.assertIs (repository, transaction.repository)
+        self.assertEqual (['a', 'b'], sorted (repository.fragments))
+        self.assertEqual (b'a', repository.fragments ['a'].sections [SectionType.text].data)
+        self.assertEqual (['b.x'], [link.file for link in repository.links])
+        self.assertEqual ([], os.listdir (self.__dir))
+
+        # Without a repository, the transaction begins with a new one.
+        self.assertEqual ({}, Transaction (None).repository.fragments)
+
+    def test_concurrent_processes (self) -> None:
+        names = ['p{0}'.format (index) for index in range (8)]
+        with multiprocessing.Pool (4) as pool:
+            pool.starmap (_compile, [(self.path, name) for name in names])
+
+        repository = Repository.read (self.path)
+        self.assertEqual (sorted (names + ['shared']), sorted (repository.fragments))
+        self.assertEqual (sorted (name + '.o' for name in names),
+                          sorted (entry.path for entry in repository.tickets.values ()))
+        for name in names:
+            self.assertEqual (name.encode (), repository.fragments [name].sections [SectionType.text].data)
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof store/test/test_transaction.py
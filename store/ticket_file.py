@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Reads and writes ticket files: the "object files" produced by the compiler, each of which holds the UUID of a
+compilation's ticket in the repository as a YAML document. The document is written, and normally read, without PyYAML,
+whose import would take much of the time of a short-lived tool; a file in any other form is read by PyYAML.
+"""
+
+import re
+import uuid
+
+from . import types
+
+# The form in which a ticket is written (the same as PyYAML's).
+_FORMAT = "--- !uuid '{0}'\n...\n"
+_PATTERN = re.compile (r"--- !uuid '([0-9a-fA-F-]{36})'\n\.\.\.\n\Z")
+
+
+def read (path: str) -> uuid.UUID:
+    """
+    Reads a ticket file.
+
+    :param path: The path of the ticket file.
+    :return: The UUID of the ticket.
+    :raises OSError: If the file cannot be read.
+    :raises ValueError: If the file does not contain a ticket UUID.
+    """
+
+    with open (path, 'rt') as f:
+        text = f.read ()
+    match = _PATTERN.match (text)
+    if match is not None:
+        return uuid.UUID (match.group (1))
+
+    yaml = types.yaml_module ()
+    try:
+        ticket = yaml.load (text, Loader=yaml.Loader)
+    except yaml.YAMLError as ex:
+        raise ValueError ("Ticket file '{0}' was not valid ({1})".format (path, ex))
+    if not isinstance (ticket, uuid.UUID):
+        raise ValueError ("Ticket file '{0}' did not contain a ticket UUID".format (path))
+    return ticket
+
+
+def write (path: str, ticket: uuid.UUID) -> None:
+    """Writes a ticket file which holds the UUID 'ticket'."""
+
+    with open (path, 'wt') as f:
+        f.write (_FORMAT.format (ticket))
+
+# eof store/ticket_file.py
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Transactions allow several processes (for example, the compilations run by a parallel build) to add to the same
+program repository at once without losing one another's changes.
+"""
+
+import logging
+import uuid
+from typing import Optional
+
+from . import binformat, looseformat, sqlformat
+from .types import Fragment, LinksRecord, Repository, StorageFormat, TicketFileEntry
+
+_logger = logging.getLogger (__name__)
+
+
+class Transaction:
+    """
+    A set of additions to a program repository. Beginning a transaction reads a snapshot of the repository; the
+    fragments, tickets, and links which are added are then written together by commit(). The additions are merged
+    with the repository as it is at the time of the commit, which may include changes committed by other processes
+    after the snapshot was taken.
+
+    A transaction may be used as a context manager, in which case it is committed if the block completes normally.
+
+    A transaction may instead be on a repository which is held only in memory (its path is None). Its commit adds to
+    the Repository object, which the caller can give to another tool or write to a file once it is finished with it.
+    """
+
+    def __init__ (self, path: Optional [str], create: bool = True, cache_size: Optional [int] = None,
+                  repository: Optional [Repository] = None) -> None:
+        """
+        Begins a transaction.
+
+        :param path: The path of the repository file, or None if the repository is held only in memory.
+        :param create: If true, the repository is created by the commit if it does not already exist.
+        :param cache_size: The maximum number of fragments that are kept in memory once loaded from the snapshot.
+        :param repository: A snapshot which was previously read from 'path' (for example, by an earlier transaction)
+                           and is to be used rather than reading the repository again.
+        """
+
+        self.path = path
+        if repository is None and path is None:
+            repository = Repository.new ()
+        elif repository is None:
+            repository = Repository.read (path, create=create, cache_size=cache_size)
+        self.repository = repository
+        self.__fragments = dict ()
+        self.__tickets = dict ()
+        self.__links = list ()
+        self.__finished = False
+
+    def __check (self) -> None:
+        if self.__finished:
+            raise RuntimeError ('The transaction has already been committed or aborted')
+
+    def add_fragment (self, digest: str, fragment: Optional [Fragment]) -> None:
+        """Adds a fragment. The fragment is ignored if the repository already contains one with the same digest."""
+
+        self.__check ()
+        self.__fragments [digest] = fragment
+
+    def add_ticket (self, ticket: uuid.UUID, entry: TicketFileEntry) -> None:
+        self.__check ()
+        self.__tickets [ticket] = entry
+
+    def add_link (self, link: LinksRecord) -> None:
+        self.__check ()
+        self.__links.append (link)
+
+    def commit (self) -> None:
+        """Writes the additions to the repository. The snapshot is brought up to date if possible."""
+
+        self.__check ()
+        self.__finished = True
+        _logger.debug ("Committing %d fragments, %d tickets, and %d links to '%s'",
+                       len (self.__fragments), len (self.__tickets), len (self.__links), self.path)
+        if self.path is None:
+            self.__add ()
+            return
+        merge = {
+            StorageFormat.sqlite: sqlformat.merge,
+            StorageFormat.loose: looseformat.merge,
+        }.get (StorageFormat.of (self.path), binformat.merge)
+        merge (self.path, self.__fragments, self.__tickets, self.__links, base=self.repository)
+
+    def __add (self) -> None:
+        """Adds to the repository held in memory."""
+
+        fragments = self.repository.fragments
+        for digest, fragment in self.__fragments.items ():
+            if digest not in fragments:
+                fragments [digest] = fragment
+        self.repository.tickets.update (self.__tickets)
+        self.repository.links.extend (self.__links)
+
+    def abort (self) -> None:
+        """Discards the additions."""
+
+        self.__check ()
+        self.__finished = True
+
+    def __enter__ (self) -> 'Transaction':
+        return self
+
+    def __exit__ (self, exc_type, exc_value, traceback) -> None:
+        if not self.__finished:
+            if exc_type is None:
+                self.commit ()
+            else:
+                self.abort ()
+
+# eof store/transaction.py
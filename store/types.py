@@ -24,9 +24,7 @@ import enum
 import logging
 import os
 import uuid
-from typing import Iterable, List, Mapping, Sequence
-
-import yaml
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
 
 _logger = logging.getLogger (__name__)
 
@@ -52,15 +50,12 @@ def _section_type_constructor (loader, node):
     return SectionType.__members__ [loader.construct_scalar (node)]
 
 
-yaml.add_representer (SectionType, _section_type_representer)
-yaml.add_constructor (_section_type_yaml_tag, _section_type_constructor)
-
-
 class XFixup:
     """
     The type representing a fragment's external fixup record.
     """
     YAML_NAME = '!xfixup'
+    __slots__ = ('offset', 'name')
 
     def __init__ (self, offset: int, name: str) -> None:
         self.offset = offset
@@ -76,7 +71,7 @@ class XFixup:
     def yaml_representer (dumper, xfixup):
         """Emits a XFixup record to YAML."""
 
-        return dumper.represent_mapping (XFixup.YAML_NAME, xfixup.__dict__)
+        return dumper.represent_mapping (XFixup.YAML_NAME, {'offset': xfixup.offset, 'name': xfixup.name})
 
     @staticmethod
     def yaml_constructor (loader, node) -> 'XFixup':
@@ -86,12 +81,9 @@ class XFixup:
         return XFixup (**value)
 
 
-yaml.add_representer (XFixup, XFixup.yaml_representer)
-yaml.add_constructor (XFixup.YAML_NAME, XFixup.yaml_constructor)
-
-
 class Fragment:
     YAML_NAME = '!fragment'
+    __slots__ = ('sections', 'primary')
 
     def __init__ (self, sections, primary) -> None:
         self.sections = sections  # A dict mapping section 'name' to fsection instance
@@ -110,7 +102,7 @@ class Fragment:
     def yaml_representer (dumper, fragment):
         """Emits a Fragment to YAML."""
 
-        return dumper.represent_mapping (Fragment.YAML_NAME, fragment.__dict__)
+        return dumper.represent_mapping (Fragment.YAML_NAME, {'sections': fragment.sections, 'primary': fragment.primary})
 
     @staticmethod
     def yaml_constructor (loader, node) -> 'Fragment':
@@ -120,16 +112,13 @@ class Fragment:
         return Fragment (**value)
 
 
-yaml.add_representer (Fragment, Fragment.yaml_representer)
-yaml.add_constructor (Fragment.YAML_NAME, Fragment.yaml_constructor)
-
-
 class FSection:
     """
     A Fragment Section record. Each fragment contains an array of zero or more sections.
     """
 
     YAML_NAME = '!fsection'
+    __slots__ = ('data', 'xfixups', 'ifixups')
 
     def __init__ (self, data, xfixups=None, ifixups=None) -> None:
         """
@@ -170,23 +159,34 @@ class FSection:
         return FSection (**value)
 
 
-yaml.add_representer (FSection, FSection.yaml_representer)
-yaml.add_constructor (FSection.YAML_NAME, FSection.yaml_constructor)
-
-
 class TicketRecord:  # FIXME: rename TicketMember
+    """
+    A name defined by a compilation. 'digest' is the digest of its code fragment. If the compilation produced debug
+    information, 'debug_digest' is the digest of the separate fragment which holds its debug_line data and
+    'line_base' is the line on which the definition starts; otherwise both are None.
+    """
+
     YAML_NAME = '!ticketmember'
+    __slots__ = ('name', 'digest', 'line_base', 'debug_digest')
 
-    def __init__ (self, name: str, digest: str, line_base: int) -> None:
+    def __init__ (self, name: str, digest: str, line_base: int, debug_digest: Optional [str] = None) -> None:
         self.name = name
         self.digest = digest
         self.line_base = line_base
+        self.debug_digest = debug_digest
 
     @staticmethod
     def yaml_representer (dumper, tr):
         """Emits a TicketRecord to YAML."""
 
-        return dumper.represent_mapping (TicketRecord.YAML_NAME, tr.__dict__)
+        value = {
+            'name': tr.name,
+            'digest': tr.digest,
+            'line_base': tr.line_base,
+        }
+        if tr.debug_digest is not None:
+            value ['debug_digest'] = tr.debug_digest
+        return dumper.represent_mapping (TicketRecord.YAML_NAME, value)
 
     @staticmethod
     def yaml_constructor (loader, node) -> 'TicketRecord':
@@ -196,25 +196,36 @@ class TicketRecord:  # FIXME: rename TicketMember
         return TicketRecord (**value)
 
 
-yaml.add_representer (TicketRecord, TicketRecord.yaml_representer)
-yaml.add_constructor (TicketRecord.YAML_NAME, TicketRecord.yaml_constructor)
-
-
 class TicketFileEntry:
     """This class contains a description of an individual compilation. It records the output file of the ticket file
-    produced by the compiler and a list of zero or more name to fragment mappings."""
+    produced by the compiler and a list of zero or more name to fragment mappings. The compiler may also record a
+    digest of its input (the source file and the options that affect the result) so that it can recognize an
+    unchanged file."""
 
     YAML_NAME = '!ticket'
+    __slots__ = ('path', 'members', 'input_digest')
 
-    def __init__ (self, path: str, members: Iterable [TicketRecord]) -> None:
+    def __init__ (self, path: str, members: Iterable [TicketRecord], input_digest: Optional [str] = None) -> None:
         self.path = path
         self.members = members
+        self.input_digest = input_digest
+
+    def fragment_digests (self) -> Iterator [str]:
+        """Yields the digests of the fragments, both code and debug, to which the members of the ticket refer."""
+
+        for member in self.members:
+            yield member.digest
+            if member.debug_digest is not None:
+                yield member.debug_digest
 
     @staticmethod
     def yaml_representer (dumper, tf):
         """Emits a ticket file record to YAML."""
 
-        return dumper.represent_mapping (TicketFileEntry.YAML_NAME, tf.__dict__)
+        value = {'path': tf.path, 'members': tf.members}
+        if tf.input_digest is not None:
+            value ['input_digest'] = tf.input_digest
+        return dumper.represent_mapping (TicketFileEntry.YAML_NAME, value)
 
     @staticmethod
     def yaml_constructor (loader, node):
@@ -224,16 +235,13 @@ class TicketFileEntry:
         return TicketFileEntry (**value)
 
 
-yaml.add_representer (TicketFileEntry, TicketFileEntry.yaml_representer)
-yaml.add_constructor (TicketFileEntry.YAML_NAME, TicketFileEntry.yaml_constructor)
-
-
 class LinksRecord:
     """This class contains a connection from a program repository to a native binary that was linked from it. Its
     primary purpose is to enable the garbage collector to "keep alive" fragments that are referenced by debug
     information in those files. A specific binary is identified by its path and a UUID which is created at link-time."""
 
     YAML_NAME = '!link'
+    __slots__ = ('file', 'uuid')
 
     def __init__ (self, file: str, uuid: uuid.UUID) -> None:
         self.file = file
@@ -243,7 +251,7 @@ class LinksRecord:
     def yaml_representer (dumper, lr):
         """Emits a LinksRecord to YAML."""
 
-        return dumper.represent_mapping (LinksRecord.YAML_NAME, lr.__dict__)
+        return dumper.represent_mapping (LinksRecord.YAML_NAME, {'file': lr.file, 'uuid': lr.uuid})
 
     @staticmethod
     def yaml_constructor (loader, node) -> 'LinksRecord':
@@ -253,27 +261,30 @@ class LinksRecord:
         return LinksRecord (**value)
 
 
-yaml.add_representer (LinksRecord, LinksRecord.yaml_representer)
-yaml.add_constructor (LinksRecord.YAML_NAME, LinksRecord.yaml_constructor)
-
-
 class DebugLineRecord:
     YAML_NAME = '!debuglinerecord'
+    __slots__ = ('address', 'fragment', 'line_base', 'debug_digest')
 
-    def __init__ (self, address: int, fragment: str, line_base: int) -> None:
+    def __init__ (self, address: int, fragment: str, line_base: int, debug_digest: Optional [str] = None) -> None:
         self.address = address
         self.fragment = fragment  # The referenced fragment's digest.
         self.line_base = line_base
+        # The digest of the fragment holding the debug_line data. Executables linked before the debug information
+        # was held separately have None: the data is then found in the code fragment.
+        self.debug_digest = debug_digest
 
     @staticmethod
     def yaml_representer (dumper, lr):
         """Emits a DebugListRecord to YAML."""
 
-        return dumper.represent_mapping (DebugLineRecord.YAML_NAME, {
+        value = {
             'address': lr.address,
             'fragment': lr.fragment,
             'line_base': lr.line_base,
-        })
+        }
+        if lr.debug_digest is not None:
+            value ['debug_digest'] = lr.debug_digest
+        return dumper.represent_mapping (DebugLineRecord.YAML_NAME, value)
 
     @staticmethod
     def yaml_constructor (loader, node) -> 'DebugLineRecord':
@@ -283,8 +294,38 @@ class DebugLineRecord:
         return DebugLineRecord (**value)
 
 
-yaml.add_representer (DebugLineRecord, DebugLineRecord.yaml_representer)
-yaml.add_constructor (DebugLineRecord.YAML_NAME, DebugLineRecord.yaml_constructor)
+@enum.unique
+class StorageFormat (enum.Enum):
+    """The on-disk formats in which a repository can be written."""
+
+    binary = 1
+    yaml = 2
+    sqlite = 3
+    loose = 4  # A directory of loose objects.
+
+    @staticmethod
+    def detect (stream: BinaryIO) -> 'StorageFormat':
+        """Determines the format of the repository in a stream from its content. The stream position is unchanged."""
+
+        from . import binformat, sqlformat
+
+        if binformat.is_binary (stream):
+            return StorageFormat.binary
+        if sqlformat.is_sqlite (stream):
+            return StorageFormat.sqlite
+        return StorageFormat.yaml
+
+    @staticmethod
+    def of (path: str) -> Optional ['StorageFormat']:
+        """Determines the format of the repository at 'path' or returns None if there is no such repository."""
+
+        if os.path.isdir (path):
+            return StorageFormat.loose
+        try:
+            with open (path, 'rb') as stream:
+                return StorageFormat.detect (stream)
+        except FileNotFoundError:
+            return None
 
 
 class Repository:
@@ -294,11 +335,14 @@ class Repository:
                   fragments: Mapping [str, Fragment],
                   links: Sequence [LinksRecord],
                   tickets: Mapping [uuid.UUID, TicketFileEntry],
-                  uuid: uuid.UUID) -> None:
+                  uuid: uuid.UUID,
+                  settings: Optional [Dict [str, str]] = None) -> None:
         self.fragments = fragments
         self.links = links
         self.tickets = tickets
         self.uuid = uuid
+        # Options which apply to every tool that uses the repository, set with 'toyrepo config'.
+        self.settings = settings if settings is not None else dict ()
 
     @staticmethod
     def new () -> 'Repository':
@@ -307,16 +351,30 @@ class Repository:
         return Repository (fragments={}, links=[], tickets={}, uuid=uuid.uuid4 ())
 
     @staticmethod
-    def read (path, create=False) -> 'Repository':
+    def read (path, create=False, cache_size: Optional [int] = None) -> 'Repository':
         """
-        Creates an instance of Repository from the given file path.
+        Creates an instance of Repository from the given file path. The file may contain a binary, SQLite, or YAML
+        repository: the format is determined from its content. A directory is read as a loose-object repository. The
+        fragments of a binary, SQLite, or loose-object repository are loaded on demand.
+
         :param path: The file path from which the repository is read.
         :param create: If true, a new repository will be returned if it was not found at the given path.
+        :param cache_size: The maximum number of fragments that are kept in memory once loaded from a binary or
+                           SQLite repository or None for no limit.
         :return: A new Repository instance.
         """
 
+        from . import binformat, looseformat, sqlformat
+
+        if looseformat.is_loose (path):
+            _logger.debug ("Loading loose-object repository '%s'", os.path.abspath (path))
+            try:
+                return looseformat.read (path)
+            except looseformat.FormatError as ex:
+                raise RuntimeError ("Repository '{0}' was not valid ({1})".format (path, ex))
+
         try:
-            stream = open (path, 'rt')
+            stream = open (path, 'rb')
         except FileNotFoundError:
             if create:
                 _logger.info ("New repository created")
@@ -325,33 +383,78 @@ class Repository:
                 raise
         else:
             with stream:
+                storage = StorageFormat.detect (stream)
+                if storage == StorageFormat.yaml:
+                    yaml = yaml_module ()
+                    try:
+                        _logger.debug ("Loading YAML repository '%s'", os.path.abspath (path))
+                        r = yaml.load (stream, Loader=yaml.Loader)
+                    except (ValueError, yaml.YAMLError):
+                        raise RuntimeError ("Repository '{0}' was not valid".format (path))
+                    if not isinstance (r, Repository):
+                        raise yaml.YAMLError ("YAML file '{0}' did not contain a repository".format (path))
+                    return r
+
+            if storage == StorageFormat.sqlite:
+                import sqlite3
+                _logger.debug ("Loading SQLite repository '%s'", os.path.abspath (path))
                 try:
-                    _logger.debug ("Loading YAML repository '%s'", os.path.abspath (path))
-                    r = yaml.load (stream)
-                except (ValueError, yaml.YAMLError):
-                    raise RuntimeError ("Repository '{0}' was not valid".format (path))
-                if not isinstance (r, Repository):
-                    raise yaml.YAMLError ("YAML file '{0}' did not contain a repository".format (path))
-                return r
-
-    def write (self, path: str) -> None:
+                    return sqlformat.read (path, cache_size=cache_size)
+                except sqlite3.DatabaseError as ex:
+                    raise RuntimeError ("Repository '{0}' was not valid ({1})".format (path, ex))
+
+            _logger.debug ("Loading binary repository '%s'", os.path.abspath (path))
+            try:
+                return binformat.read (path, cache_size=cache_size)
+            except binformat.FormatError as ex:
+                raise RuntimeError ("Repository '{0}' was not valid ({1})".format (path, ex))
+
+    def write (self, path: str, storage: Optional [StorageFormat] = None) -> None:
         """
-        Writes the repository as YAML.
+        Writes the repository.
+
         :param path: The path to which the repository will be written.
+        :param storage: The format in which the repository is written. If None, the format of the existing repository
+                        at 'path' is kept; a new repository is written in the binary format. YAML is available for
+                        exporting a repository in human-readable form.
         :return: None
         """
 
-        _logger.debug  ("Writing repository '%s'", os.path.abspath (path))
-        with open (path, 'wt') as stream:
-            dumper = yaml.Dumper
-            dumper.ignore_aliases = lambda self, data: True
-            yaml.dump (data=self, stream=stream, explicit_start=True, explicit_end=True, Dumper=dumper)
+        from . import binformat, looseformat, sqlformat
+
+        if storage is None:
+            storage = StorageFormat.of (path)
+            if storage is None or storage == StorageFormat.yaml:
+                storage = StorageFormat.binary
+
+        if storage == StorageFormat.binary:
+            binformat.write (self, path)
+        elif storage == StorageFormat.sqlite:
+            sqlformat.write (self, path)
+        elif storage == StorageFormat.loose:
+            looseformat.write (self, path)
+        else:
+            assert storage == StorageFormat.yaml
+            _logger.debug ("Writing YAML repository '%s'", os.path.abspath (path))
+            yaml = yaml_module ()
+            with open (path, 'wt') as stream:
+                dumper = yaml.Dumper
+                dumper.ignore_aliases = lambda self, data: True
+                yaml.dump (data=self, stream=stream, explicit_start=True, explicit_end=True, Dumper=dumper)
 
     @staticmethod
     def yaml_representer (dumper, r):
         """Emits a Repository to YAML."""
 
-        return dumper.represent_mapping (Repository.YAML_NAME, r.__dict__)
+        value = {
+            'fragments': dict (r.fragments),
+            'links': r.links,
+            'tickets': r.tickets,
+            'uuid': r.uuid,
+        }
+        if r.settings:
+            value ['settings'] = r.settings
+        return dumper.represent_mapping (Repository.YAML_NAME, value)
 
     @staticmethod
     def yaml_constructor (loader, node) -> 'Repository':
@@ -361,10 +464,6 @@ class Repository:
         return Repository (**value)
 
 
-yaml.add_representer (Repository, Repository.yaml_representer)
-yaml.add_constructor (Repository.YAML_NAME, Repository.yaml_constructor)
-
-
 def _uuid_representer (dumper, u):
     """Emits a UUID to YAML."""
     return dumper.represent_scalar ('!uuid', str (u))
@@ -375,7 +474,37 @@ def _uuid_constructor (loader, node):
     return uuid.UUID (hex=loader.construct_scalar (node))
 
 
-yaml.add_representer (uuid.UUID, _uuid_representer)
-yaml.add_constructor ('!uuid', _uuid_constructor)
+# The type, YAML tag, representer, and constructor of each of the objects in a YAML repository.
+_YAML_TYPES = (
+    (SectionType, _section_type_yaml_tag, _section_type_representer, _section_type_constructor),
+    (XFixup, XFixup.YAML_NAME, XFixup.yaml_representer, XFixup.yaml_constructor),
+    (Fragment, Fragment.YAML_NAME, Fragment.yaml_representer, Fragment.yaml_constructor),
+    (FSection, FSection.YAML_NAME, FSection.yaml_representer, FSection.yaml_constructor),
+    (TicketRecord, TicketRecord.YAML_NAME, TicketRecord.yaml_representer, TicketRecord.yaml_constructor),
+    (TicketFileEntry, TicketFileEntry.YAML_NAME, TicketFileEntry.yaml_representer, TicketFileEntry.yaml_constructor),
+    (LinksRecord, LinksRecord.YAML_NAME, LinksRecord.yaml_representer, LinksRecord.yaml_constructor),
+    (DebugLineRecord, DebugLineRecord.YAML_NAME, DebugLineRecord.yaml_representer, DebugLineRecord.yaml_constructor),
+    (Repository, Repository.YAML_NAME, Repository.yaml_representer, Repository.yaml_constructor),
+    (uuid.UUID, '!uuid', _uuid_representer, _uuid_constructor),
+)
+
+_yaml = None
+
+
+def yaml_module ():
+    """
+    Returns the PyYAML module, importing it and registering the representers and constructors of the repository's
+    types on first use. Most runs of the tools neither read nor write YAML, and importing it would take a large part of
+    their start-up time.
+    """
+
+    global _yaml
+    if _yaml is None:
+        import yaml
+        for cls, tag, representer, constructor in _YAML_TYPES:
+            yaml.add_representer (cls, representer)
+            yaml.add_constructor (tag, constructor)
+        _yaml = yaml
+    return _yaml
 
 # eof store/types.py
@@ -28,10 +28,10 @@ generated code and for writing the final output, in this case to both the progra
 import logging
 import os.path
 import uuid
-from typing import Mapping
-import yaml
+from typing import Mapping, Optional, Tuple
 
-from store import types
+from store import ticket_file, types
+from store.transaction import Transaction
 from .fixups import procedure_fixups
 from .types import NameMeta, ProcedureRecord
 from .options import Options
@@ -39,13 +39,69 @@ from .options import Options
 _logger = logging.getLogger (__name__)
 
 
-def back_end (options: Options,
-              rebased_program: Mapping [str, ProcedureRecord],
-              name_metadata_map: Mapping [str, NameMeta],
-              repository: types.Repository) -> None:
+def generate_fragments (procedure_record: ProcedureRecord) -> Tuple [types.Fragment, Optional [types.Fragment]]:
     """
-    The compiler 'back end'. This part is responsible for emitting the result of this compilation to the
-    repository and for creating a new 'ticket' file to represent it.
+    Serializes a procedure as a repository fragment holding its code, and a second fragment holding its debug_line
+    data. The code fragment's digest does not depend on the procedure's source locations, so they are kept apart.
+
+    :return: The code fragment and the debug fragment. The latter is None if the procedure has no source locations.
+    """
+
+    fixups = procedure_fixups (procedure_record.procedure)
+    xfixups = [types.XFixup (offset=-1, name=f) for f in fixups]
+
+    # Write the fragment's section data.
+    io_sections = dict ()
+    procedure_record.procedure.write (io_sections)
+    debug_line = io_sections.pop (types.SectionType.debug_line, None)
+
+    # Now build the fragment sections themselves. (In a Toy language program only the text
+    # section can have external fixups; it's not a property of the repository design.)
+    sections = {
+        scn: types.FSection (data=io.getvalue (), xfixups=xfixups if scn == types.SectionType.text else None)
+        for scn, io in io_sections.items ()
+        }
+    fragment = types.Fragment (sections=sections, primary=types.SectionType.text)
+    if procedure_record.line_base is None or debug_line is None:
+        return fragment, None
+    return fragment, _debug_fragment (debug_line.getvalue ())
+
+
+def generate_debug_fragment (procedure_record: ProcedureRecord) -> Optional [types.Fragment]:
+    """
+    Serializes a procedure's debug_line data as a repository fragment, or returns None if it has no source locations.
+    """
+
+    if procedure_record.line_base is None:
+        return None
+    io_sections = dict ()
+    procedure_record.procedure.write (io_sections)
+    return _debug_fragment (io_sections [types.SectionType.debug_line].getvalue ())
+
+
+def _debug_fragment (data: bytes) -> types.Fragment:
+    return types.Fragment (sections={types.SectionType.debug_line: types.FSection (data=data)},
+                           primary=types.SectionType.debug_line)
+
+
+def emit_fragment (name: str, digest: str, fragment: types.Fragment, transaction: Transaction) -> None:
+    """Adds the fragment generated for a procedure to a repository transaction."""
+
+    _logger.info ("Emitting procedure '%s', digest %s", name, digest)
+    transaction.add_fragment (digest, fragment)
+
+
+def emit_ticket (options: Options,
+                 name_metadata_map: Mapping [str, NameMeta],
+                 transaction: Transaction,
+                 input_digest: Optional [str] = None) -> uuid.UUID:
+    """
+    Adds the ticket for a compilation to a repository transaction.
+
+    :param name_metadata_map: The digests and line base of each of the TU's procedures.
+    :param transaction: The repository transaction to which the ticket is added.
+    :param input_digest: The digest of the compilation's source file and options (see toycc.driver).
+    :return: The compilation's ticket UUID.
     """
 
     # Make a unique identifier for this compilation.
@@ -54,39 +110,29 @@ def back_end (options: Options,
     # Create a ticket record for this compilation in the repository.
     # FIXME: TicketRecord should really be called TicketMember
 
-    repository.tickets [compile_uuid] = types.TicketFileEntry (
+    transaction.add_ticket (compile_uuid, types.TicketFileEntry (
             path=os.path.abspath (options.out_file),
-            members=[types.TicketRecord (name=name, digest=meta.digest, line_base=meta.line_base)
-                     for name, meta in name_metadata_map.items ()]
-    )
-
-    # Add a fragment record for each of the functions that we included in this TU.
-    for name, procedure_record in rebased_program.items ():
-        digest = name_metadata_map [name].digest
-        _logger.info ("Emitting procedure '%s', digest %s", name, digest)
+            members=[types.TicketRecord (name=name, digest=meta.digest, line_base=meta.line_base,
+                                         debug_digest=meta.debug_digest)
+                     for name, meta in name_metadata_map.items ()],
+            input_digest=input_digest
+    ))
+    return compile_uuid
 
 
-        fixups = procedure_fixups (rebased_program [name].procedure)
-        xfixups = [types.XFixup (offset=-1, name=f) for f in fixups]
+def read_ticket (options: Options) -> Optional [uuid.UUID]:
+    """Returns the ticket UUID recorded in the object/ticket file for a compilation, or None if there isn't one."""
 
-        # Write the fragment's section data.
-        io_sections = dict ()
-        procedure_record.procedure.write (io_sections)
+    try:
+        return ticket_file.read (options.out_file)
+    except (OSError, ValueError):
+        return None
 
-        # Now build the fragment sections themselves. (In a Toy language program only the text
-        # section can have external fixups; it's not a property of the repository design.)
-        sections = {
-            scn: types.FSection (data=io.getvalue (), xfixups=xfixups if scn == types.SectionType.text else None)
-            for scn, io in io_sections.items ()
-            }
-        repository.fragments [digest] = types.Fragment (sections=sections, primary=types.SectionType.text)
 
-    # Write the updated repository
-    repository.write (options.repository)
+def write_ticket (options: Options, compile_uuid: uuid.UUID) -> None:
+    """Writes the object/ticket file for a compilation whose transaction has been committed."""
 
-    # Write the object/ticket file.
     _logger.info ("Writing ticket %s to '%s'", compile_uuid, options.out_file)
-    with open (options.out_file, 'wt') as ticket_file:
-        yaml.dump (data=compile_uuid, stream=ticket_file, explicit_start=True, explicit_end=True)
+    ticket_file.write (options.out_file, compile_uuid)
 
 # eof toycc.backend
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A thin client for the compile server (see toycc.server). It imports nothing from the compiler itself, so starting it
+is cheap: it sends its command line to the server and reports the result.
+
+    $ toycc --server /tmp/toycc.sock &
+    $ toycc-client -s /tmp/toycc.sock -g -o hello.o hello.toy
+
+The socket may instead be named by the TOYCC_SERVER environment variable. The client's TOYCC_ environment variables
+(such as TOYCC_CACHE_DIR) are sent with each request, so they have the same effect as they would on toycc itself.
+
+The server listens on a Unix socket, so the client cannot be used where Python lacks AF_UNIX (such as on Windows).
+"""
+
+import json
+import os
+import socket
+import sys
+from typing import Mapping, Optional, Sequence
+
+EXIT_FAILURE = 1
+
+_ENVIRONMENT_VARIABLE = 'TOYCC_SERVER'
+# The prefix of the environment variables which are sent to the server with a compile request.
+_ENVIRONMENT_PREFIX = 'TOYCC_'
+
+
+def request (path: str, message: dict) -> dict:
+    """Sends a request to the server listening at 'path' and returns its response."""
+
+    with socket.socket (socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect (path)
+        s.sendall (json.dumps (message).encode ('utf-8') + b'\n')
+        with s.makefile ('rb') as f:
+            return json.loads (f.readline ().decode ('utf-8'))
+
+
+def compile (path: str, args: Sequence [str], cwd: Optional [str] = None,
+             environ: Optional [Mapping [str, str]] = None) -> dict:
+    """
+    Asks the server listening at 'path' to compile with the given toycc command-line arguments.
+
+    :param path: The path of the server's socket.
+    :param args: The arguments. Relative paths are relative to 'cwd' (including those of response files).
+    :param cwd: The directory to which paths are relative; by default, the current working directory.
+    :param environ: The environment whose TOYCC_ variables are sent to the server; by default, os.environ.
+    :return: The server's response.
+    """
+
+    cwd = os.path.abspath (cwd if cwd is not None else os.getcwd ())
+    environ = environ if environ is not None else os.environ
+    # The server reads response files itself, so their paths must not depend on its working directory.
+    args = ['@' + os.path.join (cwd, arg [1:]) if arg.startswith ('@') else arg for arg in args]
+    env = {k: v for k, v in environ.items () if k.startswith (_ENVIRONMENT_PREFIX)}
+    return request (path, {'cwd': cwd, 'args': args, 'env': env})
+
+
+def shutdown (path: str) -> None:
+    """Asks the server listening at 'path' to stop."""
+
+    request (path, {'command': 'shutdown'})
+
+
+def main (args: Sequence [str] = sys.argv [1:]) -> int:
+    if not hasattr (socket, 'AF_UNIX'):
+        print ('toycc-client: the compile server uses Unix sockets, which are not available on this platform',
+               file=sys.stderr)
+        return EXIT_FAILURE
+
+    args = list (args)
+    path = os.environ.get (_ENVIRONMENT_VARIABLE)
+    if len (args) >= 2 and args [0] in ('-s', '--socket'):
+        path = args [1]
+        args = args [2:]
+    if path is None:
+        print ('toycc-client: the server socket must be given with -s or {0}'.format (_ENVIRONMENT_VARIABLE),
+               file=sys.stderr)
+        return EXIT_FAILURE
+
+    try:
+        if args == ['--shutdown']:
+            shutdown (path)
+            return 0
+        response = compile (path, args)
+    except (OSError, ValueError) as ex:
+        print ("toycc-client: could not use the server at '{0}' ({1})".format (path, ex), file=sys.stderr)
+        return EXIT_FAILURE
+    sys.stdout.write (response.get ('output', ''))
+    if response ['error'] is not None:
+        print ('  ERROR: {0}'.format (response ['error']), file=sys.stderr)
+    return response ['status']
+
+
+if __name__ == '__main__':
+    sys.exit (main ())
+
+# eof toycc.client
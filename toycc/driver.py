@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+The compiler driver: runs the front end, the optimizer, and the back end over one or more translation units and
+commits the results to the program repository.
+"""
+
+# System modules
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import logging
+import os.path
+import threading
+import uuid
+from typing import AbstractSet, ContextManager, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Local modules
+from store.transaction import Transaction
+from store import binformat, fragment_cache, prefix_map
+from store.types import Repository
+from toycc import backend, fast_frontend, frontend, inline, optimizer, options, passes, rebase
+from toycc.types import NameMeta, ProcedureRecord
+from toyvm import instruction
+
+_logger = logging.getLogger (__name__)
+
+
+class Repositories:
+    """
+    Provides the compiler with the repository transactions to which its results are added. This implementation
+    reads the repository afresh for each transaction; a long-running compiler may keep its copy instead (see
+    CachedRepositories).
+    """
+
+    def lock (self) -> ContextManager:
+        """Returns a context manager which is held while a transaction's repository is examined or committed."""
+
+        return contextlib.nullcontext ()
+
+    def begin (self, path: str) -> Transaction:
+        return Transaction (path, create=True)
+
+    def committed (self, transaction: Transaction) -> None:
+        """Called (with the lock held) once 'transaction' has been committed."""
+
+        pass
+
+
+def _signature (path: str) -> Optional [Tuple [int, int, int]]:
+    try:
+        st = os.stat (path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class CachedRepositories (Repositories):
+    """
+    Keeps a copy of each repository which is used (see toycc.server and toycc.watch). A copy is used only while the
+    file's modification time, size, and inode are unchanged; otherwise the repository is read again. Examining and
+    committing a repository is serialized by a single lock, so the commits made through this object never race one
+    another; they still merge with changes made by other processes.
+    """
+
+    def __init__ (self) -> None:
+        self.__lock = threading.Lock ()
+        self.__cache = dict ()  # type: Dict [str, Tuple [Tuple [int, int, int], Repository]]
+
+    def lock (self) -> threading.Lock:
+        return self.__lock
+
+    def begin (self, path: str) -> Transaction:
+        path = os.path.abspath (path)
+        signature = _signature (path)
+        cached = self.__cache.get (path)
+        if cached is not None and cached [0] == signature:
+            _logger.debug ("Using the copy of repository '%s' held in memory", path)
+            return Transaction (path, repository=cached [1])
+
+        transaction = Transaction (path, create=True)
+        if signature is not None:
+            self.__cache [path] = (signature, transaction.repository)
+        return transaction
+
+    def committed (self, transaction: Transaction) -> None:
+        path = os.path.abspath (transaction.path)
+        if binformat.is_mapped (transaction.repository, path):
+            # The commit brought the copy up to date with the file as it now is.
+            self.__cache [path] = (_signature (path), transaction.repository)
+        else:
+            self.__cache.pop (path, None)
+
+
+def _get_digest (procedure: instruction.Instruction, optimization_level: int = 0) -> str:
+    h = hashlib.md5 ()
+    procedure.digest (h)
+    if optimization_level:
+        # The procedure's code depends on the passes which are run over it.
+        h.update ('O{0}'.format (optimization_level).encode ())
+    return h.hexdigest ()
+
+
+def _get_debug_digest (procedure_record: ProcedureRecord, digest: str) -> Optional [str]:
+    """
+    Returns the digest of the fragment which holds a procedure's debug_line data, or None if it has no source
+    locations. The data depends on the procedure's code as well as on its locations, so the code digest is included.
+    """
+
+    if procedure_record.line_base is None:
+        return None
+    h = hashlib.md5 ()
+    h.update (digest.encode ())
+    procedure_record.procedure.digest_debug (h)
+    return h.hexdigest ()
+
+
+# Changes to the compiler which alter its output for an unchanged input must change this value, so that tickets
+# recorded by an earlier version aren't mistaken for up to date ones.
+_INPUT_DIGEST_VERSION = 3
+
+
+def _rebound_names (units: Iterable [options.Options]) -> AbstractSet [str]:
+    """
+    Returns the names which a program may rebind as it runs: the values of the string literals in its source files
+    (any of which may be the key of a 'def'). With -fwhole-program, the translation units are the whole program.
+    """
+
+    result = set ()
+    for unit in units:
+        with open (unit.source_file, 'rt') as f:
+            result.update (token.text for token in fast_frontend.tokenize (f.read ()) if token.kind == 'string')
+    return frozenset (result)
+
+
+def _input_digest (opt: options.Options, rebound: AbstractSet [str] = frozenset ()) -> str:
+    """
+    Returns a digest of a translation unit's source file and of the options which affect the compiler's output for
+    it. It is recorded by the unit's ticket.
+
+    :param rebound: The names which the program may rebind (see _rebound_names()). With -finline, they decide
+                    which of the unit's procedures are inlined.
+    """
+
+    h = hashlib.md5 ()
+    h.update ('toycc {0}\0'.format (_INPUT_DIGEST_VERSION).encode ())
+    if opt.debug_info:
+        # The debug information records the source file's (mapped) path.
+        h.update ('g {0}\0'.format (opt.debug_source_path ()).encode ())
+    if opt.optimization_level:
+        h.update ('O{0}\0'.format (opt.optimization_level).encode ())
+    if opt.inline:
+        h.update ('finline {0}\0'.format (opt.inline_limit).encode ())
+        for name in sorted (rebound):
+            h.update ('rebound {0}\0'.format (name).encode ())
+    with open (opt.source_file, 'rb') as f:
+        h.update (f.read ())
+    return h.hexdigest ()
+
+
+def _current_ticket (opt: options.Options,
+                     input_digest: str,
+                     recorded: Optional [uuid.UUID],
+                     repository: Repository) -> Optional [uuid.UUID]:
+    """
+    Looks for a ticket which is an up-to-date compilation of a translation unit: it names the unit's output file, was
+    produced from the same input, and all of its fragments are still in the repository.
+
+    :param recorded: The ticket named by the unit's existing output file, if any. If there is no such file, the
+                     repository's tickets are searched.
+    :return: The UUID of the ticket or None if the unit must be compiled.
+    """
+
+    path = os.path.abspath (opt.out_file)
+    for ticket in [recorded] if recorded is not None else list (repository.tickets):
+        entry = repository.tickets.get (ticket)
+        if (entry is not None and entry.input_digest == input_digest and entry.path == path and
+                all (digest in repository.fragments for digest in entry.fragment_digests ())):
+            return ticket
+    return None
+
+
+def _fragment_cache (opt: options.Options) -> Optional [fragment_cache.FragmentCache]:
+    """Returns the fragment cache named by the options or None if there isn't one."""
+
+    if opt.fragment_cache is None:
+        return None
+    return fragment_cache.FragmentCache (opt.fragment_cache, max_size=opt.fragment_cache_size)
+
+
+def _analyze (opt: options.Options,
+              rebound: AbstractSet [str] = frozenset ()) -> Iterator [Tuple [str, ProcedureRecord, NameMeta]]:
+    """
+    Parses a translation unit, rebases its source correspondence, and computes the digest of each of its procedures.
+
+    :param opt: The options for the translation unit.
+    :param rebound: The names which the program may rebind. With -finline, they are not inlined.
+    :return: Yields (name, rebased procedure, digest and line base) for each procedure as soon as it is parsed.
+    """
+
+    front_end = fast_frontend.procedures if opt.frontend == 'fast' else frontend.procedures
+    procedures = front_end (opt)
+    if opt.inline:
+        # A procedure may call one which is defined later in the file, so the whole unit is parsed first. Each
+        # procedure's digest is that of its inlined form, so a change to a callee changes it too.
+        procedures = inline.inline_procedures (procedures, limit=opt.inline_limit, rebound=rebound)
+    for name, procedure in procedures:
+        # We now need to adjust the source-line correspondence so that each function's line numbers are
+        # relative to its first line. This enables the user to move the function around without the compiler
+        # then needing to recompile it because its line numbers have changed. Changes _within_ the body of
+        # the function will trigger a re-compile.
+        procedure_record = rebase.rebase_source_info (procedure)
+
+        # Compute a digest for the function using a cryptographic hash function. We'll look it up in the
+        # repository to discover whether we've already produced and stored its definition. The source locations
+        # don't contribute to it: they have a digest of their own, so that a change to the layout of the source
+        # needs only a new debug record and not new code.
+        digest = _get_digest (procedure_record.procedure, opt.optimization_level)
+        yield name, procedure_record, NameMeta (digest=digest,
+                                                line_base=procedure_record.line_base,
+                                                debug_digest=_get_debug_digest (procedure_record, digest))
+
+
+def _analyze_unit (opt: options.Options, rebound: AbstractSet [str]) -> List [Tuple [str, ProcedureRecord, NameMeta]]:
+    return list (_analyze (opt, rebound))
+
+
+def _analyze_all (units: Sequence [options.Options],
+                  jobs: int,
+                  rebound: AbstractSet [str]) -> Iterator [Iterable [Tuple [str, ProcedureRecord, NameMeta]]]:
+    """
+    Yields the analysis of each of the translation units in turn. If there is more than one, they are analyzed by a
+    pool of up to 'jobs' processes, each of which parses a whole unit; otherwise, the procedures are analyzed one at
+    a time as the compiler consumes them.
+    """
+
+    if jobs <= 1 or len (units) <= 1:
+        for unit in units:
+            yield _analyze (unit, rebound)
+        return
+    with concurrent.futures.ProcessPoolExecutor (max_workers=min (jobs, len (units))) as executor:
+        yield from executor.map (_analyze_unit, units, [rebound] * len (units))
+
+
+class _InMemory (Repositories):
+    """A repository which is held in memory by the caller of compile_many(): the path in the options is ignored."""
+
+    def __init__ (self, repository: Repository) -> None:
+        self.__repository = repository
+
+    def begin (self, path: str) -> Transaction:
+        return Transaction (None, repository=self.__repository)
+
+
+def compile (opt: options.Options, repositories: Repositories = Repositories ()) -> List [uuid.UUID]:
+    """
+    Compiles each of the translation units named by 'opt' and commits the results to the repository. Each procedure
+    passes through the compiler's stages as soon as it has been parsed, so its code may be generated while the rest
+    of the source is still being read.
+
+    :param opt: The compiler options.
+    :param repositories: The source of the repository transaction.
+    :return: The ticket of each translation unit.
+    """
+
+    with repositories.lock ():
+        # Other compilations may be adding to the repository at the same time: the transaction's commit merges our
+        # changes with theirs. The repository is read once for all of the translation units.
+        transaction = repositories.begin (opt.repository)
+        setting = transaction.repository.settings.get (prefix_map.SETTING)
+
+    # The source paths are mapped by the command line's entries and then by the repository's.
+    debug_prefix_map = opt.debug_prefix_map + prefix_map.PrefixMap (prefix_map.parse_setting (setting))
+    units = [unit.with_debug_prefix_map (debug_prefix_map) for unit in opt.translation_units ()]
+    # Inlining depends on the names that any of the program's source files may rebind.
+    rebound = _rebound_names (units) if opt.inline else frozenset ()
+    input_digests = [_input_digest (unit, rebound) for unit in units]
+    recorded = [backend.read_ticket (unit) for unit in units]
+    with repositories.lock ():
+        current = [_current_ticket (unit, input_digest, ticket, transaction.repository)
+                   for unit, input_digest, ticket in zip (units, input_digests, recorded)]
+
+    # A unit whose source and options are unchanged since an earlier compilation needn't be compiled again: at most,
+    # its output file is written again.
+    stale = list ()  # The indices of the units which must be compiled.
+    for index, (unit, ticket, current_ticket) in enumerate (zip (units, recorded, current)):
+        if current_ticket is None:
+            stale.append (index)
+            continue
+        _logger.info ("'%s' is up to date (ticket %s)", unit.source_file, current_ticket)
+        if ticket != current_ticket:
+            backend.write_ticket (unit, current_ticket)
+    if not stale:
+        transaction.abort ()
+        return current
+    units = [units [index] for index in stale]
+    input_digests = [input_digests [index] for index in stale]
+
+    name_metadata_maps = [dict () for _ in units]  # type: List [Dict [str, NameMeta]]
+    pending = collections.deque ()  # The metadata of the procedures given to the code generator, oldest first.
+    cache = _fragment_cache (opt)
+
+    def new_procedures () -> Iterator [Tuple [str, ProcedureRecord]]:
+        # Skip procedures that are already present in the repository or the fragment cache, or that an earlier
+        # translation unit also defines. There's no need for them to go through the compiler's later stages.
+        emitted = set ()  # The digests of the fragments generated by this invocation.
+        for name_metadata_map, analysis in zip (name_metadata_maps, _analyze_all (units, opt.jobs, rebound)):
+            for name, procedure_record, name_meta in analysis:
+                name_metadata_map [name] = name_meta
+                digest, debug_digest = name_meta.digest, name_meta.debug_digest
+                with repositories.lock ():
+                    fragments = transaction.repository.fragments
+                    known = digest in emitted or digest in fragments
+                    debug_known = debug_digest is None or debug_digest in emitted or debug_digest in fragments
+                if known:
+                    _logger.info ("Removing '%s' from the IR (its definition is already in the repository)", name)
+                elif cache is not None:
+                    fragment = cache.get (digest)
+                    if fragment is not None:
+                        _logger.info ("Removing '%s' from the IR (its definition is in the fragment cache)", name)
+                        emitted.add (digest)
+                        backend.emit_fragment (name, digest, fragment, transaction)
+                        known = True
+                if not known:
+                    emitted.update ((digest, debug_digest))
+                    pending.append ((name, name_meta))
+                    yield name, procedure_record
+                    continue
+                if not debug_known:
+                    # Only the procedure's source locations have changed. The code generator is deterministic, so
+                    # the debug_line data can be produced by running the (cheap) passes over the procedure again
+                    # without generating its code.
+                    emitted.add (debug_digest)
+                    procedure_record.procedure, _ = passes.run (procedure_record.procedure, opt.optimization_level)
+                    backend.emit_fragment (name, debug_digest, backend.generate_debug_fragment (procedure_record),
+                                           transaction)
+
+    # Code generation produces the fragments in the order in which the procedures were given to it.
+    for fragment, debug_fragment in optimizer.generate (new_procedures (), emit_fragment=backend.generate_fragments,
+                                                        level=opt.optimization_level):
+        name, name_meta = pending.popleft ()
+        backend.emit_fragment (name, name_meta.digest, fragment, transaction)
+        if debug_fragment is not None:
+            backend.emit_fragment (name, name_meta.debug_digest, debug_fragment, transaction)
+        if cache is not None:
+            # Only the code is cached: a debug record is cheap to produce and is rarely shared.
+            cache.put (name_meta.digest, fragment)
+
+    with repositories.lock ():
+        tickets = [backend.emit_ticket (unit, name_metadata_map, transaction, input_digest=input_digest)
+                   for unit, name_metadata_map, input_digest in zip (units, name_metadata_maps, input_digests)]
+
+        # All of the new fragments and tickets are committed together; each translation unit gets its own ticket file.
+        transaction.commit ()
+        repositories.committed (transaction)
+    for unit, compile_uuid in zip (units, tickets):
+        backend.write_ticket (unit, compile_uuid)
+
+    if cache is not None:
+        _logger.info ("Fragment cache '%s': %d hits, %d misses, %d added", cache.directory, cache.hits, cache.misses,
+                      cache.added)
+        if cache.added:
+            cache.trim ()
+
+    for index, compile_uuid in zip (stale, tickets):
+        current [index] = compile_uuid
+    return current
+
+
+def compile_many (sources: Sequence [str], repository: Repository, args: Sequence [str] = ()) -> List [uuid.UUID]:
+    """
+    Compiles source files into a repository which is held in memory, so that a build system running in the same
+    process can chain the compilations with links and collections without reading or writing the repository
+    between them. An object file is still written for each source file: it is the compilation's output, and the
+    garbage collector looks for it to decide whether the compilation's ticket is live.
+
+    :param sources: The paths of the source files. Each object file is named after its source.
+    :param repository: The repository to which the results are added.
+    :param args: Further compiler options as they would be given on the command line (for example, ['-g', '-O2']).
+    :return: The ticket of each source file's compilation, in the order of 'sources'.
+    :raises ValueError: If 'args' are not valid, or ask for a compile server or for the sources to be watched.
+    """
+
+    try:
+        opt = options.parse_command_line (list (args) + ['--'] + list (sources))
+    except SystemExit:
+        raise ValueError ("Invalid compiler options: '{0}'".format (' '.join (args)))
+    if opt.server is not None:
+        raise ValueError ('A compile server cannot be started by compile_many ()')
+    if opt.watch:
+        raise ValueError ('Source files cannot be watched by compile_many ()')
+    return compile (opt, _InMemory (repository))
+
+# eof toycc.driver
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A hand-written, single-pass lexer and recursive-descent parser for Toy source. It accepts the same language as the
+pyparsing grammar in toycc.frontend and produces identical instruction objects (and source locations), but without
+the cost of the general-purpose parser. Select it with toycc's --frontend=fast option.
+"""
+
+# System imports
+import logging
+import os.path
+import re
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+# Local imports
+import toyvm.instruction as instruction
+from .frontend import TUType
+from .options import Options
+
+_logger = logging.getLogger (__name__)
+
+# The token patterns mirror those of the pyparsing grammar. A string token matches only up to, but not including,
+# its closing quote: like pyparsing, the body is matched without backtracking before the quote is checked.
+_TOKEN = re.compile (r'''
+      (?P<whitespace>[ \t\r\n]+)
+    | (?P<comment>\#.*)
+    | (?P<number>-?\d+(?:\.\d*)?(?:[eE]-?\d+)?)
+    | (?P<ident>[A-Za-z][A-Za-z0-9_]*)
+    | (?P<string>"(?:[^"\n\r\\]|""|\\(?:[^x]|x[0-9a-fA-F]+))*)
+    | (?P<open>\{)
+    | (?P<close>\})
+    ''', re.VERBOSE)
+
+# The characters which may not abut a keyword (the braces, 'true', and 'false').
+_IDENT_CHARS = frozenset ('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_$')
+
+_KEYWORDS = {'true': 'true', 'false': 'false'}
+
+
+class ParseError (Exception):
+    """Raised when the source does not conform to the Toy grammar."""
+
+    def __init__ (self, message: str, source: str, offset: int) -> None:
+        self.line, self.column = instruction.LineIndex (source).position (offset)
+        super ().__init__ ('{0} (at line {1}, column {2})'.format (message, self.line, self.column))
+
+
+class Token (NamedTuple):
+    kind: str  # One of 'comment', 'number', 'ident', 'true', 'false', 'string', 'open', 'close', or 'end'.
+    text: str
+    offset: int
+
+
+def _is_keyword_at (source: str, start: int, end: int) -> bool:
+    return ((start == 0 or source [start - 1] not in _IDENT_CHARS) and
+            (end >= len (source) or source [end] not in _IDENT_CHARS))
+
+
+def tokenize (source: str) -> Iterator [Token]:
+    """
+    Splits 'source' into tokens, skipping whitespace. The final token has kind 'end'.
+    """
+
+    match = _TOKEN.match
+    pos = 0
+    length = len (source)
+    while pos < length:
+        m = match (source, pos)
+        if m is None:
+            raise ParseError ('Unexpected character {0!r}'.format (source [pos]), source, pos)
+
+        kind = m.lastgroup
+        end = m.end ()
+        if kind == 'whitespace':
+            pos = end
+            continue
+
+        text = m.group ()
+        if kind == 'ident':
+            if text in _KEYWORDS and _is_keyword_at (source, pos, end):
+                kind = _KEYWORDS [text]
+        elif kind == 'string':
+            if end >= length or source [end] != '"':
+                raise ParseError ('Unterminated string', source, pos)
+            end += 1
+            text = source [pos + 1:end - 1]
+        elif kind == 'open' or kind == 'close':
+            if not _is_keyword_at (source, pos, end):
+                raise ParseError ('Expected whitespace around {0!r}'.format (text), source, pos)
+
+        yield Token (kind, text, pos)
+        pos = end
+
+    yield Token ('end', '', pos)
+
+
+class _Parser:
+    def __init__ (self, source: str, srcfile: str, debug_info: bool) -> None:
+        # As with pyparsing, columns are counted as if tab characters had been expanded.
+        self.__source = source.expandtabs ()
+        self.__tokens = tokenize (self.__source)
+        self.__srcfile = srcfile if debug_info else None
+        self.__line_index = instruction.LineIndex (self.__source) if debug_info else None
+
+    def __location (self, token: Token) -> Optional [instruction.SourceLocation]:
+        if self.__srcfile is None:
+            return None
+        return self.__line_index.location (token.offset, srcfile=self.__srcfile)
+
+    def __error (self, message: str, token: Token) -> ParseError:
+        return ParseError (message, self.__source, token.offset)
+
+    def __next (self) -> Token:
+        return next (self.__tokens)
+
+    def procedures (self) -> Iterator [Tuple [str, instruction.Procedure]]:
+        """
+        program := ( comment | ident [comment] procedure )*
+
+        Yields each named procedure as soon as it has been parsed.
+        """
+
+        token = self.__next ()
+        while token.kind != 'end':
+            if token.kind == 'comment':
+                token = self.__next ()
+                continue
+            # A procedure may be named by any identifier, including the keywords.
+            if token.kind not in ('ident', 'true', 'false'):
+                raise self.__error ('Expected a procedure name', token)
+
+            name = token.text
+            token = self.__next ()
+            if token.kind == 'comment':
+                token = self.__next ()
+            if token.kind != 'open':
+                raise self.__error ("Expected '{'", token)
+            yield name, self.__procedure (token)
+            token = self.__next ()
+
+    def __procedure (self, open_brace: Token) -> instruction.Procedure:
+        """
+        procedure := '{' ( comment | true | false | number | procedure | string | operator )* '}'
+        """
+
+        body = list ()  # type: List [instruction.Instruction]
+        append = body.append
+        location = self.__location
+        while True:
+            token = self.__next ()
+            kind = token.kind
+            if kind == 'ident':
+                append (instruction.Operator (token.text, locn=location (token)))
+            elif kind == 'number':
+                append (instruction.Number (float (token.text), locn=location (token)))
+            elif kind == 'string':
+                append (instruction.String (token.text, locn=location (token)))
+            elif kind == 'true' or kind == 'false':
+                append (instruction.Boolean (kind == 'true', locn=location (token)))
+            elif kind == 'open':
+                append (self.__procedure (token))
+            elif kind == 'close':
+                return instruction.Procedure (body, locn=location (open_brace))
+            elif kind == 'end':
+                raise self.__error ("Expected '}'", token)
+            else:
+                assert kind == 'comment'
+
+
+def parse (source: str, source_file: str, debug_info: bool) -> TUType:
+    """
+    Parses the Toy program in 'source'.
+
+    :param source: The program text.
+    :param source_file: The name of the file from which the source was read (recorded by its debug information).
+    :param debug_info: True if each instruction should carry its source location.
+    :return: A dictionary mapping each procedure name to its definition.
+    """
+    return dict (_Parser (source, os.path.abspath (source_file), debug_info).procedures ())
+
+
+def procedures (options: Options) -> Iterator [Tuple [str, instruction.Procedure]]:
+    """
+    Parses a translation unit, yielding each of its (name, procedure) pairs in source order as soon as it has been
+    parsed. A name may be yielded more than once: the last of its definitions is the one that counts.
+    """
+
+    with open (options.source_file, 'rt') as f:
+        source = f.read ()
+
+    debug = _logger.isEnabledFor (logging.DEBUG)
+    for name, procedure in _Parser (source, options.debug_source_path (), options.debug_info).procedures ():
+        if debug:
+            _logger.debug ('%s: %s', name, procedure)
+        yield name, procedure
+
+
+def front_end (options: Options) -> TUType:
+    return dict (procedures (options))
+
+# eof toycc.fast_frontend
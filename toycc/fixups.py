@@ -26,11 +26,11 @@ Produces the list of names that are referenced by a named procedure.
 
 from typing import Iterable, Set
 
-from toyvm import machine
+from toyvm import systemdict
 from toyvm.instruction import Instruction
 
 # Get the set of names that the machine knows and implements. We don't emit fixups for these.
-_RUNTIME_BUILTINS = set (machine.Machine ().systemdict ().keys ())
+_RUNTIME_BUILTINS = systemdict.NAMES
 
 
 def _procedure_references (procedure: Instruction) -> Set[str]:
@@ -47,7 +47,8 @@ def procedure_fixups (procedure:Instruction) -> Iterable[str]:
     Produces the list of names that are referenced by a procedure.
 
     :param procedure: The procedure whose members are to be searched.
-    :return: A list of names.
+    :return: A list of names in sorted order (so that the fragment generated for a procedure does not depend on the
+             order in which the names happen to be enumerated).
     """
 
     # Get the set of names referenced by this procedure.
@@ -58,6 +59,6 @@ def procedure_fixups (procedure:Instruction) -> Iterable[str]:
     # the name() method on instructions that don't have a name, such as Numbers. Removing it here
     # simplifies the loop above.
 
-    return list (f.difference (_RUNTIME_BUILTINS | { None }))
+    return sorted (f.difference (_RUNTIME_BUILTINS | { None }))
 
 #eof toycc.fixups
@@ -22,10 +22,8 @@
 
 # System imports
 import logging
-import os.path
-from typing import Mapping
-
-import pyparsing as pp
+import threading
+from typing import Iterator, Mapping, Tuple
 
 # Local imports
 import toyvm.instruction as instruction
@@ -33,6 +31,7 @@ from .options import Options
 
 _source_file = None
 _debug_info_enabled = False
+_line_index = None
 
 # This function decides whether to return a SourceLocation or None depending on whether debug
 # info generation has been enabled by the user.
@@ -41,9 +40,12 @@ def _location (orig_string, locn):
         return None
 
     assert _source_file is not None
-    return instruction.SourceLocation (srcfile=os.path.abspath (_source_file),
-                                       line=pp.lineno (locn, orig_string),
-                                       column=pp.col (locn, orig_string))
+    # pyparsing's lineno() and col() scan the string from its start on every call; the index finds each line with
+    # a binary search instead. (The string passed to the parse actions is the tab-expanded copy of the source.)
+    global _line_index
+    if _line_index is None or _line_index.text is not orig_string:
+        _line_index = instruction.LineIndex (orig_string)
+    return _line_index.location (locn, srcfile=_source_file)
 
 #@pp.traceParseAction
 def _make_true (src, locn, toks):
@@ -78,52 +80,96 @@ def _make_procedure (src, locn, toks):
     assert len (toks) == 1
     return instruction.Procedure (toks [0], locn=_location (src, locn))
 
-# Matches a number which may be negative, include a decimal point or exponential notation.
-# e.g. 1, -1, 3.14, 314e-2
-_number = pp.Regex (r'-?\d+(\.\d*)?([eE]-?\d+)?').setParseAction (_make_number).setName ('number')
+class _Grammar:
+    """
+    The pyparsing grammar of a translation unit. It is built by _grammar() when the first source file is parsed
+    rather than when the module is imported: importing pyparsing and constructing the grammar take a noticeable
+    part of the compiler's startup time, which is wasted on a run that never parses (--help, or one whose output
+    is already up to date).
+    """
+
+    def __init__ (self) -> None:
+        import pyparsing as pp
+
+        # Matches a number which may be negative, include a decimal point or exponential notation.
+        # e.g. 1, -1, 3.14, 314e-2
+        self.number = pp.Regex (r'-?\d+(\.\d*)?([eE]-?\d+)?').setParseAction (_make_number).setName ('number')
+
+        ident = pp.Word (pp.alphas, pp.alphanums + '_')
+        comment = pp.Regex (r'#.*').suppress ()
 
-_ident = pp.Word (pp.alphas, pp.alphanums + '_')
-_comment = pp.Regex (r'#.*').suppress ()
+        self.operator = ident.copy ().setParseAction (_make_operator).setName ('operator')
+        self.string = pp.quotedString.setParseAction (_make_string).setName ('string')
+        open_brace = pp.Keyword ('{').suppress ()
+        close_brace = pp.Keyword ('}').suppress ()
 
-_operator = _ident.copy ().setParseAction (_make_operator).setName ('operator')
-_string = pp.quotedString.setParseAction (_make_string).setName ('string')
-_open_brace = pp.Keyword ('{').suppress ()
-_close_brace = pp.Keyword ('}').suppress ()
+        self.boolean = (pp.Keyword ('true').setParseAction (_make_true).setName ('true') ^
+                        pp.Keyword ('false').setParseAction (_make_false).setName ('false'))
 
-_boolean = (pp.Keyword ('true').setParseAction (_make_true).setName ('true') ^
-            pp.Keyword ('false').setParseAction (_make_false).setName ('false'))
+        self.procedure = pp.Forward ()
+        operation = pp.ZeroOrMore (comment ^ self.boolean ^ self.number ^ self.procedure ^ self.string ^ self.operator)
+        self.procedure << pp.Group (open_brace + operation + close_brace).setName ('procedure').setParseAction (
+            _make_procedure)
 
-_procedure = pp.Forward ()
-operation = pp.ZeroOrMore (_comment ^ _boolean ^ _number ^ _procedure ^ _string ^ _operator)
-_procedure << pp.Group (_open_brace + operation + _close_brace).setName ('procedure').setParseAction (_make_procedure)
+        named_procedure = pp.Group (ident.copy ().setName ('Procedure name')
+                                    + pp.Optional (comment)
+                                    + self.procedure).setName ('Named procedure')
 
-_named_procedure = pp.Group (_ident.copy ().setName ('Procedure name')
-                             + pp.Optional (_comment)
-                             + _procedure).setName ('Named procedure')
+        self.program = pp.Dict (pp.ZeroOrMore (comment ^ named_procedure))
 
-_grammar = pp.Dict (pp.ZeroOrMore (_comment ^ _named_procedure))
 
+_grammar_instance = None
+_grammar_lock = threading.Lock ()
+
+def _grammar () -> _Grammar:
+    global _grammar_instance
+    with _grammar_lock:
+        if _grammar_instance is None:
+            _grammar_instance = _Grammar ()
+        return _grammar_instance
 
 
 _logger = logging.getLogger (__name__)
 
 TUType = Mapping[str, instruction.Procedure]
 
-def front_end (options: Options) -> TUType:
-    global _source_file
-    _source_file = options.source_file
-
-    global _debug_info_enabled
-    _debug_info_enabled = options.debug_info
+# The parse actions consult the globals above, so only one thread may parse at a time.
+_lock = threading.Lock ()
 
+def front_end (options: Options) -> TUType:
     with open (options.source_file, 'rt') as f:
         source = f.read ()
-    _grammar.setDebug (options.debug_parse)
-    program = _grammar.parseString (source, parseAll=True)
 
-    for line in program.dump ().splitlines ():
-        _logger.debug (line)
+    with _lock:
+        global _source_file
+        _source_file = options.debug_source_path ()
+
+        global _debug_info_enabled
+        _debug_info_enabled = options.debug_info
+
+        try:
+            grammar = _grammar ().program
+            grammar.setDebug (options.debug_parse)
+            program = grammar.parseString (source, parseAll=True)
+        finally:
+            global _line_index
+            _source_file = None
+            _debug_info_enabled = False
+            _line_index = None
+
+    if _logger.isEnabledFor (logging.DEBUG):
+        for line in program.dump ().splitlines ():
+            _logger.debug (line)
 
     return program.asDict ()
 
+
+def procedures (options: Options) -> Iterator [Tuple [str, instruction.Procedure]]:
+    """
+    Yields the (name, procedure) pairs of a translation unit. The grammar parses the whole of the source before the
+    first is produced; see toycc.fast_frontend for a parser which yields each procedure as soon as it is parsed.
+    """
+
+    yield from front_end (options).items ()
+
 # eof toycc.frontend
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Inlines small procedures into their callers within a translation unit (-finline). A call is an operator which names
+a procedure defined by the same unit; it is replaced by a copy of the procedure's body, each of whose instructions
+takes the source location of the call. A recursive call is never inlined.
+
+A procedure which the program may replace as it runs is never inlined. The only way to do that is with 'def', whose
+key is a string, so a procedure is taken to be replaceable if its name is the value of a string literal anywhere in
+the program (see string_literals()).
+"""
+
+import copy
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from toyvm.instruction import Instruction, Operator, Procedure, SourceLocation, String
+from .passes import count
+
+_logger = logging.getLogger (__name__)
+
+# The default for the largest number of instructions (including those of nested procedures) that a procedure may
+# have and still be inlined.
+DEFAULT_LIMIT = 10
+
+
+def _relocate (instruction: Instruction, locn: Optional [SourceLocation]) -> Instruction:
+    """Returns a copy of 'instruction' (and of any that it contains) whose source location is 'locn'."""
+
+    locn = copy.copy (locn)  # Each instruction has a location of its own: they are rebased one at a time.
+    if isinstance (instruction, Procedure):
+        return Procedure ([_relocate (member, locn) for member in instruction.instructions ()], locn=locn)
+    result = copy.copy (instruction)
+    result.set_location (locn)
+    return result
+
+
+def string_literals (instructions: Iterable [Instruction]) -> Set [str]:
+    """Returns the values of the string literals in 'instructions' (and in any procedures that they contain)."""
+
+    result = set ()
+    for instruction in instructions:
+        if isinstance (instruction, String):
+            result.add (instruction.value ())
+        elif isinstance (instruction, Procedure):
+            result |= string_literals (instruction.instructions ())
+    return result
+
+
+class _Inliner:
+    def __init__ (self, definitions: Dict [str, Procedure], limit: int) -> None:
+        """
+        :param definitions: The procedures defined by the translation unit.
+        :param limit: The largest number of instructions that a procedure may have and still be inlined.
+        """
+
+        self.__definitions = definitions
+        self.__limit = limit
+        self.__active = set ()  # type: Set [str]
+
+    def __body (self, name: Optional [str]) -> Optional [List [Instruction]]:
+        """
+        Returns the inlined body of the procedure called 'name' if the procedure may be inlined; otherwise None.
+        """
+
+        procedure = self.__definitions.get (name)
+        if procedure is None or name in self.__active or count (procedure) - 1 > self.__limit:
+            return None
+        self.__active.add (name)
+        body = self.expand (procedure.instructions ())
+        self.__active.remove (name)
+        return body if sum (count (instruction) for instruction in body) <= self.__limit else None
+
+    def expand (self, instructions: Iterable [Instruction]) -> List [Instruction]:
+        """Returns a copy of 'instructions' in which the calls to procedures that may be inlined are replaced."""
+
+        result = list ()
+        for instruction in instructions:
+            if isinstance (instruction, Procedure):
+                result.append (Procedure (self.expand (instruction.instructions ()), locn=instruction.locn ()))
+                continue
+            body = self.__body (instruction.name ()) if isinstance (instruction, Operator) else None
+            if body is None:
+                result.append (instruction)
+                continue
+            _logger.debug ("Inlining '%s' at %s", instruction.name (), instruction.locn ())
+            result.extend (_relocate (member, instruction.locn ()) for member in body)
+        return result
+
+    def inline (self, name: str, procedure: Procedure) -> Procedure:
+        self.__active.add (name)
+        result = Procedure (self.expand (procedure.instructions ()), locn=procedure.locn ())
+        self.__active.remove (name)
+        return result
+
+
+def inline_procedures (procedures: Iterable [Tuple [str, Procedure]],
+                       limit: int = DEFAULT_LIMIT,
+                       rebound: Iterable [str] = ()) -> List [Tuple [str, Procedure]]:
+    """
+    Inlines the small procedures of a translation unit into their callers. This must be done before the source
+    correspondence is rebased.
+
+    :param procedures: The (name, procedure) pairs of the translation unit in source order. If a name appears more
+                       than once, the last of its definitions is the one that is inlined.
+    :param limit: The largest number of instructions that a procedure may have and still be inlined.
+    :param rebound: The names that the rest of the program may rebind (the string literals of its other translation
+                    units). Neither these nor the string literals of this translation unit are inlined.
+    :return: The (name, procedure) pairs with the calls inlined. The original procedures are not modified.
+    """
+
+    procedures = list (procedures)
+    excluded = set (rebound) | string_literals (procedure for _, procedure in procedures)
+    inliner = _Inliner ({name: procedure for name, procedure in procedures if name not in excluded}, limit)
+    return [(name, inliner.inline (name, procedure)) for name, procedure in procedures]
+
+# eof toycc/inline.py
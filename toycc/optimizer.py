@@ -21,23 +21,77 @@
 ## THE SOFTWARE.
 
 """
-Implements the compiler's "optimizer"; in this case it's nothing more than a short sleep.
+Implements the compiler's optimizer, which runs the passes in toycc.passes over each procedure. The code generator
+optimizes and serializes each procedure as soon as the front end has produced it.
 """
 
 # System imports
+import collections
 import logging
 import time
-from typing import Mapping
+from typing import Callable, Dict, Iterable, Iterator, Tuple, TypeVar
 
 # Local imports
+from . import passes
 from .types import ProcedureRecord
 
 _logger = logging.getLogger (__name__)
 
-def optimize (program:Mapping [str, ProcedureRecord]) -> None:
-    for name, procedure in program.items ():
-        _logger.info ("Code generation for '%s'", name)
-        # Clever optimizations go here.
-        time.sleep (0.5)
+# The result of code generation for a procedure: normally one or more repository fragments.
+_Output = TypeVar ('_Output')
+
+def optimize_procedure (name: str, procedure: ProcedureRecord, level: int = 0) -> Dict [str, int]:
+    """
+    Replaces a procedure record's procedure with its optimized form.
+
+    :param level: The optimization level (see toycc.passes).
+    :return: The number of instructions removed by each pass.
+    """
+
+    _logger.debug ("Optimizing '%s' (%d instructions)", name, passes.count (procedure.procedure))
+    procedure.procedure, removed = passes.run (procedure.procedure, level)
+    for pass_name, count in removed.items ():
+        _logger.debug ("The %s pass removed %d instructions from '%s'", pass_name, count, name)
+    return removed
+
+
+def _generate_one (name: str,
+                   procedure: ProcedureRecord,
+                   emit_fragment: Callable [[ProcedureRecord], _Output],
+                   level: int) -> Tuple [_Output, Dict [str, int], float]:
+    start = time.perf_counter ()
+    removed = optimize_procedure (name, procedure, level)
+    fragment = emit_fragment (procedure)
+    return fragment, removed, time.perf_counter () - start
+
+
+def generate (procedures: Iterable [Tuple [str, ProcedureRecord]],
+              emit_fragment: Callable [[ProcedureRecord], _Output],
+              level: int = 0) -> Iterator [_Output]:
+    """
+    Optimizes each procedure and then produces its fragment. The procedures are consumed one at a time as the
+    fragments are produced, so that a procedure's code may be generated while later ones are still being parsed and
+    only a few procedures need be held in memory.
+
+    :param procedures: An iterable of (name, procedure) pairs. The names need not be unique.
+    :param emit_fragment: A function which serializes an optimized procedure as a repository fragment (or as a
+                          tuple of fragments).
+    :param level: The optimization level (see toycc.passes).
+    :return: The fragments in the same order as 'procedures'.
+    """
+
+    start = time.perf_counter ()
+    count = 0
+    removed = collections.Counter ()  # The number of instructions removed by each pass.
+    for name, procedure in procedures:
+        fragment, procedure_removed, elapsed = _generate_one (name, procedure, emit_fragment, level)
+        removed.update (procedure_removed)
+        _logger.info ("Code generation for '%s' took %.3fs", name, elapsed)
+        count += 1
+        yield fragment
+    if count:
+        _logger.info ('Generated %d procedures in %.3fs', count, time.perf_counter () - start)
+    for pass_name in removed:
+        _logger.info ('The %s pass removed %d instructions', pass_name, removed [pass_name])
 
 #eof toycc/optimizer.py
@@ -25,38 +25,194 @@ Compiler command line options.
 """
 
 import argparse
+import copy
 import os.path
-from typing import Iterable
+from typing import Iterable, List, Mapping, Tuple
+
+from store import fragment_cache, prefix_map
+from .inline import DEFAULT_LIMIT
+
+# The environment variables which give the defaults for --fragment-cache and --fragment-cache-size.
+CACHE_DIR_VARIABLE = 'TOYCC_CACHE_DIR'
+CACHE_SIZE_VARIABLE = 'TOYCC_CACHE_SIZE'
 
 class Options:
     """
     Represents the user options for the compiler.
     """
     def __init__ (self, opt) -> None:
-        self.source_file = opt.source_file
-        self.out_file = opt.out_file if opt.out_file is not None else os.path.splitext (opt.source_file) [0] + '.o'
+        self.source_files = opt.source_files
+        self.source_file = opt.source_files [0] if opt.source_files else None
+        self.out_file = opt.out_file if opt.out_file is not None or not opt.source_files else _out_file (self.source_file)
         self.repository = opt.repository
         self.debug_info = opt.debug_info
+        self.debug_prefix_map = prefix_map.PrefixMap (opt.debug_prefix_map or [])
+        self.optimization_level = opt.optimization_level
+        self.inline = opt.inline
+        self.inline_limit = opt.inline_limit
+        self.whole_program = opt.whole_program
         self.debug = opt.debug
         self.debug_parse = opt.debug_parse
+        self.frontend = opt.frontend
+        self.jobs = opt.jobs
+        self.fragment_cache = opt.fragment_cache
+        self.fragment_cache_size = opt.fragment_cache_size
+        self.server = opt.server
+        self.watch = opt.watch
+        self.watch_interval = opt.watch_interval
+        self.link_file = opt.link_file
         self.verbose = opt.verbose
 
+    def resolve (self, directory: str) -> None:
+        """
+        Makes the paths of the source, output, repository, and linked files and of the fragment cache absolute,
+        relative to 'directory'.
+        """
+
+        def resolve (path: str) -> str:
+            return os.path.join (directory, path) if path is not None else None
+
+        self.source_files = [resolve (source_file) for source_file in self.source_files]
+        self.source_file = resolve (self.source_file)
+        self.out_file = resolve (self.out_file)
+        self.repository = resolve (self.repository)
+        self.fragment_cache = resolve (self.fragment_cache)
+        self.link_file = resolve (self.link_file)
+
+    def debug_source_path (self) -> str:
+        """Returns the path of the source file as it is recorded by the debug information."""
+
+        return self.debug_prefix_map.map (os.path.abspath (self.source_file))
+
+    def with_debug_prefix_map (self, debug_prefix_map: prefix_map.PrefixMap) -> 'Options':
+        """Returns a copy of the options whose source paths are mapped by 'debug_prefix_map'."""
+
+        result = copy.copy (self)
+        result.debug_prefix_map = debug_prefix_map
+        return result
+
+    def translation_units (self) -> List ['Options']:
+        """
+        Returns the options for each of the source files to be compiled: source_file and out_file name a single
+        translation unit.
+        """
 
-def parse_command_line (args:Iterable[str]) -> Options:
+        if len (self.source_files) == 1:
+            return [self]
+        result = list ()
+        for source_file in self.source_files:
+            unit = copy.copy (self)
+            unit.source_file = source_file
+            unit.out_file = _out_file (source_file)
+            result.append (unit)
+        return result
+
+
+def _out_file (source_file: str) -> str:
+    return os.path.splitext (source_file) [0] + '.o'
+
+
+def _prefix_map_entry (text: str) -> Tuple [str, str]:
+    try:
+        return prefix_map.parse_entry (text)
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError (str (ex))
+
+
+def _size (text: str) -> int:
+    try:
+        return fragment_cache.parse_size (text)
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError (str (ex))
+
+
+def parse_command_line (args:Iterable[str], environ:Mapping[str, str]=os.environ) -> Options:
     """
     Turns a list of command line arguments into an instance of Options.
+
+    :param environ: The environment variables from which some of the options' defaults are taken.
     """
 
-    parser = argparse.ArgumentParser (description='Link from a program repository.')
-    parser.add_argument ('source_file', help='The source file to be compiled.')
+    parser = argparse.ArgumentParser (description='Compile Toy source files to a program repository.',
+                                      fromfile_prefix_chars='@')
+    parser.add_argument ('source_files', nargs='*', metavar='source_file',
+                         help='The source files to be compiled. @F reads further arguments from file F, one per line.')
     parser.add_argument ('-o', '--output', default=None, metavar='F', dest='out_file', help='The file to which output will be written.')
-    parser.add_argument ('-r', '--repository', default='repo.yaml', help='The program repository to be used for compilation.')
+    parser.add_argument ('-r', '--repository', default='repo.db', help='The program repository to be used for compilation.')
     parser.add_argument ('-g', action='store_true', dest='debug_info', help='Enable generation of debugging information.')
+    parser.add_argument ('-fdebug-prefix-map', action='append', type=_prefix_map_entry, metavar='OLD=NEW',
+                         dest='debug_prefix_map',
+                         help='Record source paths which begin with the directory OLD as beginning with NEW instead. '
+                              'May be given more than once; the first matching entry is used, followed by the '
+                              'repository\'s debug-prefix-map setting.')
+    levels = ('Disable the optimizer (the default).',
+              'Run each of the optimizer\'s passes once.',
+              'Repeat the optimizer\'s passes until they have no further effect.')
+    for level, description in enumerate (levels):
+        parser.add_argument ('-O{0}'.format (level), action='store_const', const=level, dest='optimization_level',
+                             default=0, help=description)
+    parser.add_argument ('-O', action='store_const', const=1, dest='optimization_level', help='Equivalent to -O1.')
+    parser.add_argument ('-finline', action='store_true', dest='inline',
+                         help='Inline small procedures into their callers in the same source file. A procedure whose '
+                              'name is a string literal (and so may be redefined with "def") is not inlined. '
+                              'Requires -fwhole-program.')
+    parser.add_argument ('-finline-limit', type=int, default=DEFAULT_LIMIT, metavar='N', dest='inline_limit',
+                         help='The largest number of instructions that a procedure may have and still be inlined '
+                              '(default=%(default)s).')
+    parser.add_argument ('-fwhole-program', action='store_true', dest='whole_program',
+                         help='Assume that the source files compiled together are the whole program, so that no '
+                              'other module redefines their procedures.')
+    parser.add_argument ('-j', '--jobs', type=int, default=1, metavar='N',
+                         help='The number of source files to be parsed at once (default=%(default)s).')
+    parser.add_argument ('--fragment-cache', metavar='DIR', default=environ.get (CACHE_DIR_VARIABLE) or None,
+                         help='A directory in which the fragments generated for any repository are cached so that '
+                              'other compilations on the same host can use them (default: ${0}).'.format (
+                                  CACHE_DIR_VARIABLE))
+    parser.add_argument ('--fragment-cache-size', type=_size, metavar='SIZE',
+                         default=environ.get (CACHE_SIZE_VARIABLE) or str (fragment_cache.DEFAULT_SIZE),
+                         help='The size beyond which the least recently used fragments are removed from the cache, '
+                              'such as 500M or 2G (default: ${0} or {1}M).'.format (
+                                  CACHE_SIZE_VARIABLE, fragment_cache.DEFAULT_SIZE >> 20))
+    parser.add_argument ('--frontend', choices=['pyparsing', 'fast'], default='pyparsing',
+                         help='The parser used to read the source files (default=%(default)s). "fast" is a '
+                              'hand-written parser which accepts the same language.')
+    parser.add_argument ('--server', metavar='SOCKET',
+                         help='Run as a compile server listening on the given Unix socket (see toycc-client).')
+    parser.add_argument ('--watch', action='store_true',
+                         help='Compile the source files, then compile them again whenever they change, until '
+                              'interrupted.')
+    parser.add_argument ('--watch-interval', type=float, default=0.5, metavar='SECONDS',
+                         help='The interval at which the source files are checked for changes (default=%(default)s).')
+    parser.add_argument ('--link', metavar='F', dest='link_file',
+                         help='With --watch, link the executable F from the object files after each change to '
+                              'them.')
     parser.add_argument ('--debug', action='store_true', help='Enable debug output.')
-    parser.add_argument ('--debug-parse', action='store_true', help='Enable parse debugging.')
+    parser.add_argument ('--debug-parse', action='store_true',
+                         help='Enable parse debugging (pyparsing front end only).')
     parser.add_argument ('-v', '--verbose', action='count', default=0,
                          help='Produce verbose output (repeat for more output).')
     options = parser.parse_args (args)
+    if options.server is None and not options.source_files:
+        parser.error ('at least one source file is required')
+    if options.out_file is not None and len (options.source_files) > 1:
+        parser.error ('-o cannot be used with more than one source file')
+    if options.inline and not options.whole_program:
+        parser.error ('-finline requires -fwhole-program (another module could redefine an inlined procedure)')
+    if options.inline_limit < 0:
+        parser.error ('the inline limit must not be negative')
+    if options.jobs < 1:
+        parser.error ('the number of jobs must be at least 1')
+    if options.watch and options.server is not None:
+        parser.error ('--watch cannot be used with --server')
+    if options.server is not None:
+        # socket is imported only here so that an ordinary compilation doesn't pay for it.
+        import socket
+        if not hasattr (socket, 'AF_UNIX'):
+            parser.error ('--server requires Unix sockets, which are not available on this platform')
+    if options.link_file is not None and not options.watch:
+        parser.error ('--link requires --watch')
+    if options.watch_interval <= 0:
+        parser.error ('the watch interval must be greater than 0')
     return Options (options)
 
 #eof toycc/options.py
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+The optimizer's passes. Each pass rewrites the instructions of a procedure, and of the procedures nested within it,
+by repeatedly matching a rule against the end of the instructions that it has rewritten so far. The instructions that
+survive keep their source locations; one which replaces a sequence takes the location of the sequence's operator.
+
+Like a C compiler's treatment of the standard library, the passes assume that a program doesn't redefine the
+machine's built-in operators.
+"""
+
+import operator
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from toyvm.instruction import Boolean, Instruction, Number, Operator, Procedure, String
+
+# A rule examines the end of a list of instructions. If it matches, it returns the number of instructions at the end
+# of the list to be replaced and their replacement; otherwise None. A replacement must be shorter than the
+# instructions it replaces (counting those in nested procedures).
+_Rule = Callable [[List [Instruction]], Optional [Tuple [int, List [Instruction]]]]
+
+# The instructions whose execution simply pushes a value onto the operand stack.
+_LITERALS = (Boolean, Number, Procedure, String)
+
+# The operators which take two numbers and push a number. The machine's div divides the number on the top of the stack
+# by the one beneath it.
+_ARITHMETIC = {
+    'add': operator.add,
+    'sub': operator.sub,
+    'mul': operator.mul,
+    'div': lambda num1, num2: num2 / num1,
+}
+
+# The operators which compare any two values and push a boolean.
+_COMPARISONS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+}
+
+# Pairs of operators which together leave the operand stack unchanged.
+_NO_OPS = {('dup', 'pop'), ('exch', 'exch')}
+
+# The highest optimization level: -O1 runs each pass once; -O2 repeats them until none of them has any effect.
+MAX_LEVEL = 2
+
+
+def _operator_name (instruction: Instruction) -> Optional [str]:
+    return instruction.name () if isinstance (instruction, Operator) else None
+
+
+def _fold_constants (tail: List [Instruction]) -> Optional [Tuple [int, List [Instruction]]]:
+    """Evaluates the arithmetic and comparison operators whose operands are number or boolean literals."""
+
+    if len (tail) < 3:
+        return None
+    operand1, operand2, op = tail [-3:]
+    name = _operator_name (op)
+    if name in _ARITHMETIC and isinstance (operand1, Number) and isinstance (operand2, Number):
+        if name == 'div' and operand1.value () == 0:
+            return None  # Leave the machine to raise the error at run time.
+        return 3, [Number (_ARITHMETIC [name] (operand1.value (), operand2.value ()), locn=op.locn ())]
+    if name in _COMPARISONS and isinstance (operand1, (Boolean, Number)) and isinstance (operand2, (Boolean, Number)):
+        return 3, [Boolean (_COMPARISONS [name] (operand2.value (), operand1.value ()), locn=op.locn ())]
+    return None
+
+
+def _peephole (tail: List [Instruction]) -> Optional [Tuple [int, List [Instruction]]]:
+    """Removes stack shuffles which have no effect and those whose operands are literals."""
+
+    if len (tail) < 2:
+        return None
+    name = _operator_name (tail [-1])
+    if (_operator_name (tail [-2]), name) in _NO_OPS:
+        return 2, []
+    if name == 'pop' and isinstance (tail [-2], _LITERALS):
+        return 2, []
+    if name == 'exch' and len (tail) >= 3 and isinstance (tail [-3], _LITERALS) and isinstance (tail [-2], _LITERALS):
+        return 3, [tail [-2], tail [-3]]
+    return None
+
+
+def _resolve_branches (tail: List [Instruction]) -> Optional [Tuple [int, List [Instruction]]]:
+    """Replaces an if or ifelse whose condition is a boolean literal with the body of the procedure that it runs."""
+
+    if not tail:
+        return None
+    name = _operator_name (tail [-1])
+    if name == 'if' and len (tail) >= 3 and isinstance (tail [-3], Boolean) and isinstance (tail [-2], Procedure):
+        return 3, list (tail [-2].instructions ()) if tail [-3].value () else []
+    if (name == 'ifelse' and len (tail) >= 4 and isinstance (tail [-4], Boolean) and
+            isinstance (tail [-3], Procedure) and isinstance (tail [-2], Procedure)):
+        return 4, list ((tail [-3] if tail [-4].value () else tail [-2]).instructions ())
+    return None
+
+
+class Pass (NamedTuple):
+    name: str  # The name by which the pass is reported.
+    level: int  # The lowest optimization level at which the pass is run.
+    rule: _Rule
+
+
+# The passes in the order in which they are run.
+PASSES = (
+    Pass ('constant folding', level=1, rule=_fold_constants),
+    Pass ('peephole', level=1, rule=_peephole),
+    Pass ('branch resolution', level=1, rule=_resolve_branches),
+)
+
+
+def count (instruction: Instruction) -> int:
+    """Returns the number of instructions in 'instruction', including itself and those in nested procedures."""
+
+    return 1 + sum (count (member) for member in instruction.instructions ())
+
+
+def _rewrite (instructions: List [Instruction], rule: _Rule) -> List [Instruction]:
+    result = list ()
+    for instruction in instructions:
+        if isinstance (instruction, Procedure):
+            instruction = Procedure (_rewrite (instruction.instructions (), rule), locn=instruction.locn ())
+        result.append (instruction)
+        match = rule (result)
+        while match is not None:
+            length, replacement = match
+            del result [-length:]
+            result.extend (replacement)
+            match = rule (result)
+    return result
+
+
+def run (procedure: Instruction, level: int) -> Tuple [Instruction, Dict [str, int]]:
+    """
+    Optimizes a procedure. The procedure is not modified.
+
+    :param procedure: The procedure to be optimized.
+    :param level: The optimization level, from 0 (which leaves the procedure unchanged) to MAX_LEVEL.
+    :return: The optimized procedure and the number of instructions removed by each of the passes which were run.
+    """
+
+    removed = dict ()
+    if not isinstance (procedure, Procedure):
+        return procedure, removed
+    passes = [p for p in PASSES if p.level <= level]
+    while passes:
+        before = count (procedure)
+        for p in passes:
+            size = count (procedure)
+            procedure = Procedure (_rewrite (procedure.instructions (), p.rule), locn=procedure.locn ())
+            removed [p.name] = removed.get (p.name, 0) + size - count (procedure)
+        # Every rewrite makes the procedure smaller, so this terminates.
+        if level < MAX_LEVEL or count (procedure) == before:
+            break
+    return procedure, removed
+
+# eof toycc/passes.py
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A persistent compile server. Running 'toycc --server SOCKET' keeps the compiler's modules (including the parser's
+grammar and the table of runtime builtins) loaded and keeps a copy of each repository that it uses, so that a
+compilation requested by a client (see toycc.client) costs neither the interpreter's start-up nor reading the
+repository. A cached repository is used only while the file's modification time, size, and inode are unchanged;
+otherwise it is read again.
+
+Each request is handled by its own thread. Requests and responses are single lines of JSON:
+
+    request:  {"cwd": <the client's working directory>, "args": [<toycc command-line arguments>],
+               "env": {<the client's TOYCC_ environment variables>}}
+              or {"command": "shutdown"}
+    response: {"status": <0 on success, 1 on failure>, "error": <a message or null>,
+               "output": <text for the client's standard output, such as that of --help>}
+
+The defaults which toycc takes from environment variables (such as TOYCC_CACHE_DIR) come from the request's "env",
+never from the server's own environment.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import socketserver
+import threading
+from typing import Any, Optional
+
+from toycc import driver, options
+
+_logger = logging.getLogger (__name__)
+
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+
+
+# argparse writes --help and its error messages to sys.stdout and sys.stderr, which are redirected while a
+# request's command line is parsed. The redirection is process-wide, so only one thread may parse at a time.
+_parse_lock = threading.Lock ()
+
+
+def _valid (request: Any) -> bool:
+    """Returns True if 'request' is a compile request that the server can act upon."""
+
+    if not isinstance (request, dict):
+        return False
+    args = request.get ('args')
+    if not isinstance (args, list) or not all (isinstance (arg, str) for arg in args):
+        return False
+    cwd = request.get ('cwd')
+    if not isinstance (cwd, str) or not os.path.isabs (cwd):
+        return False
+    env = request.get ('env', {})
+    return isinstance (env, dict) and all (isinstance (k, str) and isinstance (v, str) for k, v in env.items ())
+
+
+class _Handler (socketserver.StreamRequestHandler):
+    def handle (self) -> None:
+        try:
+            request = json.loads (self.rfile.readline ().decode ('utf-8'))
+        except ValueError:
+            self.__respond (EXIT_FAILURE, 'The request is not valid JSON')
+            return
+
+        if isinstance (request, dict) and request.get ('command') == 'shutdown':
+            _logger.info ('Shutting down')
+            self.__respond (EXIT_SUCCESS)
+            threading.Thread (target=self.server.shutdown).start ()
+            return
+        if not _valid (request):
+            self.__respond (EXIT_FAILURE, 'A request must give "args" (a list of strings) and "cwd" (an absolute path)')
+            return
+
+        output = io.StringIO ()
+        errors = io.StringIO ()
+        try:
+            with _parse_lock, contextlib.redirect_stdout (output), contextlib.redirect_stderr (errors):
+                opt = options.parse_command_line (request ['args'], environ=request.get ('env', {}))
+        except SystemExit as ex:
+            # --help exits with status 0; a command-line error exits with status 2 after writing the usage followed by
+            # a line giving the error.
+            if ex.code is None or ex.code == 0:
+                self.__respond (EXIT_SUCCESS, output=output.getvalue ())
+            else:
+                lines = errors.getvalue ().strip ().splitlines () or ['Invalid arguments']
+                self.__respond (EXIT_FAILURE, lines [-1], output.getvalue ())
+            return
+        if opt.server is not None:
+            self.__respond (EXIT_FAILURE, 'A compile server cannot be started by a client')
+            return
+        if opt.watch:
+            self.__respond (EXIT_FAILURE, 'A compile server cannot watch the source files')
+            return
+        opt.resolve (request ['cwd'])
+
+        _logger.info ('Compiling %s', ' '.join (opt.source_files))
+        try:
+            driver.compile (opt, self.server.repositories)
+        except Exception as ex:
+            _logger.error (ex)
+            self.__respond (EXIT_FAILURE, str (ex))
+        else:
+            self.__respond (EXIT_SUCCESS)
+
+    def __respond (self, status: int, error: Optional [str] = None, output: str = '') -> None:
+        response = {'status': status, 'error': error, 'output': output}
+        self.wfile.write (json.dumps (response).encode ('utf-8') + b'\n')
+
+
+class _Server (socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__ (self, path: str) -> None:
+        super ().__init__ (path, _Handler)
+        self.repositories = driver.CachedRepositories ()
+
+
+def serve (path: str) -> None:
+    """
+    Runs a compile server listening on the Unix socket at 'path' until a client asks it to shut down.
+
+    :param path: The path of the socket. Any existing socket at this path is replaced.
+    """
+
+    try:
+        os.unlink (path)
+    except FileNotFoundError:
+        pass
+    with _Server (path) as server:
+        _logger.info ("Listening on '%s'", path)
+        try:
+            server.serve_forever ()
+        finally:
+            os.unlink (path)
+
+# eof toycc.server
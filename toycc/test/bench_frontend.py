@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A benchmark for the compiler's front ends. It generates Toy source files of the requested sizes and reports the
+throughput, in tokens per second, of the pyparsing and the hand-written ("fast") parsers. With -g, a throughput
+which stays constant as the size grows shows that recording source locations is linear in the size of the source.
+
+    $ python -m toycc.test.bench_frontend -g --size 0.25 0.5 1
+    $ python -m toycc.test.bench_frontend -g --fast-only --size 1 2 5 10
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable
+
+from toycc import fast_frontend, frontend
+from toycc.options import parse_command_line
+
+_OPERATORS = ['add', 'sub', 'mul', 'dup', 'exch', 'pop', 'def', 'print', 'if', 'ifelse', 'for', 'known', 'end']
+
+
+def _body (rng: random.Random, depth: int, indent: str) -> str:
+    parts = list ()
+    for _ in range (rng.randint (2, 12)):
+        choice = rng.random ()
+        if choice < 0.3:
+            parts.append (rng.choice (['1', '-7', '3.14', '0.25e1', '314E-2', '42.']))
+        elif choice < 0.35:
+            parts.append (rng.choice (['true', 'false']))
+        elif choice < 0.4:
+            parts.append ('"str\\"ing {0}"'.format (rng.randint (0, 99)))
+        elif choice < 0.45:
+            parts.append ('# comment\n' + indent)
+        elif choice < 0.55 and depth < 3:
+            parts.append ('{\n' + indent + '    ' + _body (rng, depth + 1, indent + '    ') + '\n' + indent + '}')
+        else:
+            parts.append (rng.choice (_OPERATORS))
+    return ' '.join (parts)
+
+
+def make_source (size: int, seed: int = 0) -> str:
+    """Returns a syntactically valid Toy program of at least 'size' characters."""
+
+    rng = random.Random (seed)
+    chunks = ['# generated\n']
+    total = 0
+    index = 0
+    while total < size:
+        chunk = 'p{0} # procedure {0}\n{{\n\t{1}\n}}\n'.format (index, _body (rng, 0, '    '))
+        chunks.append (chunk)
+        total += len (chunk)
+        index += 1
+    return ''.join (chunks)
+
+
+def _measure (title: str, front_end: Callable, path: str, tokens: int, debug_info: bool) -> None:
+    args = [path, '-g'] if debug_info else [path]
+    start = time.perf_counter ()
+    front_end (parse_command_line (args))
+    elapsed = time.perf_counter () - start
+    print ('{0:>10}: {1:8.3f}s {2:12.0f} tokens/s'.format (title, elapsed, tokens / elapsed))
+
+
+def main () -> None:
+    parser = argparse.ArgumentParser (description='Benchmark the Toy compiler front ends.')
+    parser.add_argument ('--size', type=float, nargs='+', default=[1], help='the sizes of the generated sources in MB')
+    parser.add_argument ('-g', action='store_true', dest='debug_info', help='record source locations')
+    parser.add_argument ('--fast-only', action='store_true', help='skip the (much slower) pyparsing front end')
+    options = parser.parse_args ()
+
+    for size in options.size:
+        source = make_source (int (size * 1024 * 1024))
+        tokens = sum (1 for token in fast_frontend.tokenize (source) if token.kind != 'end')
+        fd, path = tempfile.mkstemp (suffix='.toy')
+        try:
+            with os.fdopen (fd, 'wt') as f:
+                f.write (source)
+            print ('{0} bytes, {1} tokens'.format (len (source), tokens))
+            if not options.fast_only:
+                _measure ('pyparsing', frontend.front_end, path, tokens, options.debug_info)
+            _measure ('fast', fast_frontend.front_end, path, tokens, options.debug_info)
+        finally:
+            os.unlink (path)
+
+if __name__ == '__main__':
+    main ()
+
+# eof toycc/test/bench_frontend.py
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from store.exetypes import Executable
+from store.types import Repository, SectionType
+from toycc import backend, driver, fast_frontend
+from toycc.options import parse_command_line
+from toygc.collector import gc
+from toyld.errors import LinkError
+from toyld.link import LinkSpec, link_many
+from toyvm import dyld, machine
+
+
+class TestCompile (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def __path (self, name: str) -> str:
+        return os.path.join (self.__dir, name)
+
+    def __write (self, name: str, text: str) -> str:
+        with open (self.__path (name), 'wt') as f:
+            f.write (text)
+        return self.__path (name)
+
+    def __compile (self, *args: str) -> Repository:
+        driver.compile (parse_command_line (['--frontend=fast', '-r', self.__path ('repo.db')] + list (args)))
+        return Repository.read (self.__path ('repo.db'))
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_streaming (self, optimize_procedure) -> None:
+        parsed = list ()
+        procedures = fast_frontend.procedures
+
+        def counting_procedures (opt):
+            for name, procedure in procedures (opt):
+                parsed.append (name)
+                yield name, procedure
+
+        # Record how many procedures had been parsed when each was optimized.
+        seen = list ()
+        optimize_procedure.side_effect = lambda name, procedure, level: seen.append (len (parsed))
+        source = self.__write ('a.toy', ''.join ('p{0} {{ {0} f }}\n'.format (index) for index in range (6)))
+        with mock.patch ('toycc.fast_frontend.procedures', counting_procedures):
+            repository = self.__compile (source)
+
+        self.assertEqual (6, len (seen))
+        # Code generation began before the parser reached the end of the file.
+        self.assertLess (min (seen), 6)
+        self.assertEqual (6, len (repository.fragments))
+        self.assertTrue (os.path.exists (self.__path ('a.o')))
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_shared_procedures (self, optimize_procedure) -> None:
+        a = self.__write ('a.toy', 'f { pop }\nmain { 1 f }\n')
+        b = self.__write ('b.toy', 'g { pop }\n')
+        repository = self.__compile (a, b)
+        # 'f' and 'g' have the same definition, so it is generated once.
+        self.assertEqual (2, optimize_procedure.call_count)
+        self.assertEqual (2, len (repository.fragments))
+        self.assertEqual ([['f', 'main'], ['g']],
+                          sorted ([member.name for member in ticket.members] for ticket in repository.tickets.values ()))
+
+        # Compiling again finds every procedure in the repository.
+        self.__compile (a)
+        self.assertEqual (2, optimize_procedure.call_count)
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_up_to_date (self, optimize_procedure) -> None:
+        a = self.__write ('a.toy', 'main { 1 f }\n')
+        repository = self.__compile (a)
+        self.assertEqual (1, len (repository.tickets))
+        ticket = backend.read_ticket (parse_command_line ([a]))
+        self.assertIn (ticket, repository.tickets)
+        self.assertIsNotNone (repository.tickets [ticket].input_digest)
+
+        # An unchanged file is not compiled again, and no new ticket is added.
+        with mock.patch ('toycc.fast_frontend.procedures') as procedures:
+            repository = self.__compile (a)
+            self.assertEqual (0, procedures.call_count)
+        self.assertEqual ([ticket], list (repository.tickets))
+
+        # A missing output file is written again from the repository's ticket.
+        os.unlink (self.__path ('a.o'))
+        repository = self.__compile (a)
+        self.assertEqual ([ticket], list (repository.tickets))
+        self.assertEqual (ticket, backend.read_ticket (parse_command_line ([a])))
+
+        # Changing an option or the source causes the file to be compiled.
+        self.assertEqual (2, len (self.__compile ('-g', a).tickets))
+        self.__write ('a.toy', 'main { 2 f }\n')
+        self.assertEqual (3, len (self.__compile ('-g', a).tickets))
+        # Only the change to the source produced new code: '-g' alone adds a debug record.
+        self.assertEqual (2, optimize_procedure.call_count)
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_debug_records (self, optimize_procedure) -> None:
+        a = self.__write ('a.toy', 'main { 1 f }\n')
+        repository = self.__compile ('-g', a)
+        member = next (iter (repository.tickets.values ())).members [0]
+        self.assertIsNotNone (member.debug_digest)
+        self.assertNotEqual (member.digest, member.debug_digest)
+        self.assertNotIn (SectionType.debug_line, repository.fragments [member.digest].sections)
+        self.assertEqual ({SectionType.debug_line}, set (repository.fragments [member.debug_digest].sections))
+
+        # Re-indenting the source changes its debug information but not its code, which is not generated again.
+        self.__write ('a.toy', '\n\nmain {\n    1\n    f\n}\n')
+        repository = self.__compile ('-g', a)
+        self.assertEqual (1, optimize_procedure.call_count)
+        self.assertEqual (3, len (repository.fragments))
+        new_member = repository.tickets [backend.read_ticket (parse_command_line ([a]))].members [0]
+        self.assertEqual (member.digest, new_member.digest)
+        self.assertNotEqual (member.debug_digest, new_member.debug_digest)
+        self.assertIn (new_member.debug_digest, repository.fragments)
+
+        # Without '-g' there is no debug record.
+        repository = self.__compile (a)
+        self.assertIsNone (repository.tickets [backend.read_ticket (parse_command_line ([a]))].members [0].debug_digest)
+
+    def __member (self, repository: Repository, source: str):
+        return repository.tickets [backend.read_ticket (parse_command_line ([source]))].members [0]
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_debug_prefix_map (self, optimize_procedure) -> None:
+        os.mkdir (self.__path ('one'))
+        os.mkdir (self.__path ('two'))
+        a = self.__write (os.path.join ('one', 'a.toy'), 'main { 1 f }\n')
+        b = self.__write (os.path.join ('two', 'a.toy'), 'main { 1 f }\n')
+
+        # The same file in two checkouts produces different debug records...
+        repository = self.__compile ('-g', a)
+        first = self.__member (repository, a)
+        repository = self.__compile ('-g', b)
+        self.assertNotEqual (first.debug_digest, self.__member (repository, b).debug_digest)
+
+        # ... unless the checkouts' paths are mapped to the same one.
+        repository = self.__compile ('-g', '-fdebug-prefix-map={0}=/src'.format (self.__path ('one')), a)
+        first = self.__member (repository, a)
+        fragments = len (repository.fragments)
+        repository = self.__compile ('-g', '-fdebug-prefix-map={0}=/src'.format (self.__path ('two')), b)
+        self.assertEqual (first.debug_digest, self.__member (repository, b).debug_digest)
+        self.assertEqual (fragments, len (repository.fragments))
+
+        # The map may instead be held by the repository.
+        repository.settings ['debug-prefix-map'] = os.pathsep.join (
+            '{0}=checkout'.format (self.__path (name)) for name in ('one', 'two'))
+        repository.write (self.__path ('repo.db'))
+        first = self.__member (self.__compile ('-g', a), a)
+        second = self.__member (self.__compile ('-g', b), b)
+        self.assertEqual (first.debug_digest, second.debug_digest)
+        self.assertEqual (1, optimize_procedure.call_count)
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_fragment_cache (self, optimize_procedure) -> None:
+        a = self.__write ('a.toy', 'f { 2 mul }\nmain { 1 f }\n')
+        cache = '--fragment-cache=' + self.__path ('cache')
+        self.__compile (cache, '-g', a)
+        self.assertEqual (2, optimize_procedure.call_count)
+
+        # A new repository gets the code from the cache. Only the debug records are generated.
+        args = ['--frontend=fast', '-r', self.__path ('other.db'), cache, '-g', a]
+        driver.compile (parse_command_line (args))
+        self.assertEqual (2, optimize_procedure.call_count)
+        first = Repository.read (self.__path ('repo.db'))
+        second = Repository.read (self.__path ('other.db'))
+        self.assertEqual (sorted (first.fragments.keys ()), sorted (second.fragments.keys ()))
+
+    def test_optimization_level (self) -> None:
+        a = self.__write ('a.toy', 'main { 2 3 add f }\n')
+        unoptimized = self.__member (self.__compile ('-g', a), a)
+        repository = self.__compile ('-g', '-O2', a)
+        optimized = self.__member (repository, a)
+        # The code produced at each level has a digest of its own.
+        self.assertNotEqual (unoptimized.digest, optimized.digest)
+        self.assertEqual (2, len (repository.tickets))
+        text = SectionType.text
+        self.assertLess (len (repository.fragments [optimized.digest].sections [text].data),
+                         len (repository.fragments [unoptimized.digest].sections [text].data))
+
+        # A debug record produced without generating the code again describes the optimized code.
+        debug_line = repository.fragments [optimized.debug_digest].sections [SectionType.debug_line].data
+        self.__write ('a.toy', '\nmain {\n    2 3 add\n    f\n}\n')
+        moved = self.__member (self.__compile ('-g', '-O2', a), a)
+        self.assertEqual (optimized.digest, moved.digest)
+        self.assertNotEqual (optimized.debug_digest, moved.debug_digest)
+        repository = Repository.read (self.__path ('repo.db'))
+        self.assertEqual (len (debug_line),
+                          len (repository.fragments [moved.debug_digest].sections [SectionType.debug_line].data))
+
+    def test_inline (self) -> None:
+        a = self.__write ('a.toy', 'main { 1 f }\nf { 2 add }\n')
+        repository = self.__compile ('-finline', '-fwhole-program', a)
+        members = {member.name: member for member in next (iter (repository.tickets.values ())).members}
+        # 'main' no longer refers to 'f'.
+        self.assertEqual ([], repository.fragments [members ['main'].digest].sections [SectionType.text].xfixups)
+
+        # A change to the callee changes the digest of its caller.
+        self.__write ('a.toy', 'main { 1 f }\nf { 3 add }\n')
+        repository = self.__compile ('-finline', '-fwhole-program', a)
+        self.assertNotEqual (members ['main'].digest, self.__member (repository, a).digest)
+
+        # Without inlining, 'main' calls 'f'.
+        repository = self.__compile (a)
+        main = self.__member (repository, a)
+        xfixups = repository.fragments [main.digest].sections [SectionType.text].xfixups
+        self.assertEqual (['f'], [x.name for x in xfixups])
+
+    def test_inline_modules_sample (self) -> None:
+        # 'main' replaces 'maxprime', which is defined and called by 'sieve' in another source file, so its calls
+        # mustn't be inlined.
+        samples = os.path.join (os.path.dirname (os.path.dirname (os.path.dirname (os.path.abspath (__file__)))),
+                                'samples', 'modules')
+        sources = [shutil.copy (os.path.join (samples, name), self.__dir)
+                   for name in ('main.toy', 'factorial.toy', 'sieve.toy')]
+        repository = Repository.new ()
+        tickets = driver.compile_many (sources, repository,
+                                       args=['--frontend=fast', '-O2', '-finline', '-fwhole-program'])
+        link_many ([LinkSpec (out_file=self.__path ('main.x'), tickets=tickets)], repository, self.__path ('repo.db'))
+        output = io.StringIO ()
+        with contextlib.redirect_stdout (output):
+            machine.Machine ().run (dyld.load (Executable.read (self.__path ('main.x'))))
+        self.assertEqual (['1.0', '2.0', '3.0', '5.0', '7.0', '11.0', '13.0', '17.0', '19.0', '23.0', '29.0', '31.0',
+                           '37.0', '41.0', '43.0', '47.0', 'factorial:', '6.0'], output.getvalue ().split ())
+
+    def test_compile_many (self) -> None:
+        a = self.__write ('a.toy', 'main { 1 f }\n')
+        b = self.__write ('b.toy', 'f { pop }\n')
+        repository = Repository.new ()
+        tickets = driver.compile_many ([a, b], repository, args=['--frontend=fast', '-g'])
+        self.assertEqual (2, len (tickets))
+        self.assertEqual ([self.__path ('a.o'), self.__path ('b.o')],
+                          [repository.tickets [ticket].path for ticket in tickets])
+        self.assertEqual (tickets [0], backend.read_ticket (parse_command_line ([a])))
+        # The repository was held in memory: no file was written for it.
+        self.assertFalse (os.path.exists (self.__path ('repo.db')))
+
+        # The up-to-date files are not compiled again. Only the changed file has a new ticket.
+        self.__write ('b.toy', 'f { dup pop pop }\n')
+        again = driver.compile_many ([a, b], repository, args=['--frontend=fast', '-g'])
+        self.assertEqual (tickets [0], again [0])
+        self.assertNotEqual (tickets [1], again [1])
+        self.assertEqual (3, len (repository.tickets))
+
+        self.assertRaises (ValueError, driver.compile_many, [a], repository, args=['--no-such-option'])
+
+    def test_compile_many_rejects_long_running_modes (self) -> None:
+        # compile_many () returns once its sources are compiled, so it cannot start a server or watch its sources.
+        a = self.__write ('a.toy', 'main { }\n')
+        repository = Repository.new ()
+        self.assertRaises (ValueError, driver.compile_many, [a], repository, args=['--server', self.__path ('s')])
+        self.assertRaises (ValueError, driver.compile_many, [a], repository, args=['--watch'])
+        self.assertEqual (0, len (repository.tickets))
+
+    def test_build_in_memory (self) -> None:
+        # Compile, link, and collect without reading or writing the repository between the steps.
+        a = self.__write ('a.toy', 'main { 1 f }\n')
+        b = self.__write ('b.toy', 'f { pop }\n')
+        repository = Repository.new ()
+        repository_path = self.__path ('repo.db')
+        tickets = driver.compile_many ([a, b], repository, args=['--frontend=fast', '-g'])
+        self.assertRaises (LinkError, link_many, [LinkSpec (self.__path ('a.x'), tickets, entry_points=['start'])],
+                           repository, repository_path)
+        self.assertFalse (os.path.exists (self.__path ('a.x')))
+
+        [entry_points] = link_many ([LinkSpec (out_file=self.__path ('a.x'), tickets=tickets)], repository,
+                                    repository_path)
+        self.assertEqual (1, len (entry_points))
+        executable = Executable.read (self.__path ('a.x'))
+        self.assertEqual (repository_path, executable.repository_record.path)
+        self.assertEqual (repository.uuid, executable.repository_record.uuid)
+        self.assertEqual ([executable.uuid], [link.uuid for link in repository.links])
+
+        # Once an object file has gone its ticket is collected, but the executable keeps its debug records alive.
+        os.unlink (self.__path ('b.o'))
+        collected = gc (repository)
+        self.assertEqual ([tickets [0]], list (collected.tickets))
+        self.assertEqual (repository.links, collected.links)
+        debug_digests = {d.debug_digest for d in executable.debug}
+        self.assertTrue (debug_digests <= set (collected.fragments))
+        self.assertEqual (2, len (repository.tickets))
+
+        collected.write (repository_path)
+        self.assertEqual (sorted (collected.fragments), sorted (Repository.read (repository_path).fragments))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toycc/test/test_driver.py
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import glob
+import os
+import tempfile
+import unittest
+from typing import Dict
+
+import pyparsing as pp
+
+from toycc import driver, fast_frontend, frontend, rebase
+from toycc.options import parse_command_line
+from toycc.test.bench_frontend import make_source
+import toyvm.instruction as instruction
+
+_SAMPLES = os.path.join (os.path.dirname (__file__), '..', '..', 'samples')
+
+
+class TestFastFrontEnd (unittest.TestCase):
+    """Checks that the hand-written parser agrees with the pyparsing grammar."""
+
+    def setUp (self) -> None:
+        self.__directory = tempfile.TemporaryDirectory ()
+
+    def tearDown (self) -> None:
+        self.__directory.cleanup ()
+
+    def __digests (self, front_end, path: str, debug_info: bool) -> Dict [str, str]:
+        options = parse_command_line ([path, '-g'] if debug_info else [path])
+        return {
+            name: driver._get_digest (rebase.rebase_source_info (procedure).procedure)
+            for name, procedure in front_end (options).items ()
+            }
+
+    def __check_same (self, path: str) -> None:
+        for debug_info in (False, True):
+            expected = self.__digests (frontend.front_end, path, debug_info)
+            self.assertEqual (expected, self.__digests (fast_frontend.front_end, path, debug_info))
+            self.assertNotEqual ({}, expected)
+
+    def __write (self, source: str) -> str:
+        path = os.path.join (self.__directory.name, 'source.toy')
+        with open (path, 'wt') as f:
+            f.write (source)
+        return path
+
+    def test_samples (self) -> None:
+        paths = glob.glob (os.path.join (_SAMPLES, '**', '*.toy'), recursive=True)
+        self.assertNotEqual ([], paths)
+        for path in paths:
+            with self.subTest (path=path):
+                self.__check_same (path)
+
+    def test_generated (self) -> None:
+        for seed in range (4):
+            with self.subTest (seed=seed):
+                self.__check_same (self.__write (make_source (4096, seed)))
+
+    def test_edge_cases (self) -> None:
+        source = ('true { 5true trueish "a""b" "x\\\ny" -2.e3 {} }\n'
+                  'p\t# tabs\n\t{\t{ false\t}\t}\n'
+                  'p { 1 }  # a later definition replaces an earlier one\n')
+        self.__check_same (self.__write (source))
+
+    def test_locations (self) -> None:
+        path = self.__write ('main {\n\t1 { x }\n}\n')
+        program = fast_frontend.front_end (parse_command_line ([path, '-g']))
+        main = program ['main']
+        self.assertEqual ((1, 6), (main.locn ().line, main.locn ().column))
+        one, inner = main.instructions ()
+        self.assertEqual ((2, 9), (one.locn ().line, one.locn ().column))
+        self.assertEqual ((2, 11), (inner.locn ().line, inner.locn ().column))
+        self.assertEqual (os.path.abspath (path), one.locn ().srcfile)
+
+    def test_errors (self) -> None:
+        for source in ('main{ }', 'main { a}', 'main { 1', 'main { "open }', "main { 'x' }", 'main # a\n# b\n{ }',
+                       'main { -x }', '{ }', 'main { $ }'):
+            with self.subTest (source=source):
+                self.assertRaises ((pp.ParseBaseException, AssertionError), frontend._grammar ().program.parseString,
+                                   source, parseAll=True)
+                self.assertRaises (fast_frontend.ParseError, fast_frontend.parse, source, 'source.toy', False)
+
+    def test_tokenize (self) -> None:
+        self.assertEqual ([('ident', 'a', 0), ('open', '{', 2), ('string', 's', 5), ('true', 'true', 9),
+                           ('comment', '# c', 14), ('close', '}', 18), ('end', '', 19)],
+                          [tuple (token) for token in fast_frontend.tokenize ('a {\n "s" true # c\n}')])
+
+    def test_error_position (self) -> None:
+        with self.assertRaises (fast_frontend.ParseError) as context:
+            fast_frontend.parse ('main {\n\t1 $ }\n', 'source.toy', False)
+        self.assertEqual ((2, 11), (context.exception.line, context.exception.column))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toycc/test/test_fast_frontend.py
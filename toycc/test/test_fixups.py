@@ -24,6 +24,7 @@ import unittest
 
 from toycc.fixups import procedure_fixups
 from toyvm.instruction import Number, Operator, Procedure
+from toyvm import systemdict
 from toyvm.machine import Machine
 
 class TestFixups (unittest.TestCase):
@@ -65,6 +66,11 @@ class TestFixups (unittest.TestCase):
         ]))
         self.assertEqual (fixups, [ ])
 
+    def test_builtin_names (self):
+        # The compiler's static table of names must agree with the operators that a machine implements.
+        self.assertEqual (set (Machine ().systemdict ().keys ()), systemdict.NAMES)
+        self.assertEqual ([], procedure_fixups (Procedure ([Operator (name) for name in sorted (systemdict.NAMES)])))
+
     def test_nested_procedure (self):
         inner_proc = Procedure ([ Operator ('foo') ])
         outer_proc = Procedure ([ Operator ('bar'), inner_proc ])
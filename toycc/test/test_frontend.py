@@ -29,7 +29,7 @@ import toyvm.instruction as instruction
 class TestFrontEnd (unittest.TestCase):
 
     def _as_number (self, string):
-        return frontend._number.parseString (string, parseAll=True).asList ()
+        return frontend._grammar ().number.parseString (string, parseAll=True).asList ()
 
     def test_number (self):
         Number = instruction.Number
@@ -51,7 +51,7 @@ class TestFrontEnd (unittest.TestCase):
 
 
     def _as_operator (self, string):
-        return frontend._operator.parseString (string, parseAll=True).asList ()
+        return frontend._grammar ().operator.parseString (string, parseAll=True).asList ()
 
     def test_operator (self):
         Operator = instruction.Operator
@@ -64,7 +64,7 @@ class TestFrontEnd (unittest.TestCase):
 
 
     def _as_boolean (self, string):
-        return frontend._boolean.parseString (string, parseAll=True).asList ()
+        return frontend._grammar ().boolean.parseString (string, parseAll=True).asList ()
 
     def test_boolean (self):
         self.assertEqual (self._as_boolean ('true'), [ instruction.Boolean (True) ])
@@ -76,7 +76,7 @@ class TestFrontEnd (unittest.TestCase):
 
 
     def _as_string (self, string):
-        return frontend._string.parseString (string, parseAll=True).asList ()
+        return frontend._grammar ().string.parseString (string, parseAll=True).asList ()
 
     def test_string (self):
         self.assertEqual (self._as_string ('"str"'), [ instruction.String ('str') ])
@@ -84,7 +84,7 @@ class TestFrontEnd (unittest.TestCase):
 
 
     def _as_procedure (self, string):
-        return frontend._procedure.parseString (string, parseAll=True).asList ()
+        return frontend._grammar ().procedure.parseString (string, parseAll=True).asList ()
 
     def test_procedure (self):
         self.assertEqual (self._as_procedure ('{ }'), [ instruction.Procedure ([]) ])
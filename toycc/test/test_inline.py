@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import contextlib
+import io
+import unittest
+from typing import Dict, Iterable, List
+
+from toycc import fast_frontend, inline, rebase
+from toyvm import machine
+from toyvm.instruction import Instruction, Operator, Procedure
+
+
+def _inline (source: str, limit: int = inline.DEFAULT_LIMIT, rebound: Iterable [str] = ()) -> Dict [str, Procedure]:
+    procedures = fast_frontend.parse (source, 'source.toy', debug_info=True).items ()
+    return dict (inline.inline_procedures (procedures, limit=limit, rebound=rebound))
+
+
+def _names (instructions: List [Instruction]) -> List:
+    """Returns the operator names and literal values of 'instructions', with a list for each nested procedure."""
+
+    return [x.name () if isinstance (x, Operator) else _names (x.instructions ()) if isinstance (x, Procedure)
+            else x.value () for x in instructions]
+
+
+def _run (program: Dict [str, Procedure]) -> str:
+    output = io.StringIO ()
+    with contextlib.redirect_stdout (output):
+        machine.Machine ().run (program)
+    return output.getvalue ()
+
+
+class TestInline (unittest.TestCase):
+    def test_inline (self) -> None:
+        program = _inline ('main {\n  1 two add\n  print\n}\ntwo { 2 }\n')
+        self.assertEqual ([1.0, 2.0, 'add', 'print'], _names (program ['main'].instructions ()))
+        # The inlined instructions take the location of the call.
+        self.assertEqual ((2, 5), (program ['main'].instructions () [1].locn ().line,
+                                   program ['main'].instructions () [1].locn ().column))
+        self.assertEqual ([2.0], _names (program ['two'].instructions ()))
+
+    def test_nested (self) -> None:
+        program = _inline ('main { true { f } if }\nf { g g }\ng { 1 { h } }\nh { 7 print }\n')
+        self.assertEqual ([True, [1.0, [7.0, 'print'], 1.0, [7.0, 'print']], 'if'],
+                          _names (program ['main'].instructions ()))
+        self.assertEqual ([1.0, [7.0, 'print']], _names (program ['g'].instructions ()))
+
+    def test_limit (self) -> None:
+        source = 'main { f }\nf { 1 2 3 }\n'
+        self.assertEqual ([1.0, 2.0, 3.0], _names (_inline (source, limit=3) ['main'].instructions ()))
+        self.assertEqual (['f'], _names (_inline (source, limit=2) ['main'].instructions ()))
+        # A procedure which would be small enough but for its own inlined calls isn't inlined.
+        program = _inline ('main { f }\nf { g 4 }\ng { 1 2 }\n', limit=2)
+        self.assertEqual (['f'], _names (program ['main'].instructions ()))
+        self.assertEqual ([1.0, 2.0, 4.0], _names (program ['f'].instructions ()))
+
+    def test_recursion (self) -> None:
+        program = _inline ('main { 3 f print }\n'
+                           'f { dup 0 eq { pop 1 } { dup 1 sub f mul } ifelse }\n', limit=20)
+        self.assertEqual ('6.0', _run (program).strip ())
+        # 'f' calls itself, so the copy inlined into 'main' still calls it.
+        self.assertEqual ([3.0, 'dup', 0.0, 'eq', ['pop', 1.0], ['dup', 1.0, 'sub', 'f', 'mul'], 'ifelse', 'print'],
+                          _names (program ['main'].instructions ()))
+
+    def test_last_definition (self) -> None:
+        self.assertEqual ([2.0], _names (_inline ('main { f }\nf { 1 }\nf { 2 }\n') ['main'].instructions ()))
+
+    def test_rebound (self) -> None:
+        # 'f' may be replaced by 'def', so the call to it must remain.
+        program = _inline ('main { "f" { 2 } def f print }\nf { 1 }\n')
+        self.assertEqual ('2.0', _run (program).strip ())
+        self.assertEqual (['f', [2.0], 'def', 'f', 'print'], _names (program ['main'].instructions ()))
+        # So must one which another translation unit may replace.
+        self.assertEqual (['f'], _names (_inline ('main { f }\nf { 1 }\n', rebound=['f']) ['main'].instructions ()))
+
+    def test_rebase (self) -> None:
+        program = _inline ('f { 1 }\n\n\nmain {\n  f\n  f\n}\n')
+        record = rebase.rebase_source_info (program ['main'])
+        self.assertEqual (4, record.line_base)
+        self.assertEqual ([1, 2], [x.locn ().line for x in record.procedure.instructions ()])
+        # The callee's own locations are unchanged.
+        self.assertEqual (1, rebase.rebase_source_info (program ['f']).line_base)
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toycc/test/test_inline.py
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import unittest
+from unittest import mock
+
+from store.types import SectionType
+from toycc import backend, optimizer
+from toycc.types import ProcedureRecord
+from toyvm.instruction import Number, Operator, Procedure
+
+
+def _program ():
+    return [('p{0}'.format (index),
+             ProcedureRecord (Procedure ([Number (float (index)), Operator ('f{0}'.format (index)), Operator ('g'),
+                                          Operator ('add')]), line_base=0))
+            for index in range (8)]
+
+
+class TestGenerate (unittest.TestCase):
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_order (self, optimize_procedure) -> None:
+        fragments = [fragment for fragment, _ in optimizer.generate (_program (),
+                                                                      emit_fragment=backend.generate_fragments)]
+        self.assertEqual (8, optimize_procedure.call_count)
+        self.assertEqual (8, len (fragments))
+        self.assertEqual (['f3', 'g'], [x.name for x in fragments [3].sections [SectionType.text].xfixups])
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_streaming (self, optimize_procedure) -> None:
+        consumed = list ()
+
+        def procedures ():
+            for name, procedure in _program ():
+                consumed.append (name)
+                yield name, procedure
+
+        fragments = optimizer.generate (procedures (), emit_fragment=backend.generate_fragments)
+        next (fragments)
+        # The first fragment is produced without waiting for the rest.
+        self.assertEqual (['p0'], consumed)
+        self.assertEqual (7, len (list (fragments)))
+
+    def test_level (self) -> None:
+        def program ():
+            return [('p', ProcedureRecord (Procedure ([Number (2.0), Number (3.0), Operator ('add')]), line_base=0))]
+
+        unoptimized, optimized = [list (optimizer.generate (program (), emit_fragment=backend.generate_fragments,
+                                                            level=level)) [0] [0]
+                                  for level in (0, 1)]
+        expected, _ = backend.generate_fragments (ProcedureRecord (Procedure ([Number (5.0)]), line_base=0))
+        self.assertEqual (expected.sections [SectionType.text].data, optimized.sections [SectionType.text].data)
+        self.assertNotEqual (expected.sections [SectionType.text].data, unoptimized.sections [SectionType.text].data)
+
+    def test_empty (self) -> None:
+        self.assertEqual ([], list (optimizer.generate ([], emit_fragment=backend.generate_fragments)))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toycc/test/test_optimizer.py
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from toycc.options import parse_command_line
+
+
+class TestOptions (unittest.TestCase):
+    def test_single_source (self) -> None:
+        options = parse_command_line (['-o', 'b.o', 'a.toy'])
+        self.assertEqual ([('a.toy', 'b.o')], [(u.source_file, u.out_file) for u in options.translation_units ()])
+
+    def test_several_sources (self) -> None:
+        options = parse_command_line (['-j', '2', 'a.toy', os.path.join ('d', 'b.toy')])
+        self.assertEqual (2, options.jobs)
+        self.assertEqual ([('a.toy', 'a.o'), (os.path.join ('d', 'b.toy'), os.path.join ('d', 'b.o'))],
+                          [(u.source_file, u.out_file) for u in options.translation_units ()])
+
+    def test_response_file (self) -> None:
+        fd, path = tempfile.mkstemp ()
+        try:
+            with os.fdopen (fd, 'wt') as f:
+                f.write ('a.toy\nb.toy\n')
+            options = parse_command_line (['-g', '@' + path])
+            self.assertEqual (['a.toy', 'b.toy'], [u.source_file for u in options.translation_units ()])
+            self.assertTrue (all (u.debug_info for u in options.translation_units ()))
+        finally:
+            os.unlink (path)
+
+    def test_optimization_level (self) -> None:
+        self.assertEqual (0, parse_command_line (['a.toy']).optimization_level)
+        self.assertEqual (1, parse_command_line (['-O', 'a.toy']).optimization_level)
+        self.assertEqual (2, parse_command_line (['-O2', 'a.toy']).optimization_level)
+        with contextlib.redirect_stderr (io.StringIO ()), self.assertRaises (SystemExit):
+            parse_command_line (['-O3', 'a.toy'])
+
+    def test_inline (self) -> None:
+        options = parse_command_line (['a.toy'])
+        self.assertFalse (options.inline)
+        options = parse_command_line (['-finline', '-finline-limit=4', '-fwhole-program', 'a.toy'])
+        self.assertEqual ((True, 4, True), (options.inline, options.inline_limit, options.whole_program))
+        # Another module could replace the inlined procedures.
+        with contextlib.redirect_stderr (io.StringIO ()), self.assertRaises (SystemExit):
+            parse_command_line (['-finline', 'a.toy'])
+
+    def test_watch (self) -> None:
+        options = parse_command_line (['a.toy'])
+        self.assertEqual ((False, None), (options.watch, options.link_file))
+        options = parse_command_line (['--watch', '--link', 'a.x', '--watch-interval', '2', 'a.toy'])
+        self.assertEqual ((True, 'a.x', 2.0), (options.watch, options.link_file, options.watch_interval))
+        for args in (['--link', 'a.x', 'a.toy'], ['--watch', '--server', 's'],
+                     ['--watch', '--watch-interval=0', 'a.toy']):
+            with self.subTest (args=args), contextlib.redirect_stderr (io.StringIO ()), self.assertRaises (SystemExit):
+                parse_command_line (args)
+
+    def test_output_with_several_sources (self) -> None:
+        with contextlib.redirect_stderr (io.StringIO ()), self.assertRaises (SystemExit):
+            parse_command_line (['-o', 'x.o', 'a.toy', 'b.toy'])
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toycc/test/test_options.py
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import contextlib
+import io
+import os
+import unittest
+from typing import Dict, List
+
+from toycc import fast_frontend, passes
+from toyvm import machine
+from toyvm.instruction import Boolean, Instruction, Number, Operator, Procedure
+
+_SAMPLES = os.path.join (os.path.dirname (__file__), '..', '..', 'samples')
+
+
+def _parse (source: str) -> Dict [str, Procedure]:
+    return fast_frontend.parse (source, 'source.toy', debug_info=True)
+
+
+def _optimize (source: str, level: int = 1) -> List [Instruction]:
+    procedure, _ = passes.run (_parse ('main { ' + source + ' }') ['main'], level)
+    return procedure.instructions ()
+
+
+def _run (program: Dict [str, Procedure]) -> str:
+    output = io.StringIO ()
+    with contextlib.redirect_stdout (output):
+        machine.Machine ().run (program)
+    return output.getvalue ()
+
+
+class TestPasses (unittest.TestCase):
+    def test_fold_arithmetic (self) -> None:
+        instructions = _optimize ('2 3 add\n4 mul f')
+        self.assertEqual ([20.0], [x.value () for x in instructions [:1]])
+        # The result takes the location of the operator which produced it.
+        self.assertEqual (2, instructions [0].locn ().line)
+        self.assertEqual ('f', instructions [1].name ())
+
+    def test_fold_div (self) -> None:
+        # The machine divides the number on the top of the stack by the one beneath it.
+        self.assertEqual ([0.25], [x.value () for x in _optimize ('8 2 div')])
+        self.assertEqual (3, len (_optimize ('0 5 div')))
+
+    def test_fold_comparison (self) -> None:
+        self.assertEqual ([True, False, True], [x.value () for x in _optimize ('1 1 eq true false eq 1 true eq')])
+        self.assertEqual (3, len (_optimize ('"a" "a" eq')))
+
+    def test_peephole (self) -> None:
+        instructions = _optimize ('f dup pop exch exch 1 pop { g } pop 1 2 exch')
+        self.assertEqual (['f', 2.0, 1.0], [x.name () or x.value () for x in instructions])
+
+    def test_branches (self) -> None:
+        instructions = _optimize ('true { a } if false { b } if true { c } { d } ifelse false { e } { f } ifelse '
+                                  'x { g } if')
+        self.assertEqual (['a', 'c', 'f', 'x', None, 'if'], [x.name () for x in instructions])
+        self.assertEqual (1, instructions [0].locn ().line)
+
+    def test_nested (self) -> None:
+        (procedure,) = _optimize ('{ 1 2 add { dup pop } }')
+        self.assertIsInstance (procedure, Procedure)
+        self.assertEqual (2, len (procedure.instructions ()))
+        self.assertEqual ([], procedure.instructions () [1].instructions ())
+
+    def test_levels (self) -> None:
+        source = '2 1 1 eq { 3 } if add'
+        self.assertEqual (7, len (_optimize (source, level=0)))
+        # At -O1 the branch is resolved after the constants are folded; -O2 runs the passes again.
+        self.assertEqual ([2.0, 3.0, 'add'], [x.name () or x.value () for x in _optimize (source, level=1)])
+        self.assertEqual ([5.0], [x.value () for x in _optimize (source, level=2)])
+
+    def test_removed (self) -> None:
+        procedure = _parse ('main { 1 1 eq { 2 3 add } if dup pop }') ['main']
+        optimized, removed = passes.run (procedure, level=2)
+        self.assertEqual ({'constant folding': 4, 'peephole': 2, 'branch resolution': 3}, removed)
+        self.assertEqual (passes.count (procedure) - sum (removed.values ()), passes.count (optimized))
+        # The original procedure is unchanged.
+        self.assertEqual (7, len (procedure.instructions ()))
+
+    def test_unchanged (self) -> None:
+        procedure = Procedure ([Number (1.0), Operator ('f'), Boolean (True)])
+        optimized, removed = passes.run (procedure, level=2)
+        self.assertEqual (procedure, optimized)
+        self.assertEqual (0, sum (removed.values ()))
+
+    def test_sample (self) -> None:
+        """Checks that an optimized sample produces the same output as the original."""
+
+        with open (os.path.join (_SAMPLES, 'modules', 'factorial.toy'), 'rt') as f:
+            program = _parse (f.read () + '\nmain { fact3 print 0 factorial print 2 3 add factorial print }\n')
+        optimized = {name: passes.run (procedure, level=2) [0] for name, procedure in program.items ()}
+        self.assertEqual ('6.0\n1.0\n120.0\n', _run (optimized))
+        self.assertEqual (_run (program), _run (optimized))
+
+    def test_equivalent (self) -> None:
+        program = _parse ('main { 1 2 add 3 add 2 mul 4 div print 1 2 3 exch sub print pop true { "yes" print } '
+                          '{ "no" print } ifelse 2 2 ne { "a" } { "b" } ifelse print f f }\n'
+                          'f { 1 2 dup pop exch exch 2 1 eq print print }')
+        optimized = {name: passes.run (procedure, level=2) [0] for name, procedure in program.items ()}
+        self.assertLess (passes.count (optimized ['main']), passes.count (program ['main']))
+        self.assertEqual (_run (program), _run (optimized))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toycc/test/test_passes.py
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from store.types import Repository
+from toycc import client, options, server
+
+
+@unittest.skipUnless (hasattr (server.socketserver, 'ThreadingUnixStreamServer'), 'Unix sockets are not available')
+class TestServer (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.__socket = os.path.join (self.__dir, 'toycc.sock')
+        self.__thread = threading.Thread (target=server.serve, args=(self.__socket,))
+        self.__thread.start ()
+        while not os.path.exists (self.__socket):
+            time.sleep (0.01)
+
+    def tearDown (self) -> None:
+        client.shutdown (self.__socket)
+        self.__thread.join ()
+        shutil.rmtree (self.__dir)
+
+    def __write (self, name: str, text: str) -> None:
+        with open (os.path.join (self.__dir, name), 'wt') as f:
+            f.write (text)
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_compile (self, _) -> None:
+        self.__write ('a.toy', 'main { 1 2 add f }\n')
+        self.__write ('b.toy', 'f { pop }\n')
+        self.__write ('sources', 'b.toy\n')
+
+        threads = [threading.Thread (target=client.compile, args=(self.__socket, args), kwargs={'cwd': self.__dir})
+                   for args in (['a.toy'], ['@sources'])]
+        for thread in threads:
+            thread.start ()
+        for thread in threads:
+            thread.join ()
+
+        self.assertTrue (os.path.exists (os.path.join (self.__dir, 'a.o')))
+        self.assertTrue (os.path.exists (os.path.join (self.__dir, 'b.o')))
+        repository = Repository.read (os.path.join (self.__dir, 'repo.db'))
+        self.assertEqual (2, len (repository.tickets))
+        self.assertEqual (2, len (repository.fragments))
+
+        # A second compilation uses the server's copy of the repository, which was brought up to date by the first.
+        response = client.compile (self.__socket, ['-o', 'c.o', 'a.toy'], cwd=self.__dir)
+        self.assertEqual ({'status': 0, 'error': None, 'output': ''}, response)
+        self.assertEqual (3, len (Repository.read (os.path.join (self.__dir, 'repo.db')).tickets))
+
+    def test_error (self) -> None:
+        response = client.compile (self.__socket, ['missing.toy'], cwd=self.__dir)
+        self.assertEqual (1, response ['status'])
+        self.assertIn ('missing.toy', response ['error'])
+
+    def test_invalid_request (self) -> None:
+        for message in ({}, {'args': ['a.toy']}, {'cwd': self.__dir}, {'args': 'a.toy', 'cwd': self.__dir},
+                        {'args': ['a.toy'], 'cwd': 'relative'}, {'args': ['a.toy'], 'cwd': self.__dir, 'env': []}):
+            response = client.request (self.__socket, message)
+            self.assertEqual (1, response ['status'], message)
+            self.assertIsNotNone (response ['error'])
+
+    def test_help (self) -> None:
+        response = client.compile (self.__socket, ['--help'], cwd=self.__dir)
+        self.assertEqual (0, response ['status'])
+        self.assertIn ('usage:', response ['output'])
+
+    def test_invalid_arguments (self) -> None:
+        response = client.compile (self.__socket, ['--no-such-option', 'a.toy'], cwd=self.__dir)
+        self.assertEqual (1, response ['status'])
+        self.assertIn ('--no-such-option', response ['error'])
+
+    @mock.patch ('toycc.optimizer.optimize_procedure')
+    def test_client_environment (self, _) -> None:
+        self.__write ('a.toy', 'main { 1 pop }\n')
+        cache = os.path.join (self.__dir, 'cache')
+        with mock.patch.dict (os.environ, {options.CACHE_DIR_VARIABLE: ''}):
+            response = client.compile (self.__socket, ['a.toy'], cwd=self.__dir,
+                                       environ={options.CACHE_DIR_VARIABLE: cache})
+        self.assertEqual (0, response ['status'])
+        self.assertTrue (os.path.isdir (cache))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toycc/test/test_server.py
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from store.exetypes import Executable
+from toycc import fast_frontend, watch
+from toycc.options import parse_command_line
+
+
+class TestWatcher (unittest.TestCase):
+    def setUp (self) -> None:
+        self.__dir = tempfile.mkdtemp ()
+        self.__times = 0
+
+    def tearDown (self) -> None:
+        shutil.rmtree (self.__dir)
+
+    def __path (self, name: str) -> str:
+        return os.path.join (self.__dir, name)
+
+    def __write (self, name: str, text: str) -> str:
+        path = self.__path (name)
+        with open (path, 'wt') as f:
+            f.write (text)
+        # Give each version of a file a distinct modification time however coarse the file system's clock.
+        self.__times += 1
+        os.utime (path, ns=(self.__times * 10 ** 9, self.__times * 10 ** 9))
+        return path
+
+    def __exe_uuid (self):
+        return Executable.read (self.__path ('a.x')).uuid
+
+    def test_poll (self) -> None:
+        a = self.__write ('a.toy', 'main { 1 f }\n')
+        b = self.__write ('b.toy', 'f { pop }\n')
+        watcher = watch.Watcher (parse_command_line (['--frontend=fast', '-g', '-r', self.__path ('repo.db'),
+                                                      '--watch', '--link', self.__path ('a.x'), a, b]))
+        build = watcher.poll ()
+        self.assertEqual ([a, b], build.changed)
+        self.assertEqual ((2, True), (build.compiled, build.linked))
+        linked = self.__exe_uuid ()
+        self.assertIsNone (watcher.poll ())
+
+        # A change to a comment needs a compilation but not a link.
+        self.__write ('b.toy', 'f { pop }\n# a comment\n')
+        build = watcher.poll ()
+        self.assertEqual (([b], 1, False), (build.changed, build.compiled, build.linked))
+        self.assertEqual (linked, self.__exe_uuid ())
+
+        # A change to the code is compiled and linked.
+        self.__write ('b.toy', 'f { dup pop pop }\n')
+        build = watcher.poll ()
+        self.assertEqual ((1, True), (build.compiled, build.linked))
+        self.assertNotEqual (linked, self.__exe_uuid ())
+
+        # A file which doesn't compile is reported once and built again when it next changes.
+        self.__write ('a.toy', 'main { 1 f\n')
+        self.assertRaises (fast_frontend.ParseError, watcher.poll)
+        self.assertIsNone (watcher.poll ())
+        self.__write ('a.toy', 'main { 2 f }\n')
+        build = watcher.poll ()
+        self.assertEqual (([a], 1, True), (build.changed, build.compiled, build.linked))
+
+    def test_without_link (self) -> None:
+        a = self.__write ('a.toy', 'main { 1 pop }\n')
+        watcher = watch.Watcher (parse_command_line (['--frontend=fast', '-r', self.__path ('repo.db'), '--watch', a]))
+        build = watcher.poll ()
+        self.assertEqual ((1, False), (build.compiled, build.linked))
+        self.assertTrue (os.path.exists (self.__path ('a.o')))
+        self.assertFalse (os.path.exists (self.__path ('a.x')))
+
+        # Removing the object file has it written again, but the translation unit is up to date.
+        os.unlink (self.__path ('a.o'))
+        self.__write ('a.toy', 'main { 1 pop }\n')
+        self.assertEqual (0, watcher.poll ().compiled)
+        self.assertTrue (os.path.exists (self.__path ('a.o')))
+
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toycc/test/test_watch.py
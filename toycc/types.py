@@ -24,12 +24,16 @@
 Basic types private to the compiler.
 """
 
+from typing import Optional
+
 from toyvm import instruction
 
 class NameMeta:
-    def __init__ (self, digest: str, line_base: int) -> None:
+    def __init__ (self, digest: str, line_base: int, debug_digest: Optional [str] = None) -> None:
         self.digest = digest
         self.line_base = line_base
+        # The digest of the fragment holding the procedure's debug_line data, or None if it has no source locations.
+        self.debug_digest = debug_digest
 
 
 class ProcedureRecord:
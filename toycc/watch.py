@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+The compiler's watch mode. 'toycc --watch' compiles its source files and then polls their modification times,
+compiling again whenever one of them changes. The compiler's modules, the parser's grammar, and a copy of the
+repository (see driver.CachedRepositories) stay loaded between compilations. A translation unit which is unchanged
+is not compiled again, and a procedure whose digest is already in the repository is not generated again.
+
+With --link, the executable is linked again after a compilation only if it changed the members of the object files'
+tickets (the names that they define, and the digests of their code and debug records): a change to a comment, for
+example, needs no link. The time taken to rebuild it is reported for each change.
+"""
+
+import logging
+import os
+import time
+import uuid
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from toycc import backend, driver, options
+
+_logger = logging.getLogger (__name__)
+
+# A member of a ticket: its name, the digest of its code, its line base, and the digest of its debug record.
+_Member = Tuple [str, str, Optional [int], Optional [str]]
+
+
+def _signature (path: str) -> Optional [Tuple [int, int]]:
+    try:
+        st = os.stat (path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Build (NamedTuple):
+    """The result of a build started by a change to the source files."""
+
+    changed: List [str]  # The source files which had changed.
+    compiled: int  # The number of translation units which were compiled.
+    linked: bool  # True if the executable was linked.
+    seconds: float  # The time taken by the build.
+    latency: float  # The time from the newest change to the end of the build.
+
+
+class Watcher:
+    """Builds the object files (and, optionally, the executable) named by the options whenever their sources change."""
+
+    def __init__ (self, opt: options.Options) -> None:
+        self.__opt = opt
+        self.__repositories = driver.CachedRepositories ()
+        self.__signatures = dict ()  # type: Dict [str, Optional [Tuple [int, int]]]
+        # The tickets named by the object files and the members of those from which the executable was last linked.
+        self.__tickets = [backend.read_ticket (unit) for unit in opt.translation_units ()]
+        self.__linked = None  # type: Optional [FrozenSet [_Member]]
+
+    def changed (self) -> List [str]:
+        """Returns the source files which have changed since they were last built."""
+
+        return [path for path in self.__opt.source_files if _signature (path) != self.__signatures.get (path, 0)]
+
+    def poll (self) -> Optional [Build]:
+        """
+        Builds the object files, and the executable, if any of the source files have changed.
+
+        :return: A description of the build or None if nothing had changed.
+        """
+
+        changed = self.changed ()
+        if not changed:
+            return None
+        start = time.perf_counter ()
+        # A file which changes during the build will be built again by the next poll.
+        for path in changed:
+            self.__signatures [path] = _signature (path)
+
+        tickets = driver.compile (self.__opt, self.__repositories)
+        compiled = sum (1 for old, new in zip (self.__tickets, tickets) if old != new)
+        self.__tickets = tickets
+
+        linked = False
+        if self.__opt.link_file is not None:
+            members = self.__members (tickets)
+            linked = members != self.__linked or not os.path.exists (self.__opt.link_file)
+            if linked:
+                self.__link (tickets)
+                self.__linked = members
+
+        newest = max (signature [0] for signature in self.__signatures.values () if signature is not None)
+        end = time.perf_counter ()
+        return Build (changed=changed, compiled=compiled, linked=linked, seconds=end - start,
+                      latency=max (time.time () - newest / 1e9, end - start))
+
+    def __members (self, tickets: List [uuid.UUID]) -> FrozenSet [_Member]:
+        with self.__repositories.lock ():
+            transaction = self.__repositories.begin (self.__opt.repository)
+            transaction.abort ()
+        return frozenset ((member.name, member.digest, member.line_base, member.debug_digest)
+                          for ticket in tickets for member in transaction.repository.tickets [ticket].members)
+
+    def __link (self, tickets: List [uuid.UUID]) -> None:
+        # The linker is loaded only when it is first needed.
+        from toyld import link
+
+        opt = self.__opt
+        with self.__repositories.lock ():
+            transaction = self.__repositories.begin (opt.repository)
+            link.link_file (link.LinkSpec (out_file=opt.link_file, tickets=tickets), transaction,
+                            repository_path=opt.repository)
+            self.__repositories.committed (transaction)
+
+
+def _report (opt: options.Options, build: Build) -> str:
+    text = 'Compiled {0} of {1} files'.format (build.compiled, len (opt.source_files))
+    if build.linked:
+        text += " and linked '{0}'".format (opt.link_file)
+    elif opt.link_file is not None:
+        text += " ('{0}' is unchanged)".format (opt.link_file)
+    return text + ' in {0:.3f}s ({1:.3f}s after the change)'.format (build.seconds, build.latency)
+
+
+def watch (opt: options.Options) -> None:
+    """
+    Builds the files named by 'opt', then builds them again whenever their sources change, until interrupted. A
+    failed build is reported, and the files are built again once they next change.
+    """
+
+    watcher = Watcher (opt)
+    try:
+        while True:
+            try:
+                build = watcher.poll ()
+            except Exception as ex:
+                if opt.debug:
+                    raise
+                _logger.error (ex)
+                print ('Build failed', flush=True)
+            else:
+                if build is not None:
+                    print (_report (opt, build), flush=True)
+            time.sleep (opt.watch_interval)
+    except KeyboardInterrupt:
+        pass
+
+# eof toycc.watch
@@ -22,11 +22,13 @@
 
 # System modules
 import argparse
+import functools
 import logging
 import signal
 import sys
-from typing import Iterable, Sequence
+from typing import Iterable, Sequence, Tuple
 
+from store import prefix_map
 from toydb import command_processor, list_cmd, load_cmd, stacks, step_cmd
 from toyvm import machine
 
@@ -110,6 +112,14 @@ class Options:
         self.verbose = opt.verbose
         self.program = opt.program
         self.debug = opt.debug
+        self.debug_prefix_map = prefix_map.PrefixMap (opt.debug_prefix_map or [])
+
+
+def _prefix_map_entry (text: str) -> Tuple [str, str]:
+    try:
+        return prefix_map.parse_entry (text)
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError (str (ex))
 
 
 def command_line (args: Iterable [str], program: str = 'toydb') -> Options:
@@ -126,6 +136,10 @@ def command_line (args: Iterable [str], program: str = 'toydb') -> Options:
                          help='Execute a command; specify once for each command')
     parser.add_argument ('-v', '--verbose', action='store_true',
                          help='Produce verbose output')
+    parser.add_argument ('-fdebug-prefix-map', action='append', type=_prefix_map_entry, metavar='OLD=NEW',
+                         dest='debug_prefix_map',
+                         help='The program was compiled with the same toycc option: find the source paths which '
+                              'begin with NEW under the directory OLD instead. May be given more than once.')
     parser.add_argument ('--debug', action='store_true', help='Emit debugging trace.')
     return Options (parser.parse_args (args))
 
@@ -158,11 +172,15 @@ def main (args: Sequence [str] = sys.argv [1:]) -> int:
 
         _logger.info ("Toy debugger. Remember, it's just a toy.")
 
+        # The load command reverses the compiler's source path mapping given on the command line.
+        commands = dict (COMMANDS)
+        commands ['load'] = functools.partial (load_cmd.load_handler, source_map=options.debug_prefix_map)
+
         mach = machine.Machine ()
         if options.program:
-            load_cmd.load_handler (machine=mach, tokens=[options.program])
+            commands ['load'] (mach, [options.program])
 
-        cmd = command_processor.CommandProcessor (machine=mach, commands=COMMANDS)
+        cmd = command_processor.CommandProcessor (machine=mach, commands=commands)
         if options.command is not None:
             for c in options.command:
                 cmd.command (c)
@@ -24,10 +24,10 @@
 import io
 import logging
 import uuid
-from typing import List, Mapping, Optional, Sequence
-import yaml
+from typing import Dict, List, Mapping, Optional, Sequence
 
 # Local modules
+from store import prefix_map
 from store.exetypes import Executable
 from store.types import DebugLineRecord, Fragment, Repository, SectionType
 from toyvm import dyld
@@ -55,7 +55,27 @@ def find_fragment (repository: Repository, fragment_digest: str) -> Optional [Fr
     return repository.fragments.get (fragment_digest)
 
 
-def load_debug_info (executable:Executable, in_memory_program: Mapping [str, Instruction]) -> None:
+def _unmap_sources (instruction: Instruction, source_map: prefix_map.PrefixMap, paths: Dict [str, str]) -> None:
+    """
+    Replaces the source paths recorded by the debug information of 'instruction', and of those that it contains, with
+    the local paths from which they were mapped.
+
+    :param paths: A cache of the paths that have already been mapped.
+    """
+
+    locn = instruction.locn ()
+    if locn is not None:
+        srcfile = paths.get (locn.srcfile)
+        if srcfile is None:
+            srcfile = paths [locn.srcfile] = source_map.unmap (locn.srcfile)
+        locn.srcfile = srcfile
+    for inst in instruction.instructions ():
+        _unmap_sources (inst, source_map, paths)
+
+
+def load_debug_info (executable:Executable,
+                     in_memory_program: Mapping [str, Instruction],
+                     source_map: prefix_map.PrefixMap = prefix_map.PrefixMap ()) -> None:
     """
     Loads the source correspondence for a loaded program (in_memory_program) from the information provided in
     the executable file from which that program was loaded, or more particularly, the program repositories
@@ -63,6 +83,8 @@ def load_debug_info (executable:Executable, in_memory_program: Mapping [str, Ins
 
     :param executable:
     :param in_memory_program:
+    :param source_map: The map with which the compiler's -fdebug-prefix-map option rewrote the source paths. It is
+                       reversed before the repository's map.
     :return: Nothing
     """
 
@@ -71,6 +93,11 @@ def load_debug_info (executable:Executable, in_memory_program: Mapping [str, Ins
         return
 
     repository = Repository.read (executable.repository_record.path)
+    # The compiler may have mapped the source paths (see store.prefix_map). As when they were mapped, the command
+    # line's entries are followed by the repository's.
+    setting = repository.settings.get (prefix_map.SETTING)
+    source_map = source_map + prefix_map.PrefixMap (prefix_map.parse_setting (setting))
+    paths = dict ()
 
     address_to_symbol_map = {
         symbol.address: symbol
@@ -81,7 +108,8 @@ def load_debug_info (executable:Executable, in_memory_program: Mapping [str, Ins
         assert isinstance (debug_record, DebugLineRecord)
 
         symbol = address_to_symbol_map [debug_record.address]
-        fragment = find_fragment (repository, debug_record.fragment)
+        # The line table is held by a record of its own unless the executable predates them.
+        fragment = find_fragment (repository, debug_record.debug_digest or debug_record.fragment)
         if fragment is None:
             _logger.warning ("Could not load fragment for %s", symbol.name)
         else:
@@ -90,26 +118,26 @@ def load_debug_info (executable:Executable, in_memory_program: Mapping [str, Ins
             _logger.debug ('Loading source correspondence for %s', symbol.name)
             in_memory_program [symbol.name].read_debug (binary=io.BytesIO (debug_line.data),
                                                         line_base=debug_record.line_base)
+            if source_map:
+                _unmap_sources (in_memory_program [symbol.name], source_map, paths)
 
 
-def load_handler (machine: Machine, tokens: Sequence [str]) -> None:
+def load_handler (machine: Machine, tokens: Sequence [str],
+                  source_map: prefix_map.PrefixMap = prefix_map.PrefixMap ()) -> None:
     if len (tokens) != 1:
         _logger.warning ('Unexpected arguments')
 
     executable_name = tokens [0]
     try:
-        f = open (executable_name, 'rt')
+        content = Executable.read (executable_name)
     except FileNotFoundError:
         _logger.error ('Executable "%s" was not found', executable_name)
     else:
-        with f:
-            content = yaml.load (f)
-
         program = dyld.load (content)
 
         # Now load the source correspondence information from the program repository and use it to annotate
         # our newly loaded instructions.
-        load_debug_info (content, program)
+        load_debug_info (content, program, source_map)
 
         # Prepare the program for execution by pushing its names onto the dictionary stack and scheduling 'main'
         # for execution.
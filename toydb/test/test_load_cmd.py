@@ -24,9 +24,19 @@
 Tests for the Toy debugger's instruction and debug line information loading.
 """
 
+import os
+import tempfile
 import unittest
 
-from store.types import SectionType
+from store.exetypes import Executable
+from store.prefix_map import PrefixMap
+from store.types import Repository, SectionType
+from toycc import driver
+from toycc.options import parse_command_line
+from toydb import load_cmd
+from toydb.__main__ import command_line
+from toyld.link import LinkSpec, link_many
+from toyvm import dyld
 from toyvm.instruction import Instruction, Number, Procedure, SourceLocation
 
 
@@ -76,6 +86,42 @@ class LoadTests (unittest.TestCase):
         self.assertEqual (SourceLocation (srcfile="foo.toy", line=23, column=29), instructions [0].locn ())
         self.assertEqual (SourceLocation (srcfile="foo.toy", line=24, column=31), instructions [1].locn ())
 
+    def test_unmap_sources (self) -> None:
+        with tempfile.TemporaryDirectory () as directory:
+            open (os.path.join (directory, 'foo.toy'), 'w').close ()
+            procedure = Procedure ([
+                Number (value=42.0, locn=SourceLocation (srcfile="/src/foo.toy", line=2, column=3)),
+                Number (value=68.0, locn=SourceLocation (srcfile="/src/bar.toy", line=3, column=4)),
+            ], locn=SourceLocation (srcfile="/src/foo.toy", line=1, column=1))
+            load_cmd._unmap_sources (procedure, PrefixMap ([(directory, '/src')]), dict ())
+            self.assertEqual (os.path.join (directory, 'foo.toy'), procedure.locn ().srcfile)
+            self.assertEqual (os.path.join (directory, 'foo.toy'), procedure.instructions () [0].locn ().srcfile)
+            # There is no such local file, so the recorded path is kept.
+            self.assertEqual ("/src/bar.toy", procedure.instructions () [1].locn ().srcfile)
+
+    def test_command_line_prefix_map (self) -> None:
+        # The compiler's -fdebug-prefix-map isn't recorded, so toydb is given the same option to reverse it.
+        with tempfile.TemporaryDirectory () as directory:
+            source = os.path.join (directory, 'a.toy')
+            with open (source, 'w') as f:
+                f.write ('main {\n    1 pop\n}\n')
+            repository_path = os.path.join (directory, 'repo.db')
+            [ticket] = driver.compile (parse_command_line (['--frontend=fast', '-g', '-r', repository_path,
+                                                            '-fdebug-prefix-map', directory + '=/src', source]))
+            executable_path = os.path.join (directory, 'a.x')
+            link_many ([LinkSpec (out_file=executable_path, tickets=[ticket])], Repository.read (repository_path),
+                       repository_path)
+
+            def srcfile (source_map: PrefixMap) -> str:
+                executable = Executable.read (executable_path)
+                program = dyld.load (executable)
+                load_cmd.load_debug_info (executable, program, source_map)
+                return program ['main'].locn ().srcfile
+
+            self.assertEqual ('/src/a.toy', srcfile (PrefixMap ()))
+            options = command_line (['-fdebug-prefix-map', directory + '=/src', executable_path])
+            self.assertEqual (source, srcfile (options.debug_prefix_map))
+
 
 if __name__ == "__main__":
     unittest.main ()
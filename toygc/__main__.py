@@ -27,14 +27,14 @@ import sys
 from typing import Iterable
 
 # Local modules
-from store.types import Repository
-from toygc.collector import collect
+from store.types import StorageFormat
+from toygc.collector import collect_file, collect_loose, collect_sqlite
 
 _logger = logging.getLogger (__name__)
 
 def _get_options (program: str, args: Iterable [str]):
     parser = argparse.ArgumentParser (prog=program, description='Program repository garbage collector')
-    parser.add_argument ('-r', '--repository', default='repo.yaml',
+    parser.add_argument ('-r', '--repository', default='repo.db',
                          help='The repository to be rewritten')
     parser.add_argument ('-v', '--verbose', action='count', default=0,
                          help='Produce verbose output (repeat for more output).')
@@ -49,10 +49,14 @@ def main (program: str = 'toygc', args: Iterable [str] = sys.argv [1:]) -> int:
         logging.getLogger ().setLevel ((logging.WARNING, logging.INFO, logging.DEBUG) [min (options.verbose, 2)])
 
         _logger.info ("Performing GC on '%s'", options.repository)
-        src_repo = Repository.read (options.repository)
-        dest_repo = Repository.new ()
-        collect (src_repo, dest_repo)
-        dest_repo.write (options.repository)
+        storage = StorageFormat.of (options.repository)
+        if storage == StorageFormat.sqlite:
+            collect_sqlite (options.repository)
+            return 0
+        if storage == StorageFormat.loose:
+            collect_loose (options.repository)
+            return 0
+        collect_file (options.repository)
     except Exception as ex:
         if options.debug:
             raise
@@ -28,10 +28,10 @@ new repository. Any repositories referenced from a rooted link are also collecte
 
 import logging
 import uuid
-from typing import Mapping, Optional
-import yaml
+from typing import List, Optional, Set, Tuple
 
-from store.types import Repository
+from store import binformat, exetypes, locking, looseformat, sqlformat, ticket_file
+from store.types import LinksRecord, Repository
 
 _logger = logging.getLogger (__name__)
 
@@ -51,8 +51,9 @@ class Collector:
         they reference, are garbage collected by this function.
         """
 
-        # The collected repository must have the same UUID as the original.
+        # The collected repository must have the same UUID and settings as the original.
         self.__dest.uuid = self.__source.uuid
+        self.__dest.settings = dict (self.__source.settings)
 
         self.__preserve_stripped_fragments ()
         self.__preserve_extant_tickets ()
@@ -62,7 +63,7 @@ class Collector:
         _logger.info ("Collecting extant ticket files")
 
         for ticket, entry in self.__source.tickets.items ():
-            ticket_id = Collector.__load_ticket (entry.path)
+            ticket_id = _load_ticket (entry.path)
             # If the ticket's id matches the record in the repository, we keep its contents.
             if ticket_id != ticket:
                 _logger.info ("Removing ticket '%s'", entry.path)
@@ -70,8 +71,7 @@ class Collector:
                 _logger.debug ("Copying ticket '%s'", entry.path)
 
                 # Copy the fragments to which this ticket refers
-                for m in entry.members:
-                    digest = m.digest
+                for digest in entry.fragment_digests ():
                     if not digest in self.__dest.fragments:
                         _logger.debug ("Copying fragment %s", digest)
                         self.__dest.fragments [digest] = self.__source.fragments [digest]
@@ -95,7 +95,7 @@ class Collector:
     def __preserve_extant_links (self) -> None:
         _logger.info ("Collecting extant links")
         for link in self.__source.links:
-            exe = Collector.__load_executable (link.file)
+            exe = _load_executable (link.file)
 
             # The executable's uuid must match the link UID in the repository for the
             # repo contents to be valid for that file.
@@ -110,32 +110,30 @@ class Collector:
                 self.__dest.links.append (link)
 
                 for d in exe.debug:
-                    fragment = self.__source.fragments [d.fragment]
-                    if fragment is not None:
-                        digest = d.fragment
-                        if not digest in self.__dest.fragments:
+                    for digest in (d.fragment, d.debug_digest):
+                        if digest is None:
+                            continue
+                        fragment = self.__source.fragments [digest]
+                        if fragment is not None and not digest in self.__dest.fragments:
                             _logger.debug ("Copying fragment %s", digest)
                             self.__dest.fragments [digest] = fragment
 
-    # FIXME: share with the VM/Debugger?
-    @staticmethod
-    def __load_executable (path: str) -> Optional [Mapping]:
-        _logger.info ('Loading executable "%s"', path)
-        try:
-            with open (path, 'rt') as f:
-                return yaml.load (stream=f)
-        except (FileNotFoundError, yaml.YAMLError):
-            return None
-
-    # FIXME: this should be shared with the linker.
-    @staticmethod
-    def __load_ticket (path: str) -> Optional [uuid.UUID]:
-        _logger.info ('Loading ticket "%s"', path)
-        try:
-            with open (path, 'rt') as f:
-                return yaml.load (f)  # TODO: check it's a UUID
-        except (FileNotFoundError, ValueError, yaml.YAMLError):
-            return None
+
+# FIXME: share with the VM/Debugger?
+def _load_executable (path: str) -> Optional [exetypes.Executable]:
+    _logger.info ('Loading executable "%s"', path)
+    try:
+        return exetypes.Executable.read (path)
+    except (FileNotFoundError, RuntimeError):
+        return None
+
+
+def _load_ticket (path: str) -> Optional [uuid.UUID]:
+    _logger.info ('Loading ticket "%s"', path)
+    try:
+        return ticket_file.read (path)
+    except (FileNotFoundError, ValueError):
+        return None
 
 
 def collect (src_repo: Repository, dest_repo: Repository) -> None:
@@ -148,4 +146,92 @@ def collect (src_repo: Repository, dest_repo: Repository) -> None:
 
     Collector (src_repo, dest_repo).collect ()
 
+
+def gc (repository: Repository) -> Repository:
+    """
+    Performs garbage collection on a repository which is held in memory (for example, by a build system which
+    compiles and links in the same process with toycc.driver.compile_many and toyld.link.link_many).
+
+    :param repository: The repository to be collected. It is unchanged.
+    :return: A new repository which holds the live content of 'repository'.
+    """
+
+    collected = Repository.new ()
+    collect (repository, collected)
+    return collected
+
+
+def _find_dead (repository: Repository) -> Tuple [List [uuid.UUID], List [LinksRecord], Set [str]]:
+    """
+    Identifies the tickets and links of 'repository' whose files are no longer extant.
+
+    :return: A tuple of the dead tickets, the dead links, and the digests of the fragments to which the live
+        executables' debug records refer.
+    """
+
+    _logger.info ("Collecting extant ticket files")
+    dead_tickets = list ()
+    for ticket, entry in repository.tickets.items ():
+        if _load_ticket (entry.path) != ticket:
+            _logger.info ("Removing ticket '%s'", entry.path)
+            dead_tickets.append (ticket)
+
+    _logger.info ("Collecting extant links")
+    dead_links = list ()
+    roots = set ()
+    for link in repository.links:
+        exe = _load_executable (link.file)
+        if exe is None or exe.uuid != link.uuid:
+            _logger.info ("Removing traces of executable '%s'", link.file)
+            dead_links.append (link)
+        else:
+            # Keep the fragments to which this executable's debug records refer.
+            roots.update (d.fragment for d in exe.debug)
+            roots.update (d.debug_digest for d in exe.debug if d.debug_digest is not None)
+    return dead_tickets, dead_links, roots
+
+
+def collect_file (path: str) -> None:
+    """
+    Performs garbage collection on the binary (or YAML) repository at 'path', which is replaced by a new file holding
+    its live content.
+
+    :param path: The path of the repository file.
+    """
+
+    # Hold the repository's lock throughout so that nothing is added while it is being collected.
+    with locking.exclusive (path):
+        repository = Repository.read (path)
+        collected = gc (repository)
+        # The collected repository holds its own copies of the live fragments. The original's mapping of the file
+        # must be released before the file is replaced.
+        binformat.close (repository)
+        collected.write (path)
+
+
+def collect_sqlite (path: str) -> None:
+    """
+    Performs garbage collection on the SQLite repository at 'path' in place. Rather than copying the live content to
+    a new repository, the dead tickets and links are identified and the database deletes them together with the
+    fragments that are no longer referenced.
+
+    :param path: The path of the repository database.
+    """
+
+    dead_tickets, dead_links, roots = _find_dead (Repository.read (path))
+    sqlformat.collect (path, dead_tickets=dead_tickets, dead_links=dead_links, roots=roots)
+
+
+def collect_loose (path: str) -> None:
+    """
+    Performs garbage collection on the loose-object repository at 'path' in place. The live fragments are moved into
+    a single pack and the rest are removed.
+
+    :param path: The path of the repository directory.
+    """
+
+    with locking.exclusive (path):
+        dead_tickets, dead_links, roots = _find_dead (Repository.read (path))
+        looseformat.collect (path, dead_tickets=dead_tickets, dead_links=dead_links, roots=roots)
+
 # eof toygc/collector.py
@@ -27,16 +27,14 @@ The Toy linker's entry point.
 # Standard modules
 import argparse
 import logging
-import os
 import sys
 import uuid
 from typing import Iterable
 
-import yaml
-
 import toyld.link
 import toyld.log
-from store.types import LinksRecord, Repository
+from store import ticket_file
+from store.transaction import Transaction
 from toyld import errors
 
 _logger = toyld.log.get_logger (__name__)
@@ -46,14 +44,10 @@ EXIT_FAILURE = 1
 
 def _load_ticket (path: str) -> uuid.UUID:
     _logger.debug ('Loading ticket "%s"', path)
-    with open (path, 'rt') as f:
-        try:
-            ticket = yaml.load (f)
-        except (ValueError, yaml.YAMLError):
-            raise RuntimeError ("Ticket file '{0}' was not valid".format (path))
-        if not isinstance (ticket, uuid.UUID):
-            raise RuntimeError ("Ticket file '{0}' was did not contain a valid UUID".format (path))
-        return ticket
+    try:
+        return ticket_file.read (path)
+    except ValueError:
+        raise RuntimeError ("Ticket file '{0}' was not valid".format (path))
 
 
 class Options:
@@ -76,7 +70,7 @@ def _get_options (program: str, args: Iterable [str]) -> Options:
     parser.add_argument ('infile', nargs='*',
                          help='The files to be linked.')
     parser.add_argument ('-r', '--repository',
-                         default='repo.yaml',
+                         default='repo.db',
                          help='The program repository to be used for linking.')
     parser.add_argument ('-o', '--output',
                          default='a.out',
@@ -100,36 +94,17 @@ def main (program='toyld', args=sys.argv [1:]) -> int:
         logging.getLogger ().setLevel ((logging.WARNING, logging.INFO, logging.DEBUG) [min (options.verbose, 2)])
 
         # Load the input files (the repository and the tickets)
-        repository = Repository.read (path=options.repository)
+        transaction = Transaction (path=options.repository, create=False)
         tickets = [_load_ticket (path) for path in options.infile]
 
         _logger.debug ('Entry points are: %s', ' '.join (options.entry_point))
 
-        temp_file = options.outfile + '.t'
-        f = open (temp_file, 'wt')
+        spec = toyld.link.LinkSpec (out_file=options.outfile, tickets=tickets, entry_points=options.entry_point)
         try:
-            link_uuid = uuid.uuid4 ()
-            with f:
-                entry_addresses = toyld.link.link (tickets=tickets,
-                                                   repository=repository,
-                                                   repository_path=options.repository,
-                                                   entry_points=options.entry_point,
-                                                   out_file=f,
-                                                   uuid=link_uuid)
-
-            # Add this link to the repository and rewrite it.
-            repository.links.append (LinksRecord (file=os.path.abspath (options.outfile), uuid=link_uuid))
-            repository.write (path=options.repository)
-            os.replace (src=temp_file, dst=options.outfile)
-
+            entry_addresses = toyld.link.link_file (spec, transaction, repository_path=options.repository)
             _logger.info ('Entry addresses are: %s', ' '.join (hex (ea) for ea in entry_addresses))
         except errors.LinkError as ex:
             _logger.error (ex)
-        finally:
-            try:
-                os.unlink (temp_file)
-            except FileNotFoundError:
-                pass
     except Exception as ex:
         if options.debug:
             raise
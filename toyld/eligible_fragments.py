@@ -26,7 +26,7 @@ These are gathered from the collection of stores that are passed to the linker.
 """
 
 import uuid
-from typing import Dict, Iterable
+from typing import Dict, Iterable, Optional
 
 from store.types import Fragment, Repository
 from . import errors
@@ -37,10 +37,11 @@ class EligibleFragment:
     Contains all the information about an individual fragment to be included in the link.
     """
 
-    def __init__ (self, digest: str, fragment: Fragment, line_base: int) -> None:
+    def __init__ (self, digest: str, fragment: Fragment, line_base: int, debug_digest: Optional [str] = None) -> None:
         self.digest = digest
         self.fragment = fragment
         self.line_base = line_base
+        self.debug_digest = debug_digest
         self.puxifs = list ()  # TOD: this is for incremental linking
 
 
@@ -72,7 +73,8 @@ def collect (tickets: Iterable [uuid.UUID], repository: Repository) -> Dict [str
 
                 eligible [member.name] = EligibleFragment (digest=member.digest,
                                                            fragment=fragment,
-                                                           line_base=member.line_base)
+                                                           line_base=member.line_base,
+                                                           debug_digest=member.debug_digest)
     return eligible
 
 # eof toyld.eligible_fragments.py
@@ -23,6 +23,8 @@
 from store.types import Fragment
 
 class FragmentAddress:
+    __slots__ = ('address', 'digest', 'fragment', 'name', 'symbol')
+
     def __init__ (self, address:int, digest:str, fragment:Fragment, name:str) -> None:
         self.address = address
         self.digest = digest
@@ -21,10 +21,12 @@
 ## THE SOFTWARE.
 
 import os
-from typing import BinaryIO, Dict, Iterable, List, Mapping
+import uuid
+from typing import BinaryIO, Dict, Iterable, List, Mapping, NamedTuple, Sequence
 from uuid import UUID
 
 from store import exetypes, types
+from store.transaction import Transaction
 from . import eligible_fragments, layout, log, output
 from .ldtypes import SectionLayout
 
@@ -72,4 +74,63 @@ def link (tickets: Iterable [UUID],
         addrs.append (name_address_map [ep] + bases [target_primary_section])
     return addrs
 
+
+class LinkSpec (NamedTuple):
+    """An executable to be linked: the file to be written, the tickets of its object files, and its entry points."""
+
+    out_file: str
+    tickets: Sequence [UUID]
+    entry_points: Sequence [str] = ('main',)
+
+
+def link_file (spec: LinkSpec, transaction: Transaction, repository_path: str) -> List [int]:
+    """
+    Links an executable and records it in the repository. The executable is written to a temporary file which
+    replaces 'spec.out_file' once the link has been committed.
+
+    :param spec: The executable to be linked.
+    :param transaction: The transaction to which the link is added and which is then committed.
+    :param repository_path: The path of the repository, which is recorded by the executable.
+    :return: The address of each of the entry points.
+    """
+
+    temp_file = spec.out_file + '.t'
+    try:
+        link_uuid = uuid.uuid4 ()
+        with open (temp_file, 'wb') as f:
+            entry_addresses = link (tickets=spec.tickets,
+                                    repository=transaction.repository,
+                                    repository_path=repository_path,
+                                    entry_points=spec.entry_points,
+                                    out_file=f,
+                                    uuid=link_uuid)
+
+        # Add this link to the repository.
+        transaction.add_link (types.LinksRecord (file=os.path.abspath (spec.out_file), uuid=link_uuid))
+        transaction.commit ()
+        os.replace (src=temp_file, dst=spec.out_file)
+        return entry_addresses
+    finally:
+        try:
+            os.unlink (temp_file)
+        except FileNotFoundError:
+            pass
+
+
+def link_many (specs: Iterable [LinkSpec], repository: types.Repository, repository_path: str) -> List [List [int]]:
+    """
+    Links executables from a repository which is held in memory (for example, one to which toycc.driver.compile_many
+    has added), so that a build system running in the same process needn't read or write the repository between its
+    steps. A link record for each executable is added to the repository.
+
+    :param specs: The executables to be linked.
+    :param repository: The repository.
+    :param repository_path: The path to which the repository will be written. The executables record it so that
+                            the debugger and the garbage collector can find the repository.
+    :return: The addresses of the entry points of each executable, in the order of 'specs'.
+    :raises toyld.errors.LinkError: If an executable cannot be linked.
+    """
+
+    return [link_file (spec, Transaction (None, repository=repository), repository_path) for spec in specs]
+
 # eof toyld.link
@@ -21,9 +21,7 @@
 ## THE SOFTWARE.
 
 import uuid
-from typing import Any, Mapping, TextIO
-
-import yaml
+from typing import Any, BinaryIO, Mapping
 
 from store.exetypes import Executable, RepositoryRecord, Symbol
 from store import types
@@ -92,7 +90,7 @@ def _apply_fixups (fsection, fragment_name, name_fragment_map, name_address_map,
 
 
 
-def output (out_file: TextIO,
+def output (out_file: BinaryIO,
             name_fragment_map,
             repository_record: RepositoryRecord,
             layout,
@@ -128,7 +126,8 @@ def output (out_file: TextIO,
             if line_base is not None:
                 debug_line_record = types.DebugLineRecord (address=address,
                                                            fragment=digest,
-                                                           line_base=line_base)
+                                                           line_base=line_base,
+                                                           debug_digest=name_fragment_map [name].debug_digest)
                 executable.debug.append (debug_line_record)
 
             fa.symbol = len (executable.symbols)
@@ -28,6 +28,7 @@ from typing import Iterable, Sequence
 
 # Local modules
 from store.types import Repository
+from toymerge.merge import merge
 
 EXIT_FAILURE = 1
 EXIT_SUCCESS = 0
@@ -59,7 +60,7 @@ def command_line (args:Iterable[str], program:str='toymerge') -> Options:
     parser = argparse.ArgumentParser (prog=program, description='Merge Toy program repositories.')
     parser.add_argument ('inputs', nargs='*', default=list(),
                          help='The path of the repository to be merges')
-    parser.add_argument ('-r', '--repository', default='repo.yaml', dest='output',
+    parser.add_argument ('-r', '--repository', default='repo.db', dest='output',
                          help='The path of the target repository for the merge')
     parser.add_argument ('-v', '--verbose', action='count', default=0,
                          help='Produce verbose output (repeat for more output)')
@@ -80,28 +81,7 @@ def main (args:Sequence[str] = sys.argv [1:]) -> int:
             inrepo = Repository.read (input)
             _logger.info ("Merging from '{input}'".format (input=input))
 
-            # Copy in any newly created fragments.
-            for digest, fragment in inrepo.fragments.items ():
-                if fragment is None:
-                    #_logger.debug ("Skipping digest-only fragment {digest}".format (digest=digest))
-                    pass
-                else:
-                    if digest in repository.fragments:
-                        # Ignore duplicate fragments to account for more than one agent builing the same file.
-                        _logger.debug ("Duplicate fragment {digest} found in '{input}'".format (digest=digest, input=input))
-                    else:
-                        _logger.debug ("Fragment {digest} merged".format (digest=digest))
-                        repository.fragments [digest] = fragment
-
-            # Copy in any newly created ticket records.
-            for key, file_entry in inrepo.tickets.items ():
-                if key in repository.tickets:
-                    _logger.warning ("Duplicate ticket {ticket} found in '{input}'".format (ticket=key, input=input))
-                else:
-                    _logger.debug ("Ticket {ticket} merged".format (ticket=key))
-                    repository.tickets [key] = file_entry
-
-            # TODO: Not expecting any new links. Merge them anyway?
+            merge (repository, inrepo)
 
         # Write the merged respository
         _logger.info ("Writing output repository '{output}'".format (output=options.output))
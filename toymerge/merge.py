@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Merges program repositories: the fragments and tickets of each source repository are added to a destination.
+"""
+
+import logging
+
+from store.types import Repository
+
+_logger = logging.getLogger (__name__)
+
+
+def merge (repository: Repository, source: Repository) -> None:
+    """
+    Adds the fragments and tickets of 'source' to 'repository'. Stripped fragments, and fragments which 'repository'
+    already holds, are skipped: more than one build agent may have compiled the same file.
+    """
+
+    # Copy in any newly created fragments.
+    for digest, fragment in source.fragments.items ():
+        if fragment is None:
+            pass
+        elif digest in repository.fragments:
+            # Ignore duplicate fragments to account for more than one agent builing the same file.
+            _logger.debug ("Duplicate fragment {digest} found".format (digest=digest))
+        else:
+            _logger.debug ("Fragment {digest} merged".format (digest=digest))
+            repository.fragments [digest] = fragment
+
+    # Copy in any newly created ticket records.
+    for key, file_entry in source.tickets.items ():
+        if key in repository.tickets:
+            _logger.warning ("Duplicate ticket {ticket} found".format (ticket=key))
+        else:
+            _logger.debug ("Ticket {ticket} merged".format (ticket=key))
+            repository.tickets [key] = file_entry
+
+    # TODO: Not expecting any new links. Merge them anyway?
+
+# eof toymerge/merge.py
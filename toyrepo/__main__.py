@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A utility for maintaining program repositories. It converts repositories to and from the YAML format which enables
+their contents to be easily viewed and edited, migrates repositories between the storage formats, compacts them, and packs the objects of a loose-object repository.
+It also views and changes the repository's settings.
+"""
+
+# System modules
+import argparse
+import logging
+import sys
+from typing import Callable, Dict, Iterable, Sequence
+
+# Local modules
+from store import binformat, looseformat, prefix_map, sqlformat
+from store.types import Repository, StorageFormat
+from toygc.collector import collect_loose
+
+EXIT_FAILURE = 1
+EXIT_SUCCESS = 0
+
+_logger = logging.getLogger (__name__)
+
+
+class Options:
+    """
+    A class to represent the options that can be set on the utility's command line.
+    """
+
+    def __init__ (self, opt) -> None:
+        self.command = opt.command
+        self.debug = opt.debug
+        self.repository = opt.repository
+        self.path = getattr (opt, 'path', None)
+        self.prune = getattr (opt, 'prune', False)
+        self.key = getattr (opt, 'key', None)
+        self.value = getattr (opt, 'value', None)
+        self.unset = getattr (opt, 'unset', False)
+        self.storage = StorageFormat [getattr (opt, 'format', 'sqlite')]
+        self.verbose = opt.verbose
+
+
+def command_line (args: Iterable [str], program: str = 'toyrepo') -> Options:
+    """
+    Processes options from the command line.
+
+    :param args: A list of arguments to be parsed.
+    :param program: The program name to be used in the option help text.
+    :return: An instance of Options containing the user's options.
+    """
+
+    parser = argparse.ArgumentParser (prog=program, description='Maintain a Toy program repository.')
+    parser.add_argument ('-r', '--repository', default='repo.db',
+                         help='the path of the program repository')
+    parser.add_argument ('-v', '--verbose', action='count', default=0,
+                         help='produce verbose output (repeat for more output)')
+    parser.add_argument ('--debug', action='store_true', help='emit debugging trace')
+
+    subparsers = parser.add_subparsers (dest='command', metavar='command')
+    subparsers.required = True
+    export_parser = subparsers.add_parser ('export', help='write the repository as YAML')
+    export_parser.add_argument ('path', help='the path of the YAML file to be written')
+    import_parser = subparsers.add_parser ('import', help='replace the repository with the contents of a YAML file')
+    import_parser.add_argument ('path', help='the path of the YAML file to be read')
+    migrate_parser = subparsers.add_parser ('migrate',
+                                            help='write the contents of an existing repository of any format (such as '
+                                                 'repo.yaml) to the repository in a new format')
+    migrate_parser.add_argument ('path', help='the path of the repository to be read')
+    migrate_parser.add_argument ('-f', '--format', choices=('binary', 'sqlite', 'loose'), default='sqlite',
+                                 help='the storage format of the new repository (default: %(default)s)')
+    subparsers.add_parser ('compact', help='compact the repository (for example, fold the journal of a binary repository '
+                                          'into its index)')
+    repack_parser = subparsers.add_parser ('repack', help='move the objects of a loose-object repository into a pack')
+    repack_parser.add_argument ('--prune', action='store_true',
+                                help='drop the fragments that are not referenced by an extant ticket or executable '
+                                     '(as toygc)')
+    config_parser = subparsers.add_parser ('config', help='show or change the repository\'s settings')
+    config_parser.add_argument ('key', nargs='?', choices=sorted (SETTINGS),
+                                help='the setting to be shown or changed (all settings are shown if omitted)')
+    config_parser.add_argument ('value', nargs='?', help='the new value of the setting')
+    config_parser.add_argument ('--unset', action='store_true', help='remove the setting')
+    options = parser.parse_args (args)
+    if options.command == 'config':
+        if (options.unset or options.value is not None) and options.key is None:
+            parser.error ('a setting must be named')
+        if options.unset and options.value is not None:
+            parser.error ('--unset cannot be used with a value')
+    return Options (options)
+
+
+def export_command (options: Options) -> None:
+    repository = Repository.read (options.repository)
+    _logger.info ("Exporting '%s' to '%s'", options.repository, options.path)
+    repository.write (options.path, storage=StorageFormat.yaml)
+
+
+def import_command (options: Options) -> None:
+    repository = Repository.read (options.path)
+    _logger.info ("Importing '%s' to '%s'", options.path, options.repository)
+    repository.write (options.repository)
+
+
+def migrate_command (options: Options) -> None:
+    repository = Repository.read (options.path)
+    _logger.info ("Migrating '%s' to %s repository '%s'", options.path, options.storage.name, options.repository)
+    repository.write (options.repository, storage=options.storage)
+
+
+def compact_command (options: Options) -> None:
+    _logger.info ("Compacting '%s'", options.repository)
+    storage = StorageFormat.of (options.repository)
+    if storage == StorageFormat.sqlite:
+        sqlformat.compact (options.repository)
+    elif storage == StorageFormat.loose:
+        looseformat.compact (options.repository)
+    else:
+        binformat.compact (options.repository)
+
+
+def repack_command (options: Options) -> None:
+    if StorageFormat.of (options.repository) != StorageFormat.loose:
+        raise RuntimeError ("'{0}' is not a loose-object repository".format (options.repository))
+    _logger.info ("Repacking '%s'", options.repository)
+    if options.prune:
+        collect_loose (options.repository)
+    else:
+        looseformat.repack (options.repository)
+
+
+# The repository settings, each with a function which raises ValueError if given an invalid value.
+SETTINGS = {
+    prefix_map.SETTING: prefix_map.parse_setting,
+}  # type: Dict [str, Callable [[str], object]]
+
+
+def config_command (options: Options) -> None:
+    # Giving a setting a value creates the repository if necessary.
+    repository = Repository.read (options.repository, create=options.value is not None)
+    if options.key is None:
+        for key, value in sorted (repository.settings.items ()):
+            print ('{0}={1}'.format (key, value))
+        return
+    if not options.unset and options.value is None:
+        value = repository.settings.get (options.key)
+        if value is not None:
+            print (value)
+        return
+
+    if options.unset:
+        _logger.info ("Removing setting '%s' from '%s'", options.key, options.repository)
+        repository.settings.pop (options.key, None)
+    else:
+        SETTINGS [options.key] (options.value)
+        _logger.info ("Setting '%s' of '%s' to '%s'", options.key, options.repository, options.value)
+        repository.settings [options.key] = options.value
+    repository.write (options.repository)
+
+
+COMMANDS = {
+    'compact': compact_command,
+    'config': config_command,
+    'export': export_command,
+    'import': import_command,
+    'migrate': migrate_command,
+    'repack': repack_command,
+}
+
+
+def main (args: Sequence [str] = sys.argv [1:]) -> int:
+    options = command_line (args)
+    try:
+        # Set the root logger's level: this allows logging messages to be logged to the default console.
+        logging.getLogger ().setLevel ((logging.WARNING, logging.INFO, logging.DEBUG) [min (options.verbose, 2)])
+
+        COMMANDS [options.command] (options)
+    except Exception as ex:
+        if options.debug:
+            raise
+        else:
+            _logger.error (ex)
+        return EXIT_FAILURE
+    return EXIT_SUCCESS
+
+
+if __name__ == '__main__':
+    logging.basicConfig (level=logging.DEBUG, format='  %(levelname)s: %(message)s')
+    sys.exit (main ())
+
+# eof toyrepo/__main__.py
@@ -24,11 +24,11 @@
 import argparse
 import logging
 import sys
-import uuid
 from typing import Iterable, Sequence
 
 # Local modules
 from store.types import Repository
+from toystrip.strip import strip
 
 EXIT_FAILURE = 1
 EXIT_SUCCESS = 0
@@ -58,9 +58,9 @@ def command_line (args: Iterable [str], program: str = 'toystrip') -> Options:
     """
 
     parser = argparse.ArgumentParser (prog=program, description='Strip fragment bodies from a Toy program repository.')
-    parser.add_argument ('-i', '--input', nargs='?', default='repo.yaml',
+    parser.add_argument ('-i', '--input', nargs='?', default='repo.db',
                          help='the path of the repository to be stripped')
-    parser.add_argument ('-o', '--output', default='repoc.yaml',
+    parser.add_argument ('-o', '--output', default='repoc.db',
                          help='the path to which the stripped repository will be written')
     parser.add_argument ('-v', '--verbose', action='count', default=0,
                          help='produce verbose output (repeat for more output)')
@@ -74,17 +74,7 @@ def main (args: Sequence [str] = sys.argv [1:]) -> int:
         # Set the root logger's level: this allows logging messages to be logged to the default console.
         logging.getLogger ().setLevel ((logging.WARNING, logging.INFO, logging.DEBUG) [min (options.verbose, 2)])
 
-        repository = Repository.read (options.input)
-
-        # Now blast the repository fragment values and clear all of the
-        # other fields.
-        for digest, _ in repository.fragments.items ():
-            _logger.debug ("Fragment {0} cleared".format (digest))
-            repository.fragments [digest] = None
-
-        repository.links = []
-        repository.tickets = {}
-        repository.uuid = uuid.uuid4 ()
+        repository = strip (Repository.read (options.input))
 
         # Write the freshly stripped repository
         repository.write (options.output)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+Strips a program repository: the contents of its fragments are discarded, leaving only their digests, and its tickets
+and links are removed.
+"""
+
+import logging
+import uuid
+
+from store.types import Repository
+
+_logger = logging.getLogger (__name__)
+
+
+def strip (repository: Repository) -> Repository:
+    """
+    Returns a stripped copy of 'repository', which is unchanged. The copy has a new UUID and keeps the repository's
+    settings.
+    """
+
+    fragments = dict ()
+    for digest in repository.fragments.keys ():
+        _logger.debug ("Fragment {0} cleared".format (digest))
+        fragments [digest] = None
+    return Repository (fragments=fragments, links=[], tickets={}, uuid=uuid.uuid4 (),
+                       settings=dict (repository.settings))
+
+# eof toystrip/strip.py
@@ -23,9 +23,9 @@
 import argparse
 import logging
 from typing import Iterable
-import yaml
 import sys
 
+from store.exetypes import Executable
 from toyvm import dyld
 from toyvm import errors
 from toyvm import machine
@@ -37,7 +37,7 @@ EXIT_FAILURE = 1
 
 def _options (args:Iterable [str]):
     parser = argparse.ArgumentParser (description='Toy Virtual Machine.')
-    parser.add_argument ('executable', type=argparse.FileType ('rt'), help='The executable file to be run.')
+    parser.add_argument ('executable', help='The executable file to be run.')
     parser.add_argument ('--debug', action='store_true', help='Emit debug messages.')
     parser.add_argument ('--trace', action='store_true', help='Enable VM instruction tracing.')
     parser.add_argument ('-v', '--verbose', action='count', default=0,
@@ -52,7 +52,7 @@ def main (args = sys.argv [1:]) -> int:
         # Set the root logger's level: this allows logging messages to be logged to the default console.
         logging.getLogger ().setLevel ((logging.WARNING, logging.INFO, logging.DEBUG) [min (options.verbose, 2)])
 
-        contents = yaml.load (options.executable)
+        contents = Executable.read (options.executable)
         program = dyld.load (contents)
 
         m = machine.Machine ()
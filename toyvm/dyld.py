@@ -25,31 +25,34 @@ A dynamic loading which reads a program from an executable image and returns it
 the virtual machine.
 """
 
-import io
 import logging
 from typing import Mapping
 
 from store.exetypes import Executable
 from store.types import SectionType
-from toyvm.instruction import Instruction
+from toyvm.instruction import Decoder, Instruction
 
 _logger = logging.getLogger (__name__)
 
 
 def load (content: Executable) -> Mapping [str, Instruction]:
     program = dict ()
+    if not content.symbols:
+        return program
+
+    # Each symbol's instructions are decoded in place from the text section (which is a view of the executable file's
+    # mapping if it was loaded from a binary executable) without copying them.
+    text = content.data [SectionType.text]
     for symbol in content.symbols:
         name = symbol.name
         _logger.debug ('Loading %s', name)
-        start = symbol.address
-        end = start + symbol.size
-        sections = {
-            SectionType.text: io.BytesIO (content.data [SectionType.text] [start:end])
-        }
+        decoder = Decoder (text, symbol.address)
 
         # TODO: change the read() method so that it will only ever load the target data. The debug loading code
         # should be in the debugger.
-        program [name] = Instruction.read (sections)
+        program [name] = Instruction.decode (decoder)
+        if decoder.offset != symbol.address + symbol.size:
+            raise RuntimeError ("Symbol '{0}' was not valid".format (name))
 
     # FIXME: Now the second pass: check that all of the fixups are resolved.
     # for name, fixups in content.items ():
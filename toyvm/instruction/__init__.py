@@ -22,6 +22,7 @@
 
 from . import boolean
 from . import builtin_state
+from . import decoder
 from . import instruction
 from . import number
 from . import operator
@@ -31,18 +32,22 @@ from . import source_location
 
 Boolean      = boolean.Boolean
 BuiltinState = builtin_state.BuiltinState
+Decoder      = decoder.Decoder
 Instruction  = instruction.Instruction
 Number       = number.Number
 Operator     = operator.Operator
 Procedure    = procedure.Procedure
 String       = string.String
 
+LineIndex      = source_location.LineIndex
 SourceLocation = source_location.SourceLocation
 
 __all__ = [
     Boolean,
     BuiltinState,
+    Decoder,
     Instruction,
+    LineIndex,
     Number,
     Operator,
     Procedure,
@@ -24,6 +24,7 @@ import struct
 from typing import Any, BinaryIO, Mapping
 
 from store.types import SectionType
+from .decoder import Decoder
 from .instruction import Instruction
 from .source_location import SourceLocation
 
@@ -40,6 +41,12 @@ class Boolean (Instruction):
         assert value in (True, False)
         self.__v = value
 
+    def value (self) -> bool:
+        """
+        Returns the value represented by this instruction.
+        """
+        return self.__v
+
     def execute (self, machine: 'Machine') -> None:
         """
         Executing a boolean pushes either True or False onto the machine's operand stack
@@ -51,9 +58,8 @@ class Boolean (Instruction):
         s = 't' if self.__v else 'f'
         hasher.update (s.encode ())
 
-    def _read (self, sections: Mapping [SectionType, BinaryIO]) -> None:
-        b = sections [SectionType.text].read (Boolean.__struct.size)
-        (self.__v,) = Boolean.__struct.unpack (b)
+    def _decode (self, decoder: Decoder) -> None:
+        (self.__v,) = decoder.unpack (Boolean.__struct)
 
     def _write (self, sections: Mapping [SectionType, BinaryIO]) -> None:
         sections [SectionType.text].write (Boolean.__struct.pack (self.__v))
@@ -20,10 +20,11 @@
 ## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 ## THE SOFTWARE.
 
-import collections
+import collections.abc
 from typing import Any, BinaryIO, Callable, Mapping
 
 from store.types import SectionType
+from .decoder import Decoder
 from .instruction import Instruction
 from .source_location import SourceLocation
 
@@ -39,7 +40,7 @@ class BuiltinState (Instruction):
 
     def __init__ (self, function: Callable, locn: SourceLocation = None) -> None:
         super ().__init__ (locn)
-        assert isinstance (function, collections.Callable)
+        assert isinstance (function, collections.abc.Callable)
         self.__function = function
 
     def execute (self, machine:'Machine') -> None:
@@ -52,8 +53,8 @@ class BuiltinState (Instruction):
     def _digest_impl (self, hasher) -> None:
         raise NotImplementedError ('BuiltinState._digest_impl')
 
-    def _read (self, sections: Mapping [SectionType, BinaryIO]):
-        raise NotImplementedError ('BuiltinState._read')
+    def _decode (self, decoder: Decoder):
+        raise NotImplementedError ('BuiltinState._decode')
 
     def _write (self, sections: Mapping [SectionType, BinaryIO]):
         raise NotImplementedError ('BuiltinState._write')
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A cursor over the encoded instructions in a buffer. Instructions are decoded in place with struct.unpack_from so
+that loading a program neither copies its text nor creates a stream for each symbol.
+"""
+
+import struct
+from typing import Any, Tuple
+
+
+class Decoder:
+    __slots__ = ('buffer', 'offset')
+
+    def __init__ (self, buffer, offset: int = 0) -> None:
+        """
+        :param buffer: An object supporting the buffer protocol (such as bytes or a memoryview of an executable's
+                       text section) from which instructions are decoded.
+        :param offset: The offset within 'buffer' of the first byte to be decoded.
+        """
+        self.buffer = buffer
+        self.offset = offset
+
+    def unpack (self, s: struct.Struct) -> Tuple [Any, ...]:
+        """Unpacks the values described by 's' from the current offset and advances past them."""
+
+        values = s.unpack_from (self.buffer, self.offset)
+        self.offset += s.size
+        return values
+
+    def string (self, length: int) -> str:
+        """Decodes a UTF-8 string of 'length' bytes from the current offset and advances past it."""
+
+        start = self.offset
+        end = start + length
+        if end > len (self.buffer):
+            raise struct.error ('string of {0} bytes extends beyond the end of the buffer'.format (length))
+        self.offset = end
+        return str (self.buffer [start:end], 'utf-8')
+
+# eof toyvm/instruction/decoder.py
@@ -31,6 +31,7 @@ import struct
 from typing import Any, BinaryIO, Iterable, Dict, Optional
 
 from store.types import SectionType
+from .decoder import Decoder
 from .source_location import SourceLocation
 
 
@@ -95,15 +96,27 @@ class Instruction (metaclass=abc.ABCMeta):
         raise NotImplementedError ('Instruction.execute')
 
     def digest (self, hasher) -> None:
+        """
+        Adds the instruction (and any that it contains) to the secure hash given by 'hasher'. The source locations
+        are not included, so moving code within a file or to a different file leaves its digest unchanged; see
+        digest_debug().
+        """
         hasher.update (self.__class__.__name__.encode ('utf8'))
         self._digest_impl (hasher)
 
+    def digest_debug (self, hasher) -> None:
+        """
+        Adds the source locations of the instruction, and of those that it contains, to the secure hash given by
+        'hasher'.
+        """
         locn = self.locn ()
         if locn is None:
             hasher.update ('n'.encode ())
         else:
             hasher.update ('d'.encode ())
             locn.digest (hasher)
+        for inst in self.instructions ():
+            inst.digest_debug (hasher)
 
     @abc.abstractmethod
     def _digest_impl (self, hasher) -> None:
@@ -142,8 +155,23 @@ class Instruction (metaclass=abc.ABCMeta):
         :param sections:
         :return: The instruction that was read.
         """
-        b = sections [SectionType.text].read (Instruction.__struct.size)
-        magic, cls_id = Instruction.__struct.unpack (b)
+        text = sections [SectionType.text]
+        start = text.tell ()
+        decoder = Decoder (text.read ())
+        obj = Instruction.decode (decoder)
+        text.seek (start + decoder.offset)
+        return obj
+
+    @staticmethod
+    def decode (decoder: Decoder) -> 'Instruction':
+        """
+        Decodes an instruction from the text at the decoder's offset, leaving the decoder positioned after it. Note
+        that this does _not_ read the source correspondence for that instruction.
+
+        :param decoder: The decoder from which the instruction is to be read.
+        :return: The instruction that was decoded.
+        """
+        magic, cls_id = decoder.unpack (Instruction.__struct)
         if magic != Instruction.__MAGIC:
             raise RuntimeError ('Instruction magic number was invalid')
 
@@ -151,12 +179,12 @@ class Instruction (metaclass=abc.ABCMeta):
         obj = cls.__new__ (cls)
         assert isinstance (obj, Instruction)
         obj.__locn = None  # SourceLocation.construct (sections)
-        obj._read (sections)
+        obj._decode (decoder)
         return obj
 
     @abc.abstractmethod
-    def _read (self, sections: Dict [SectionType, BinaryIO]) -> None:
-        raise NotImplementedError ('Instruction._read')
+    def _decode (self, decoder: Decoder) -> None:
+        raise NotImplementedError ('Instruction._decode')
 
     def read_debug (self, binary:BinaryIO, line_base:int) -> None:
         """
@@ -25,6 +25,7 @@ import struct
 from typing import Any, BinaryIO, Mapping, Optional
 
 from store.types import SectionType
+from .decoder import Decoder
 from .instruction import Instruction
 from .source_location import SourceLocation
 
@@ -61,9 +62,8 @@ class Number (Instruction):
     def _digest_impl (self, hasher) -> None:
         hasher.update (self.__v.hex ().encode ())
 
-    def _read (self, sections: Mapping [SectionType, BinaryIO]) -> None:
-        b = sections [SectionType.text].read (Number.__struct.size)
-        (self.__v,) = Number.__struct.unpack (b)
+    def _decode (self, decoder: Decoder) -> None:
+        (self.__v,) = decoder.unpack (Number.__struct)
 
     def _write (self, sections: Mapping [SectionType, BinaryIO]) -> None:
         sections [SectionType.text].write (Number.__struct.pack (self.__v))
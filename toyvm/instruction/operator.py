@@ -24,6 +24,7 @@ import struct
 from typing import Any, BinaryIO, Mapping
 
 from store.types import SectionType
+from .decoder import Decoder
 from .instruction import Instruction
 from .source_location import SourceLocation
 
@@ -54,11 +55,9 @@ class Operator (Instruction):
         hasher.update (self.__name.encode ())
 
 
-    def _read (self, sections:Mapping [SectionType, BinaryIO]) -> None:
-        text_stream = sections [SectionType.text]
-        b = text_stream.read (Operator.__struct.size)
-        (length,) = Operator.__struct.unpack (b)
-        self.__name = text_stream.read (length).decode ()
+    def _decode (self, decoder:Decoder) -> None:
+        (length,) = decoder.unpack (Operator.__struct)
+        self.__name = decoder.string (length)
 
     def _write (self, sections:Mapping [SectionType, BinaryIO]) -> None:
         name = self.__name.encode ()
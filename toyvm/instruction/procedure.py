@@ -25,6 +25,7 @@ import struct
 from typing import Any, BinaryIO, Dict, Iterable, List
 
 from store.types import SectionType
+from .decoder import Decoder
 from .instruction import Instruction
 from .source_location import SourceLocation
 
@@ -78,11 +79,9 @@ class Procedure (Instruction):
         for instr in self.__v:
             instr.write (sections)
 
-    def _read (self, sections: Dict [SectionType, BinaryIO]) -> None:
-        text_stream = sections [SectionType.text]
-        b = text_stream.read (Procedure.__struct.size)
-        (length,) = Procedure.__struct.unpack (b)
-        self.__v = [Instruction.read (sections) for _ in range (length)]
+    def _decode (self, decoder: Decoder) -> None:
+        (length,) = decoder.unpack (Procedure.__struct)
+        self.__v = [Instruction.decode (decoder) for _ in range (length)]
 
     def read_debug (self, binary:BinaryIO, line_base:int) -> None:
         for instr in self.__v:
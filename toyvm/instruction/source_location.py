@@ -20,9 +20,11 @@
 ## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 ## THE SOFTWARE.
 
+import bisect
 import io
+import re
 import struct
-from typing import Any, BinaryIO
+from typing import Any, BinaryIO, Tuple
 
 from store.types import SectionType
 
@@ -70,4 +72,27 @@ class SourceLocation:
     def __str__ (self) -> str:
         return "['{file}' ({line},{col})]".format (file=self.srcfile, line=self.line, col=self.column)
 
+
+class LineIndex:
+    """
+    Maps character offsets within a source text to line and column numbers. The offset at which each line starts is
+    found once, so that each lookup is a binary search rather than a scan of the text from its start.
+    """
+
+    __newline = re.compile ('\n')
+
+    def __init__ (self, text: str) -> None:
+        self.text = text
+        self.__starts = [0] + [match.end () for match in LineIndex.__newline.finditer (text)]
+
+    def position (self, offset: int) -> Tuple [int, int]:
+        """Returns the 1-based line and column numbers of the character at 'offset'."""
+
+        line = bisect.bisect_right (self.__starts, offset)
+        return line, offset - self.__starts [line - 1] + 1
+
+    def location (self, offset: int, srcfile: str) -> SourceLocation:
+        line, column = self.position (offset)
+        return SourceLocation (srcfile=srcfile, line=line, column=column)
+
 # eof toyvm/instruction/source_location.py
@@ -24,6 +24,7 @@ import struct
 from typing import Any, BinaryIO, Mapping
 
 from store.types import SectionType
+from .decoder import Decoder
 from .instruction import Instruction
 from .source_location import SourceLocation
 
@@ -38,6 +39,12 @@ class String (Instruction):
         assert isinstance (value, str)
         self.__v = value
 
+    def value (self) -> str:
+        """
+        Returns the value represented by this instruction.
+        """
+        return self.__v
+
     def execute (self, machine:'Machine') -> None:
         """
         Executing a string instructions simply pushes its value onto the operand stack.
@@ -54,11 +61,9 @@ class String (Instruction):
         text_stream.write (String.__struct.pack (len (encoded_str)))
         text_stream.write (encoded_str)
 
-    def _read (self, sections:Mapping [SectionType, BinaryIO]) -> None:
-        text_stream = sections [SectionType.text]
-        b = text_stream.read (String.__struct.size)
-        (length,) = String.__struct.unpack (b)
-        self.__v = text_stream.read (length).decode ()
+    def _decode (self, decoder:Decoder) -> None:
+        (length,) = decoder.unpack (String.__struct)
+        self.__v = decoder.string (length)
 
     def __eq__ (self, other:Any) -> bool:
         return (isinstance (other, String) and super().__eq__ (other) and self.__v == other.__v)
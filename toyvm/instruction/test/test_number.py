@@ -53,12 +53,20 @@ class TestNumber (unittest.TestCase):
         Number (*args, **kwargs).digest (h)
         return h.digest ()
 
+    def _get_debug_digest (self, *args, **kwargs):
+        h = hashlib.new ('md5')
+        Number (*args, **kwargs).digest_debug (h)
+        return h.digest ()
+
     def test_digest (self):
         self.assertEqual (self._get_digest (1), self._get_digest (1))
         self.assertEqual (self._get_digest (1, locn=SourceLocation ('path', line=2, column=3)),
                           self._get_digest (1, locn=SourceLocation ('path', line=2, column=3)))
         self.assertNotEqual (self._get_digest (1), self._get_digest (2))
-        self.assertNotEqual (self._get_digest (1, locn=SourceLocation ('path', line=2, column=3)),
-                             self._get_digest (1, locn=SourceLocation ('path', line=200, column=3)))
+        # The code digest does not depend on the instruction's location.
+        self.assertEqual (self._get_digest (1, locn=SourceLocation ('path', line=2, column=3)),
+                          self._get_digest (1, locn=SourceLocation ('path', line=200, column=3)))
+        self.assertNotEqual (self._get_debug_digest (1, locn=SourceLocation ('path', line=2, column=3)),
+                             self._get_debug_digest (1, locn=SourceLocation ('path', line=200, column=3)))
 
 #eof toyvm/instruction/test/test_number.py
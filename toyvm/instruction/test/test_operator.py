@@ -56,6 +56,11 @@ class TestOperator (unittest.TestCase):
          Operator (*args, **kwargs).digest (h)
          return h.digest ()
 
+    def _get_debug_digest (self, *args, **kwargs):
+         h = hashlib.new ('md5')
+         Operator (*args, **kwargs).digest_debug (h)
+         return h.digest ()
+
     def test_digest (self):
          self.assertEqual (self._get_digest ('a'), self._get_digest ('a'))
          self.assertEqual (self._get_digest ('a', locn=SourceLocation ('path', line=2, column=3)),
@@ -64,8 +69,10 @@ class TestOperator (unittest.TestCase):
         # Differ by value
          self.assertNotEqual (self._get_digest ('a'), self._get_digest ('b'))
 
-         # Differs only by source location
-         self.assertNotEqual (self._get_digest ('a', locn=SourceLocation ('path', line=2, column=3)),
-                              self._get_digest ('a', locn=SourceLocation ('path', line=200, column=3)))
+         # Differs only by source location: only the digest of the locations changes.
+         self.assertEqual (self._get_digest ('a', locn=SourceLocation ('path', line=2, column=3)),
+                           self._get_digest ('a', locn=SourceLocation ('path', line=200, column=3)))
+         self.assertNotEqual (self._get_debug_digest ('a', locn=SourceLocation ('path', line=2, column=3)),
+                              self._get_debug_digest ('a', locn=SourceLocation ('path', line=200, column=3)))
 
 #eof toyvm/instruction/test/test_operator.py
@@ -58,14 +58,24 @@ class TestProcedure (unittest.TestCase):
         Procedure (*args, **kwargs).digest (h)
         return h.digest ()
 
+    def _get_debug_digest (self, *args, **kwargs):
+        h = hashlib.new ('md5')
+        Procedure (*args, **kwargs).digest_debug (h)
+        return h.digest ()
+
     def test_digest (self):
         self.assertEqual (self._get_digest ([]), self._get_digest ([]))
         self.assertEqual (self._get_digest ([], locn=SourceLocation ('path', line=2, column=3)),
                           self._get_digest ([], locn=SourceLocation ('path', line=2, column=3)))
-        self.assertNotEqual (self._get_digest ([]),
-                             self._get_digest ([], locn=SourceLocation ('path', line=2, column=3)))
-        self.assertNotEqual (self._get_digest ([], locn=SourceLocation ('path', line=2, column=3)),
-                             self._get_digest ([], locn=SourceLocation ('path', line=200, column=3)))
+        self.assertEqual (self._get_digest ([]),
+                          self._get_digest ([], locn=SourceLocation ('path', line=2, column=3)))
+        self.assertNotEqual (self._get_debug_digest ([ Boolean (True) ]),
+                             self._get_debug_digest ([ Boolean (True, locn=SourceLocation ('path', 2, 3)) ]))
+        # The code digest does not depend on the instruction's location.
+        self.assertEqual (self._get_digest ([], locn=SourceLocation ('path', line=2, column=3)),
+                          self._get_digest ([], locn=SourceLocation ('path', line=200, column=3)))
+        self.assertNotEqual (self._get_debug_digest ([], locn=SourceLocation ('path', line=2, column=3)),
+                             self._get_debug_digest ([], locn=SourceLocation ('path', line=200, column=3)))
 
         self.assertNotEqual (self._get_digest ([]), self._get_digest ([ Boolean (False) ]))
         self.assertNotEqual (self._get_digest ([ Boolean (True) ]), self._get_digest ([ Boolean (False) ]))
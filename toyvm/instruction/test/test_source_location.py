@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+import unittest
+
+from toyvm.instruction import LineIndex, SourceLocation
+
+class TestLineIndex (unittest.TestCase):
+
+    def test_empty (self):
+        self.assertEqual (LineIndex ('').position (0), (1, 1))
+
+    def test_position (self):
+        text = 'ab\n\ncd\n'
+        index = LineIndex (text)
+        for offset in range (len (text) + 1):
+            # The line and column as computed by a scan of the text from its start.
+            expected = (text.count ('\n', 0, offset) + 1, offset - text.rfind ('\n', 0, offset))
+            self.assertEqual (index.position (offset), expected, 'offset {0}'.format (offset))
+
+    def test_location (self):
+        self.assertEqual (LineIndex ('a\n  b').location (4, srcfile='f.toy'),
+                          SourceLocation (srcfile='f.toy', line=2, column=3))
+
+if __name__ == '__main__':
+    unittest.main ()
+
+# eof toyvm/instruction/test/test_source_location.py
@@ -36,33 +36,41 @@ class ReadOnlyDict (dict):
     del __readonly__
 
 
+# The operators which the machine implements, keyed by name.
+_OPERATORS = {
+    'add': builtins.op_add,
+    'begin': builtins.op_begin,
+    'currentdict': builtins.op_currentdict,
+    'currenttrace': builtins.op_currenttrace,
+    'def': builtins.op_def,
+    'dict': builtins.op_dict,
+    'div': builtins.op_div,
+    'dup': builtins.op_dup,
+    'end': builtins.op_end,
+    'eq': builtins.op_eq,
+    'exch': builtins.op_exch,
+    'exec': builtins.op_exec,
+    'for': builtins.op_for,
+    'get': builtins.op_get,
+    'if': builtins.op_if,
+    'ifelse': builtins.op_ifelse,
+    'known': builtins.op_known,
+    'mul': builtins.op_mul,
+    'ne': builtins.op_ne,
+    'pop': builtins.op_pop,
+    'print': builtins.op_print,
+    'sub': builtins.op_sub,
+    'stack': builtins.op_stack,
+    'systemdict': builtins.op_systemdict,
+    'trace': builtins.op_trace,
+}
+
+# The names of the operators, for a client (such as the compiler) that needs to know which names the machine defines
+# without constructing one.
+NAMES = frozenset (_OPERATORS)
+
+
 def systemdict ():
-    return ReadOnlyDict ({
-        'add': builtins.op_add,
-        'begin': builtins.op_begin,
-        'currentdict': builtins.op_currentdict,
-        'currenttrace': builtins.op_currenttrace,
-        'def': builtins.op_def,
-        'dict': builtins.op_dict,
-        'div': builtins.op_div,
-        'dup': builtins.op_dup,
-        'end': builtins.op_end,
-        'eq': builtins.op_eq,
-        'exch': builtins.op_exch,
-        'exec': builtins.op_exec,
-        'for': builtins.op_for,
-        'get': builtins.op_get,
-        'if': builtins.op_if,
-        'ifelse': builtins.op_ifelse,
-        'known': builtins.op_known,
-        'mul': builtins.op_mul,
-        'ne': builtins.op_ne,
-        'pop': builtins.op_pop,
-        'print': builtins.op_print,
-        'sub': builtins.op_sub,
-        'stack': builtins.op_stack,
-        'systemdict': builtins.op_systemdict,
-        'trace': builtins.op_trace,
-    })
+    return ReadOnlyDict (_OPERATORS)
 
 #eof toyvm/systemdict.py
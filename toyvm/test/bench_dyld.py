@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+## Copyright (c) 2016 by SN Systems Ltd., Sony Interactive Entertainment Inc.
+## 
+## Permission is hereby granted, free of charge, to any person obtaining a copy
+## of this software and associated documentation files (the "Software"), to deal
+## in the Software without restriction, including without limitation the rights
+## to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+## copies of the Software, and to permit persons to whom the Software is
+## furnished to do so, subject to the following conditions:
+## 
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+## 
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+## OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+## THE SOFTWARE.
+
+"""
+A benchmark for the dynamic loader. It builds a binary executable with many symbols and reports the time taken, and
+the number of memory blocks that remain allocated, to load it with dyld.load() compared with the original loader which
+copied each symbol's text into a stream and decoded it with stream.read() and struct.unpack().
+
+    $ python -m toyvm.test.bench_dyld --symbols 10000
+"""
+
+import argparse
+import io
+import os
+import struct
+import tempfile
+import time
+import tracemalloc
+import uuid
+from typing import BinaryIO, Callable, Mapping
+
+from store.exetypes import Executable, RepositoryRecord, Symbol
+from store.types import SectionType
+from toyvm.dyld import load
+from toyvm.instruction import Boolean, Instruction, Number, Operator, Procedure, String
+
+
+def _make_executable (symbols: int) -> Executable:
+    text = io.BytesIO ()
+    executable = Executable.new (repository_record=RepositoryRecord (path=None, uuid=None), uuid=uuid.uuid4 ())
+    for index in range (symbols):
+        proc = Procedure ([Number (float (index)), Number (2.0), Operator ('add'), String ('value'), Boolean (True),
+                           Procedure ([Operator ('pop'), Operator ('dup')]), Operator ('if')])
+        start = text.tell ()
+        proc.write ({SectionType.text: text})
+        executable.symbols.append (Symbol (name='p{0}'.format (index), address=start, size=text.tell () - start))
+    executable.data [SectionType.text] = text.getvalue ()
+    return executable
+
+
+class _StreamReader:
+    """
+    The per-symbol stream decoder that dyld.load() used before instructions were decoded in place: each value is
+    read into a new bytes object with stream.read() and then passed to struct.unpack().
+    """
+
+    __header = struct.Struct ('>HI')
+    __length = struct.Struct ('>I')
+    __boolean = struct.Struct ('>?')
+    __number = struct.Struct ('>d')
+
+    def __init__ (self) -> None:
+        self.__classes = {
+            cls_id: cls.__name__ for cls, cls_id in Instruction._represent_map.items ()
+        }
+
+    def read (self, stream: BinaryIO) -> Instruction:
+        magic, cls_id = self.__header.unpack (stream.read (self.__header.size))
+        if magic != 0xc0de:
+            raise RuntimeError ('Instruction magic number was invalid')
+
+        name = self.__classes [cls_id]
+        if name == 'Boolean':
+            (value,) = self.__boolean.unpack (stream.read (self.__boolean.size))
+            return Boolean (value)
+        if name == 'Number':
+            (value,) = self.__number.unpack (stream.read (self.__number.size))
+            return Number (value)
+        (length,) = self.__length.unpack (stream.read (self.__length.size))
+        if name == 'Operator':
+            return Operator (stream.read (length).decode ())
+        if name == 'String':
+            return String (stream.read (length).decode ())
+        if name == 'Procedure':
+            return Procedure ([self.read (stream) for _ in range (length)])
+        raise RuntimeError ('Cannot read a {0} instruction'.format (name))
+
+
+def _load_streams (content: Executable) -> Mapping [str, Instruction]:
+    """Loads the program by copying each symbol's text into a stream (the loader's original approach)."""
+
+    reader = _StreamReader ()
+    program = dict ()
+    for symbol in content.symbols:
+        start = symbol.address
+        text = io.BytesIO (content.data [SectionType.text] [start:start + symbol.size])
+        program [symbol.name] = reader.read (text)
+    return program
+
+
+def _measure (title: str, loader: Callable [[Executable], Mapping [str, Instruction]], path: str) -> None:
+    start = time.perf_counter ()
+    loader (Executable.read (path))
+    elapsed = time.perf_counter () - start
+
+    content = Executable.read (path)
+    tracemalloc.start ()
+    before = tracemalloc.take_snapshot ()
+    program = loader (content)
+    after = tracemalloc.take_snapshot ()
+    tracemalloc.stop ()
+    blocks = sum (stat.count_diff for stat in after.compare_to (before, 'lineno'))
+    print ('{0:>8}: {1:8.3f}s {2:10d} blocks allocated'.format (title, elapsed, blocks))
+    del program
+
+
+def main () -> None:
+    parser = argparse.ArgumentParser (description='Benchmark the Toy dynamic loader.')
+    parser.add_argument ('--symbols', type=int, default=10000, help='the number of symbols in the executable')
+    options = parser.parse_args ()
+
+    fd, path = tempfile.mkstemp (suffix='.x')
+    try:
+        with os.fdopen (fd, 'wb') as f:
+            _make_executable (options.symbols).write (f)
+        print ('{0} symbols, {1} bytes'.format (options.symbols, os.path.getsize (path)))
+        _measure ('streams', _load_streams, path)
+        _measure ('dyld', load, path)
+    finally:
+        os.unlink (path)
+
+
+if __name__ == '__main__':
+    main ()
+
+# eof toyvm/test/bench_dyld.py